@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Full against incremental scans of large documents after small edits.
+
+A synthetic HTML document is edited one paragraph at a time, after each
+edit it is scanned both in full and incrementally (see
+collective.contentalerts.incremental), the results are checked to be the
+same.
+
+Run it with the python that has collective.contentalerts installed, e.g.::
+
+    bin/zopepy benchmarks/incremental.py [size in KB] [edits]
+"""
+from __future__ import print_function
+from collective.contentalerts.incremental import scan_blocks
+from collective.contentalerts.utilities import Alert
+
+import random
+import sys
+import time
+
+
+SEED = 42
+SIZE = 200
+EDITS = 20
+STOP_WORDS = 1000
+PARAGRAPH_WORDS = 80
+
+
+def random_word(rand):
+    letters = u'abcdefghijklmnopqrstuvwxyzäöü'
+    return u''.join(
+        rand.choice(letters) for _ in range(rand.randint(3, 10))
+    )
+
+
+def random_paragraph(rand, vocabulary):
+    words = [rand.choice(vocabulary) for _ in range(PARAGRAPH_WORDS)]
+    return u'<p>{0}</p>\n'.format(u' '.join(words))
+
+
+def main(size=SIZE, edits=EDITS):
+    rand = random.Random(SEED)
+    vocabulary = [random_word(rand) for _ in range(5000)]
+    stop_words = u'\n'.join(rand.sample(vocabulary, STOP_WORDS))
+    matcher = Alert().compile_stop_words(stop_words, whole_words=False)
+
+    paragraphs = []
+    while sum(len(paragraph) for paragraph in paragraphs) < size * 1024:
+        paragraphs.append(random_paragraph(rand, vocabulary))
+
+    alert = Alert()
+    scan, state = scan_blocks(u''.join(paragraphs), matcher)
+    full_time = 0.0
+    incremental_time = 0.0
+    for _ in range(edits):
+        paragraphs[rand.randrange(len(paragraphs))] = random_paragraph(
+            rand,
+            vocabulary
+        )
+        text = u''.join(paragraphs)
+
+        start = time.time()
+        full = alert.scan(text, stop_words=matcher)
+        full_time += time.time() - start
+
+        start = time.time()
+        scan, state = scan_blocks(text, matcher, state)
+        incremental_time += time.time() - start
+
+        assert sorted(full.matches) == sorted(scan.matches)
+
+    print('{0} KB document, {1} stop words, {2} edits of one paragraph'.format(
+        len(text) // 1024, STOP_WORDS, edits))
+    print('{0:>12} {1:>12}'.format('scan', 'ms per edit'))
+    print('{0:>12} {1:>12.1f}'.format('full', full_time * 1000 / edits))
+    print('{0:>12} {1:>12.1f}'.format(
+        'incremental', incremental_time * 1000 / edits))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Compare Alert.html_normalize against the previous implementation.
+
+Run it with the python that has collective.contentalerts installed, e.g.::
+
+    bin/zopepy benchmarks/normalize.py
+"""
+from __future__ import print_function
+from collective.contentalerts.utilities import Alert
+from collective.contentalerts.utilities import NBSP_RE
+
+import HTMLParser
+import timeit
+import unicodedata
+
+
+SIZE = 1024 * 1024
+REPEAT = 5
+
+SAMPLES = {
+    'ascii': u'Some plain text, with <p>markup</p> and more words. ',
+    'accents': u'Ünïcödé téxt with àccénts, ça va très bien. ',
+    'entities': u'Text with &uuml;mlauts &amp; entities&nbsp;here. ',
+}
+
+
+def previous_html_normalize(text):
+    """html_normalize as it was before the translation table."""
+    if isinstance(text, str):
+        text = text.decode('latin-1')
+    text = NBSP_RE.sub(' ', text)
+    parser = HTMLParser.HTMLParser()
+    text = parser.unescape(text)
+    text = text.lower()
+    text = u''.join(
+        [c
+         for c in unicodedata.normalize('NFKD', text)
+         if not unicodedata.combining(c)]
+    )
+    return text
+
+
+def build_text(sample):
+    return (sample * (SIZE // len(sample) + 1))[:SIZE]
+
+
+def best_of(function, text):
+    timer = timeit.Timer(lambda: function(text))
+    return min(timer.repeat(repeat=REPEAT, number=1))
+
+
+def main():
+    print('{0:<10} {1:>12} {2:>12} {3:>8}'.format(
+        'input', 'before (s)', 'after (s)', 'speedup'))
+    for name in sorted(SAMPLES):
+        text = build_text(SAMPLES[name])
+        assert previous_html_normalize(text) == Alert.html_normalize(text)
+        before = best_of(previous_html_normalize, text)
+        after = best_of(Alert.html_normalize, text)
+        print('{0:<10} {1:>12.4f} {2:>12.4f} {3:>7.1f}x'.format(
+            name, before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Throughput of the bulk audit scanner with a growing number of workers.
+
+A synthetic corpus is stored on a temporary FileStorage, then for each
+number of workers the texts are read back from the database in batches,
+as the audit does, and scanned on a ScannerPool.
+
+Run it with the python that has collective.contentalerts installed, e.g.::
+
+    bin/zopepy benchmarks/parallel_audit.py [documents] [max workers]
+"""
+from __future__ import print_function
+from collective.contentalerts.parallel import ScannerPool
+from collective.contentalerts.utilities import Alert
+from itertools import islice
+from persistent import Persistent
+from ZODB.DB import DB
+from ZODB.FileStorage import FileStorage
+
+import BTrees.OOBTree
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import transaction
+
+
+SEED = 42
+DOCUMENTS = 2000
+WORDS_PER_DOCUMENT = 3000
+STOP_WORDS = 1000
+HIT_RATIO = 0.05
+BATCH_SIZE = 500
+
+
+class Document(Persistent):
+
+    def __init__(self, text):
+        self.text = text
+
+
+def random_word(rand):
+    letters = u'abcdefghijklmnopqrstuvwxyzäöü'
+    return u''.join(
+        rand.choice(letters) for _ in range(rand.randint(3, 10))
+    )
+
+
+def build_corpus(path, documents):
+    rand = random.Random(SEED)
+    vocabulary = [random_word(rand) for _ in range(5000)]
+    stop_words = [u'zz{0}zz'.format(random_word(rand))
+                  for _ in range(STOP_WORDS)]
+
+    db = DB(FileStorage(path))
+    connection = db.open()
+    root = connection.root()
+    root['documents'] = container = BTrees.OOBTree.OOBTree()
+    for index in range(documents):
+        words = [rand.choice(vocabulary) for _ in range(WORDS_PER_DOCUMENT)]
+        if rand.random() < HIT_RATIO:
+            words.insert(rand.randint(0, len(words)), rand.choice(stop_words))
+        container[index] = Document(u' '.join(words))
+        if index % BATCH_SIZE == 0:
+            transaction.commit()
+    transaction.commit()
+    connection.close()
+    db.close()
+    return u'\n'.join(stop_words)
+
+
+def audit(path, matcher, workers):
+    db = DB(FileStorage(path, read_only=True))
+    connection = db.open()
+    container = connection.root()['documents']
+    matching = {}
+    with ScannerPool(matcher, workers=workers) as pool:
+        items = container.iteritems()
+        while True:
+            batch = list(islice(items, BATCH_SIZE))
+            if not batch:
+                break
+            matching.update(pool.scan(
+                (key, document.text) for key, document in batch
+            ))
+            connection.cacheMinimize()
+    connection.close()
+    db.close()
+    return matching
+
+
+def main(documents=DOCUMENTS, max_workers=None):
+    max_workers = max_workers or multiprocessing.cpu_count()
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'Data.fs')
+        stop_words = build_corpus(path, documents)
+        matcher = Alert().compile_stop_words(stop_words)
+
+        print('{0} documents, {1} stop words, {2} CPUs'.format(
+            documents, STOP_WORDS, multiprocessing.cpu_count()))
+        print('{0:>8} {1:>10} {2:>12} {3:>8}'.format(
+            'workers', 'time (s)', 'docs/s', 'matches'))
+        workers = 1
+        expected = None
+        while workers <= max_workers:
+            start = time.time()
+            matching = audit(path, matcher, workers)
+            elapsed = time.time() - start
+            if expected is None:
+                expected = matching
+            assert matching == expected
+            print('{0:>8} {1:>10.2f} {2:>12.1f} {3:>8}'.format(
+                workers, elapsed, documents / elapsed, len(matching)))
+            workers *= 2
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
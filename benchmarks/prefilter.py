@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Words prefilter against the automaton and a per word ``find`` loop.
+
+Times ``has_stop_words`` on an already normalized text, in whole words
+mode, three ways:
+
+- ``find``: one ``unicode.find`` per stop word, the way stop words were
+  searched before the automaton, followed by a word boundary check
+- ``automaton``: walking the whole text through the Aho-Corasick automaton
+- ``prefilter``: the set of words of the text checked against the single
+  word stop words, phrases scanned only if all their words are on the text
+  (``StopWordsMatcher.search``)
+
+Each stop words list size is timed on a text without any stop word, one
+where only a phrase could be (all its words are there, but not together)
+and one with a single word stop word near its end.
+
+Run it with the python that has collective.contentalerts installed, e.g.::
+
+    bin/zopepy benchmarks/prefilter.py [size in KB]
+"""
+from __future__ import print_function
+from collective.contentalerts.matcher import is_word_char
+from collective.contentalerts.utilities import Alert
+
+import random
+import sys
+import time
+
+
+SEED = 42
+SIZE = 200
+REPEAT = 3
+WORDS = (10, 100, 1000, 10000)
+# one in every PHRASES stop words is a two words phrase
+PHRASES = 10
+VOCABULARY_SIZE = 5000
+
+# stop words start with a letter that words on the text never have
+STOP_WORD_PREFIX = u'q'
+
+
+def random_word(rand):
+    letters = u'abcdefghijklmnoprstuvwxyz'
+    return u''.join(
+        rand.choice(letters) for _ in range(rand.randint(3, 10))
+    )
+
+
+def build_stop_words(rand, count):
+    stop_words = set()
+    while len(stop_words) < count:
+        words = [STOP_WORD_PREFIX + random_word(rand)]
+        if not len(stop_words) % PHRASES:
+            words.append(STOP_WORD_PREFIX + random_word(rand))
+        stop_words.add(u' '.join(words))
+    return sorted(stop_words)
+
+
+def build_text(rand, size):
+    vocabulary = [random_word(rand) for _ in range(VOCABULARY_SIZE)]
+    words = []
+    length = 0
+    while length < size:
+        word = rand.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    return u' '.join(words)
+
+
+def find_loop(text, stop_words):
+    """Search each stop word on its own, as whole words."""
+    last = len(text)
+    for word in stop_words:
+        index = text.find(word)
+        while index != -1:
+            end = index + len(word)
+            if ((index == 0 or not is_word_char(text[index - 1])) and
+                    (end == last or not is_word_char(text[end]))):
+                return True
+            index = text.find(word, end)
+    return False
+
+
+def automaton(text, matcher):
+    for _ in matcher.finditer(text):
+        return True
+    return False
+
+
+def best_of(function, repeat=REPEAT):
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        timings.append(time.time() - start)
+    return min(timings), result
+
+
+def main(size=SIZE):
+    rand = random.Random(SEED)
+    text = build_text(rand, size * 1024)
+
+    print('{0} KB text, whole words, ms per text'.format(size))
+    print('{0:>8} {1:>8} {2:>10} {3:>10} {4:>10}'.format(
+        'words', 'text', 'find', 'automaton', 'prefilter'))
+    for count in WORDS:
+        stop_words = build_stop_words(rand, count)
+        matcher = Alert().compile_stop_words(
+            u'\n'.join(stop_words),
+            whole_words=True
+        )
+        phrases = [word for word in stop_words if u' ' in word]
+        single_words = [word for word in stop_words if u' ' not in word]
+        first, second = phrases[0].split()
+        texts = (
+            ('no hit', text),
+            ('phrase', u'{0} {1} {2}'.format(second, text, first)),
+            ('hit', u'{0} {1}'.format(text, single_words[-1])),
+        )
+        for name, sample in texts:
+            timings = []
+            results = set()
+            for function in (
+                lambda: find_loop(sample, stop_words),
+                lambda: automaton(sample, matcher),
+                lambda: matcher.search(sample),
+            ):
+                seconds, result = best_of(function)
+                timings.append(seconds * 1000)
+                results.add(result)
+            assert len(results) == 1
+            print('{0:>8} {1:>8} {2:>10.1f} {3:>10.1f} {4:>10.1f}'.format(
+                count, name, *timings))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
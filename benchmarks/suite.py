@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""Throughput and peak memory of the alert engine on synthetic corpora.
+
+Each case builds, from a fixed seed, an HTML text and a stop words list and
+times compiling the list, ``Alert.html_normalize``, ``Alert.has_stop_words``
+and ``Alert.get_snippets`` on them. Cases vary one dimension at a time from
+a default one: text size, stop words list size, hit density (how many of
+the words on the text are stop words) and Unicode mix.
+
+Every case runs on a process of its own, its peak memory is how much the
+resident size of that process grew while building the corpus and running
+the operations.
+
+No Plone site is needed, run it with the python that has
+collective.contentalerts installed, e.g.::
+
+    bin/zopepy benchmarks/suite.py --save baseline.json
+    bin/zopepy benchmarks/suite.py --compare baseline.json
+
+``--compare`` exits with status 1 if any throughput dropped, or any peak
+memory grew, more than ``--threshold`` (a ratio) against the baseline.
+"""
+from __future__ import print_function
+from collective.contentalerts.utilities import Alert
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import time
+
+
+SEED = 42
+REPEAT = 3
+THRESHOLD = 0.2
+PARAGRAPH_WORDS = 60
+VOCABULARY_SIZE = 5000
+
+# stop words start with a letter that words on the text never have, so
+# that they are only found where they were put on purpose
+STOP_WORD_PREFIX = u'q'
+
+ALPHABETS = {
+    'ascii': u'abcdefghijklmnoprstuvwxyz',
+    'latin': u'abcdefghijklmnoprstuvwxyzäöüéèàçñß',
+    'mixed': u'abcdefghijklmnoprstuvwxyzäéçабвгдежзийклмнαβγδεζηθ',
+}
+
+# entities are only added to the mixed corpus
+ENTITIES = (u'&amp;', u'&nbsp;', u'&uuml;', u'&#233;', )
+
+DEFAULT_CASE = {
+    'size': 100 * 1024,
+    'words': 1000,
+    'density': 0.01,
+    'alphabet': 'ascii',
+}
+
+VARIATIONS = (
+    ('size', (1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)),
+    ('words', (10, 1000, 10000, 100000)),
+    ('density', (0, 0.001, 0.01, 0.1)),
+    ('alphabet', ('ascii', 'latin', 'mixed')),
+)
+
+OPERATIONS = ('compile', 'html_normalize', 'has_stop_words', 'get_snippets', )
+
+
+def case_name(case):
+    return 'size={size} words={words} density={density} ' \
+           'alphabet={alphabet}'.format(**case)
+
+
+def build_cases():
+    """Get the cases to run, without duplicates and in a stable order."""
+    cases = []
+    for key, values in VARIATIONS:
+        for value in values:
+            case = dict(DEFAULT_CASE)
+            case[key] = value
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def random_word(rand, alphabet):
+    return u''.join(
+        rand.choice(alphabet) for _ in range(rand.randint(3, 10))
+    )
+
+
+def build_stop_words(rand, case):
+    alphabet = ALPHABETS[case['alphabet']]
+    stop_words = set()
+    while len(stop_words) < case['words']:
+        stop_words.add(STOP_WORD_PREFIX + random_word(rand, alphabet))
+    return sorted(stop_words)
+
+
+def build_text(rand, case, stop_words):
+    alphabet = ALPHABETS[case['alphabet']]
+    vocabulary = [random_word(rand, alphabet) for _ in range(VOCABULARY_SIZE)]
+    if case['alphabet'] == 'mixed':
+        vocabulary.extend(ENTITIES)
+
+    paragraphs = []
+    size = 0
+    while size < case['size']:
+        words = []
+        for _ in range(PARAGRAPH_WORDS):
+            if rand.random() < case['density']:
+                words.append(rand.choice(stop_words))
+            else:
+                words.append(rand.choice(vocabulary))
+        paragraph = u'<p>{0}</p>\n'.format(u' '.join(words))
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    return u''.join(paragraphs)[:case['size']]
+
+
+def best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def max_rss():
+    """Peak resident size of the process so far, in KB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # bytes there, KB on Linux
+        rss //= 1024
+    return rss
+
+
+def run_case(case, repeat):
+    """Time each operation on the case, on the current process."""
+    start_rss = max_rss()
+    rand = random.Random(SEED)
+    stop_words = build_stop_words(rand, case)
+    text = build_text(rand, case, stop_words)
+    stop_words_text = u'\n'.join(stop_words)
+    megabytes = len(text.encode('utf-8')) / (1024.0 * 1024)
+
+    alert = Alert()
+    matcher = alert.compile_stop_words(stop_words_text, whole_words=False)
+    functions = {
+        'compile': lambda: alert.compile_stop_words(
+            stop_words_text,
+            whole_words=False
+        ),
+        'html_normalize': lambda: alert.html_normalize(text),
+        'has_stop_words': lambda: alert.has_stop_words(
+            text,
+            stop_words=matcher
+        ),
+        'get_snippets': lambda: alert.get_snippets(
+            text,
+            stop_words=matcher
+        ),
+    }
+
+    results = {}
+    for operation in OPERATIONS:
+        seconds = best_of(functions[operation], repeat)
+        if operation == 'compile':
+            # stop words per second
+            throughput = case['words'] / seconds if seconds else None
+        else:
+            # MB of text per second
+            throughput = megabytes / seconds if seconds else None
+        results[operation] = {
+            'seconds': seconds,
+            'throughput': throughput,
+        }
+    return {
+        'operations': results,
+        'peak_memory_kb': max_rss() - start_rss,
+    }
+
+
+def _run_child(case, repeat, queue):
+    queue.put(run_case(case, repeat))
+
+
+def run_isolated(case, repeat):
+    """Run a case on a process of its own, so its memory is measured alone."""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_run_child,
+        args=(case, repeat, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run(cases, repeat):
+    results = {}
+    for case in cases:
+        name = case_name(case)
+        result = run_isolated(case, repeat)
+        result['case'] = case
+        results[name] = result
+        print_result(name, result)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def print_result(name, result):
+    operations = result['operations']
+    print(name)
+    print('  peak memory: {0} KB'.format(result['peak_memory_kb']))
+    for operation in OPERATIONS:
+        values = operations[operation]
+        unit = 'words/s' if operation == 'compile' else 'MB/s'
+        print('  {0:<16} {1:>10.4f} s {2:>14} {3}'.format(
+            operation,
+            values['seconds'],
+            format_number(values['throughput']),
+            unit
+        ))
+
+
+def format_number(number):
+    if number is None:
+        return '-'
+    return '{0:.2f}'.format(number)
+
+
+def change(current, baseline):
+    """Relative change of a value against its baseline, None if unknown."""
+    if not current or not baseline:
+        return None
+    return (current - baseline) / float(baseline)
+
+
+def compare(report, baseline, threshold):
+    """Print the changes against the baseline.
+
+    :returns: the regressions found, as (case, measure, change) tuples.
+    :rtype: list
+    """
+    regressions = []
+    for name, result in sorted(report['results'].items()):
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print('{0}: not on the baseline'.format(name))
+            continue
+        print(name)
+        memory = change(
+            result['peak_memory_kb'],
+            previous['peak_memory_kb']
+        )
+        print('  {0:<16} {1}'.format('peak memory', format_change(memory)))
+        if memory is not None and memory > threshold:
+            regressions.append((name, 'peak memory', memory))
+        for operation in OPERATIONS:
+            if operation not in previous['operations']:
+                continue
+            throughput = change(
+                result['operations'][operation]['throughput'],
+                previous['operations'][operation]['throughput']
+            )
+            print('  {0:<16} {1}'.format(operation, format_change(throughput)))
+            if throughput is not None and -throughput > threshold:
+                regressions.append((name, operation, throughput))
+    return regressions
+
+
+def format_change(value):
+    if value is None:
+        return '-'
+    return '{0:+.1%}'.format(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', metavar='FILE',
+                        help='store the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='ratio a measure can get worse before it is '
+                             'reported as a regression (default: '
+                             '%(default)s)')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help='times each operation is run, the best one is '
+                             'kept (default: %(default)s)')
+    parser.add_argument('--max-size', type=int, metavar='BYTES',
+                        help='skip cases with longer texts')
+    parser.add_argument('--max-words', type=int, metavar='WORDS',
+                        help='skip cases with longer stop words lists')
+    args = parser.parse_args(argv)
+
+    cases = [
+        case for case in build_cases()
+        if (args.max_size is None or case['size'] <= args.max_size) and
+        (args.max_words is None or case['words'] <= args.max_words)
+    ]
+    report = run(cases, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print()
+        print('Against {0}'.format(args.compare))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print()
+            print('{0} regressions:'.format(len(regressions)))
+            for name, measure, value in regressions:
+                print('  {0} {1} {2}'.format(
+                    name, measure, format_change(value)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -42,15 +42,25 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=[
+        'Acquisition',
+        'DateTime',
         'plone.api',
         'plone.app.contentrules',
         'plone.app.registry',
+        'plone.batching',
         'plone.contentrules',
+        'plone.indexer',
+        'plone.protect',
         'plone.registry',
         'plone.stringinterp',
+        'plone.uuid',
+        'Products.CMFPlone',
         'Products.GenericSetup',
         'setuptools',
+        'transaction',
+        'ZODB3',
         'Zope2',
+        'zope.annotation',
         'zope.component',
         # XXX migrate to z3c.form on Plone 5 (p.a.contentrules 4.0.5)
         'zope.formlib',
@@ -60,10 +70,10 @@ setup(
     ],
     extras_require={
         'test': [
-            'Acquisition',
             'plone.app.contenttypes[test]<1.2',  # to get Plone 4.3 compatibility
             'plone.app.discussion',
             'plone.app.testing',
+            'plone.app.textfield',
             'plone.browserlayer',
             'plone.testing',
             'Products.CMFPlone',
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Search for stop words on the content that already exists on a site.
+
+Alerts can be discarded in bulk as well, e.g. after a stop words list
+change turned up lots of false positives.
+"""
+from collective.contentalerts.contentrules import TextAlertConditionExecutor
+from collective.contentalerts.contentrules import get_cached_verdict
+from collective.contentalerts.contentrules import get_found_stop_words
+from collective.contentalerts.interfaces import IAlert
+from collective.contentalerts.interfaces import IHasStopWords
+from collective.contentalerts.parallel import ScannerPool
+from collective.contentalerts.utilities import get_text
+from collective.contentalerts.utilities import text_digest
+from itertools import islice
+from persistent.mapping import PersistentMapping
+from plone import api
+from zope.annotation.interfaces import IAnnotations
+from zope.component import getUtility
+
+import datetime
+import logging
+import transaction
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+AUDIT_KEY = 'collective.contentalerts.audit'
+BATCH_SIZE = 500
+
+
+class Audit(object):
+    """Scan all cataloged objects of a site for stop words.
+
+    Objects are walked in catalog order in batches of ``batch_size``,
+    a transaction is committed after each batch together with the position
+    reached (the cursor), so that an interrupted audit continues where it
+    was left. The ZODB cache is cleared between batches to keep memory
+    bounded regardless of the size of the site.
+
+    With ``workers`` the texts of each batch are scanned on a pool of
+    processes (see collective.contentalerts.parallel), only extracting the
+    texts and flagging the objects is left to the current process.
+    """
+
+    def __init__(self, portal, batch_size=BATCH_SIZE, stop_words=None,
+                 workers=0):
+        """
+        :param portal: the Plone site to audit.
+        :param batch_size: how many objects to scan per transaction.
+        :type batch_size: int
+        :param stop_words: one stop word per line, if not provided the ones
+          from the registry are used.
+        :type stop_words: unicode
+        :param workers: how many processes should scan the texts, if not
+          given they are scanned on the current process.
+        :type workers: int
+        """
+        self.portal = portal
+        self.batch_size = batch_size
+        self.stop_words = stop_words
+        self.workers = workers
+
+    @property
+    def status(self):
+        """Persistent status of the audit: cursor and counters."""
+        annotations = IAnnotations(self.portal)
+        status = annotations.get(AUDIT_KEY)
+        if status is None:
+            status = annotations[AUDIT_KEY] = PersistentMapping()
+            self._reset_status(status)
+        return status
+
+    @staticmethod
+    def _reset_status(status):
+        status.update({
+            'cursor': None,
+            'scanned': 0,
+            'flagged': 0,
+            'unflagged': 0,
+            'started': None,
+            'finished': None,
+        })
+
+    def reset(self):
+        """Start the audit again from the first object."""
+        self._reset_status(self.status)
+
+    def run(self, max_batches=None):
+        """Audit objects until all have been scanned.
+
+        :param max_batches: stop after that many batches, even if not all
+          objects have been scanned yet.
+        :type max_batches: int
+        :returns: the status of the audit.
+        :rtype: dict
+        """
+        matcher = getUtility(IAlert).compile_stop_words(self.stop_words)
+        if not matcher:
+            raise ValueError('There are no stop words to audit with.')
+
+        status = self.status
+        if status['started'] is None or status['finished'] is not None:
+            self._reset_status(status)
+            status['started'] = datetime.datetime.now()
+
+        if self.workers:
+            with ScannerPool(matcher, workers=self.workers) as pool:
+                self._run(matcher, status, max_batches, pool)
+        else:
+            self._run(matcher, status, max_batches, None)
+
+        return dict(status)
+
+    def _run(self, matcher, status, max_batches, pool):
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batch = self._next_batch(status['cursor'])
+            if not batch:
+                status['finished'] = datetime.datetime.now()
+                transaction.commit()
+                break
+
+            self._audit_batch(batch, matcher, status, pool)
+            status['cursor'] = batch[-1][0]
+            transaction.commit()
+            logger.info(
+                'Audit: {0} objects scanned, {1} flagged.'.format(
+                    status['scanned'],
+                    status['flagged'],
+                )
+            )
+
+            self.portal._p_jar.cacheMinimize()
+            batches += 1
+
+    def _next_batch(self, cursor):
+        """Get the next (record id, path) pairs from the catalog."""
+        catalog = api.portal.get_tool('portal_catalog')
+        paths = catalog._catalog.paths
+        if cursor is None:
+            items = paths.items()
+        else:
+            items = paths.items(min=cursor, excludemin=True)
+        return list(islice(items, self.batch_size))
+
+    def _get_object(self, path):
+        catalog = api.portal.get_tool('portal_catalog')
+        return catalog.unrestrictedTraverse(path, None)
+
+    def _audit_batch(self, batch, matcher, status, pool=None):
+        """Scan the objects of a batch and flag them or not accordingly.
+
+        :param batch: (record id, path) pairs of the objects to scan.
+        :type batch: list
+        :param matcher: the stop words to scan them with.
+        :type matcher: StopWordsMatcher
+        :param status: counters to update.
+        :type status: dict
+        :param pool: where to scan the texts, if not given they are scanned
+          on the current process.
+        :type pool: ScannerPool
+        """
+        pending = []
+        for rid, path in batch:
+            obj = self._get_object(path)
+            if obj is None:
+                continue
+
+            text = get_text(obj)
+            if not text:
+                self._flag(obj, False, status)
+                continue
+
+            verdict = get_cached_verdict(
+                obj,
+                text_digest(text),
+                matcher.version
+            )
+            # the stop words found are only known by scanning the text
+            if verdict is None or verdict and not get_found_stop_words(obj):
+                pending.append((rid, obj, text))
+            else:
+                self._flag(obj, verdict, status)
+
+        if pool is not None:
+            matching = pool.scan((item[0], item[2]) for item in pending)
+        else:
+            alert_utility = getUtility(IAlert)
+            matching = {}
+            for rid, obj, text in pending:
+                scan = alert_utility.scan(text, stop_words=matcher)
+                if scan:
+                    matching[rid] = scan.words
+
+        for rid, obj, text in pending:
+            self._flag(obj, rid in matching, status, matching.get(rid))
+
+    @staticmethod
+    def _flag(obj, has_stop_words, status, words=None):
+        """Add or remove the marker interface, if it needs to change.
+
+        :param words: the stop words found, if the text was scanned.
+        :type words: tuple
+        """
+        status['scanned'] += 1
+        changed = has_stop_words != IHasStopWords.providedBy(obj)
+        if changed or words is not None:
+            TextAlertConditionExecutor._apply_marker_interface(
+                obj,
+                has_stop_words,
+                words
+            )
+        if changed:
+            if has_stop_words:
+                status['flagged'] += 1
+            else:
+                status['unflagged'] += 1
+
+    def report(self):
+        """Human readable summary of the status of the audit."""
+        status = self.status
+        return u'\n'.join([
+            u'{0}: {1}'.format(key, status.get(key))
+            for key in (
+                'started',
+                'finished',
+                'cursor',
+                'scanned',
+                'flagged',
+                'unflagged',
+            )
+        ])
+
+
+def discard_alerts(portal, query, batch_size=BATCH_SIZE):
+    """Remove the alert of all flagged objects found by a catalog query.
+
+    Objects are unflagged and reindexed in batches of ``batch_size``, a
+    transaction is committed between batches, the last one is left for the
+    caller (e.g. the request) to commit.
+
+    :param portal: the Plone site.
+    :param query: catalog query of the objects, only the flagged ones are
+      taken into account, and only those the current user can see.
+    :type query: dict
+    :param batch_size: how many objects to unflag per transaction.
+    :type batch_size: int
+    :returns: how many alerts were discarded.
+    :rtype: int
+    """
+    catalog = api.portal.get_tool('portal_catalog')
+    query = dict(query, has_stop_words=True)
+    paths = [brain.getPath() for brain in catalog(**query)]
+
+    discarded = 0
+    for start in range(0, len(paths), batch_size):
+        if start:
+            transaction.commit()
+            portal._p_jar.cacheMinimize()
+        for path in paths[start:start + batch_size]:
+            obj = portal.unrestrictedTraverse(path, None)
+            if obj is not None and IHasStopWords.providedBy(obj):
+                TextAlertConditionExecutor._apply_marker_interface(obj, False)
+                discarded += 1
+    return discarded
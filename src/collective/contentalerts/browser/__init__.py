@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+
+def get_positive_int(form, name, default):
+    """Get a positive integer out of a request form.
+
+    :param form: the request form.
+    :param name: the name of the parameter.
+    :type name: str
+    :param default: what to return if the parameter is not given.
+    :type default: int
+    :raises ValueError: if the parameter is not a positive integer.
+    :returns: the integer.
+    :rtype: int
+    """
+    value = form.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = 0
+    if value < 1:
+        raise ValueError(
+            u'{0} must be a positive integer'.format(name)
+        )
+    return value
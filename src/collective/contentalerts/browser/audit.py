@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.audit import Audit
+from collective.contentalerts.audit import BATCH_SIZE
+from collective.contentalerts.browser import get_positive_int
+from plone.protect import CheckAuthenticator
+from plone.protect import PostOnly
+from zope.publisher.browser import BrowserView
+
+
+# batches run at most by a single request, unless asked for more
+MAX_BATCHES = 10
+
+
+class AuditView(BrowserView):
+    """Search for stop words on the content that already exists.
+
+    Without parameters it only reports how the audit is going, otherwise:
+
+    - ``run``: scan objects, continuing where the last run stopped
+    - ``restart``: start again from the first object
+    - ``batch_size``: objects scanned between each commit
+    - ``max_batches``: stop after that many batches (10 by default)
+
+    Running or restarting the audit is only done on POST requests with a
+    valid authenticator.
+    """
+
+    def __call__(self):
+        form = self.request.form
+        self.request.response.setHeader('Content-Type', 'text/plain')
+        try:
+            batch_size = get_positive_int(form, 'batch_size', BATCH_SIZE)
+            max_batches = get_positive_int(form, 'max_batches', MAX_BATCHES)
+        except ValueError as error:
+            self.request.response.setStatus(400)
+            return error.args[0]
+
+        if form.get('restart') or form.get('run'):
+            PostOnly(self.request)
+            CheckAuthenticator(self.request)
+
+        audit = Audit(self.context, batch_size=batch_size)
+        if form.get('restart'):
+            audit.reset()
+        if form.get('run'):
+            audit.run(max_batches=max_batches)
+
+        return audit.report()
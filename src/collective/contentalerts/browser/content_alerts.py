@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from Products.CMFPlone.utils import safe_unicode
+from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
+from collective.contentalerts.interfaces import IAlert
+from plone import api
+from plone.batching import Batch
+from zope.component import getUtility
+from zope.publisher.browser import BrowserView
+
+import urllib
+
+
+BATCH_SIZE = 50
+
+# sort option -> catalog index
+SORT_INDEXES = {
+    'flagged': 'stop_words_flagged',
+    'title': 'sortable_title',
+    'type': 'portal_type',
+    'path': 'path',
+}
+
+
+class ContentAlertsView(BrowserView):
+    """List the content and comments that have stop words.
+
+    Only the catalog is used (indexes to filter and sort, metadata to
+    render), so that no object needs to be loaded regardless of how many are
+    flagged. Request parameters:
+
+    - ``sort_on``: one of SORT_INDEXES keys, ``flagged`` by default
+    - ``sort_order``: ``ascending`` or ``descending`` (the default)
+    - ``portal_type``: only list objects of this type
+    - ``word``: only list objects where this stop word was found
+    - ``b_start`` and ``b_size``: the page to show
+    """
+
+    template = ViewPageTemplateFile('content_alerts.pt')
+
+    def __call__(self):
+        self.update()
+        return self.template()
+
+    def update(self):
+        form = self.request.form
+        self.sort_on = form.get('sort_on')
+        if self.sort_on not in SORT_INDEXES:
+            self.sort_on = 'flagged'
+        self.sort_order = form.get('sort_order')
+        if self.sort_order != 'ascending':
+            self.sort_order = 'descending'
+        self.portal_type = form.get('portal_type') or None
+        self.word = form.get('word') or None
+        self.b_start = int(form.get('b_start', 0))
+        self.b_size = int(form.get('b_size', BATCH_SIZE))
+
+        self.batch = Batch(
+            self.search(),
+            self.b_size,
+            start=self.b_start
+        )
+
+    def query(self):
+        query = {
+            'has_stop_words': True,
+            'sort_on': SORT_INDEXES[self.sort_on],
+            'sort_order': self.sort_order,
+            # let the catalog only sort the brains up to the current page
+            'b_start': self.b_start,
+            'b_size': self.b_size,
+        }
+        if self.portal_type:
+            query['portal_type'] = self.portal_type
+        if self.word:
+            # stop words are indexed normalized
+            word = getUtility(IAlert).html_normalize(self.word).strip()
+            query['stop_words'] = word
+        return query
+
+    def search(self):
+        catalog = api.portal.get_tool('portal_catalog')
+        return catalog(**self.query())
+
+    def items(self):
+        """Information about each flagged object on the current page."""
+        for brain in self.batch:
+            yield {
+                'title': brain.Title or brain.getId,
+                'url': brain.getURL(),
+                'path': brain.getPath(),
+                'portal_type': brain.portal_type,
+                'stop_words': u', '.join(brain.stop_words or ()),
+                'flagged': brain.stop_words_flagged,
+            }
+
+    def portal_types(self):
+        """Types that can be filtered on."""
+        catalog = api.portal.get_tool('portal_catalog')
+        return sorted(catalog.uniqueValuesFor('portal_type'))
+
+    def sort_url(self, sort_on):
+        """URL to sort by a column, reversing the order if already sorted."""
+        sort_order = 'ascending'
+        if sort_on == self.sort_on and self.sort_order == 'ascending':
+            sort_order = 'descending'
+        params = [
+            ('sort_on', sort_on),
+            ('sort_order', sort_order),
+        ]
+        if self.portal_type:
+            params.append(('portal_type', self.portal_type))
+        if self.word:
+            params.append(('word', self.word))
+        return '{0}/@@content-alerts?{1}'.format(
+            self.context.absolute_url(),
+            urllib.urlencode([
+                (key, safe_unicode(value).encode('utf-8'))
+                for key, value in params
+            ])
+        )
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 from collective.contentalerts import _
+from collective.contentalerts.audit import BATCH_SIZE
+from collective.contentalerts.audit import discard_alerts
+from collective.contentalerts.contentrules import TextAlertConditionExecutor
+from collective.contentalerts.interfaces import IAlert
 from collective.contentalerts.interfaces import IHasStopWords
 from plone import api
-from zope.interface import noLongerProvides
+from plone.protect import CheckAuthenticator
+from plone.protect import PostOnly
+from zope.component import getUtility
 from zope.publisher.browser import BrowserView
 
 
@@ -10,8 +16,10 @@ class DiscardAlertView(BrowserView):
 
     def __call__(self):
         if IHasStopWords.providedBy(self.context):
-            noLongerProvides(self.context, IHasStopWords)
-            self.context.reindexObject(idxs=('object_provides', ))
+            TextAlertConditionExecutor._apply_marker_interface(
+                self.context,
+                False
+            )
 
             api.portal.show_message(
                 message=_(
@@ -24,3 +32,88 @@ class DiscardAlertView(BrowserView):
         return self.request.response.redirect(
             self.context.absolute_url(),
         )
+
+
+class DiscardAlertsView(BrowserView):
+    """Discard the alerts of many objects at once, below the context.
+
+    Request parameters, either:
+
+    - ``uids``: UIDs of the objects
+    - ``paths``: paths of the objects, as sent by folder_contents buttons
+    - ``portal_type`` and/or ``word``: all flagged objects of that type or
+      where that stop word was found, as filtered on @@content-alerts
+    - ``all``: all flagged objects
+
+    ``batch_size`` sets how many objects are unflagged per transaction.
+
+    Only POST requests with a valid authenticator are accepted.
+    """
+
+    def __call__(self):
+        PostOnly(self.request)
+        CheckAuthenticator(self.request)
+
+        query = self.query()
+        if query is None:
+            self._show_message(
+                _(
+                    u'discard_alerts_nothing_selected_message',
+                    default=u'No objects were selected.'
+                ),
+                'error'
+            )
+        else:
+            batch_size = int(self.request.form.get('batch_size', BATCH_SIZE))
+            discarded = discard_alerts(
+                api.portal.get(),
+                query,
+                batch_size=batch_size
+            )
+            self._show_message(
+                _(
+                    u'discard_alerts_message',
+                    default=u'${count} alerts discarded.',
+                    mapping={'count': discarded}
+                )
+            )
+
+        return self.request.response.redirect(
+            self.request.get('HTTP_REFERER') or self.context.absolute_url()
+        )
+
+    def query(self):
+        """Catalog query of the selected objects, None if none is."""
+        form = self.request.form
+        query = {}
+        uids = self._get_list('uids')
+        paths = self._get_list('paths')
+        if uids:
+            query['UID'] = uids
+        if paths:
+            query['path'] = {'query': paths, 'depth': 0}
+        if form.get('portal_type'):
+            query['portal_type'] = form['portal_type']
+        if form.get('word'):
+            # stop words are indexed normalized
+            word = getUtility(IAlert).html_normalize(form['word']).strip()
+            query['stop_words'] = word
+        if not query and not form.get('all'):
+            return None
+
+        if not paths:
+            query['path'] = '/'.join(self.context.getPhysicalPath())
+        return query
+
+    def _get_list(self, name):
+        values = self.request.form.get(name) or []
+        if not isinstance(values, list):
+            values = [values]
+        return values
+
+    def _show_message(self, message, type='info'):
+        api.portal.show_message(
+            message=message,
+            request=self.request,
+            type=type,
+        )
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.browser import get_positive_int
+from collective.contentalerts.contentrules import process_queue
+from collective.contentalerts.queue import get_queue
+from plone.protect import CheckAuthenticator
+from plone.protect import PostOnly
+from zope.publisher.browser import BrowserView
+
+
+# objects scanned at most by a single request, unless asked for more
+LIMIT = 100
+
+
+class QueueView(BrowserView):
+    """Report how many objects are waiting to be scanned and for how long."""
+
+    def __call__(self):
+        self.request.response.setHeader('Content-Type', 'text/plain')
+        return self.report()
+
+    def report(self):
+        queue = get_queue(self.context, create=False)
+        depth = 0
+        lag = 0.0
+        if queue is not None:
+            depth = len(queue)
+            lag = queue.lag()
+        return u'depth: {0}\nlag: {1:.0f}'.format(depth, lag)
+
+
+class ProcessQueueView(QueueView):
+    """Scan the objects waiting on the queue.
+
+    Meant to be called regularly with a POST request that has a valid
+    authenticator, ``limit`` sets how many objects are scanned at most per
+    call (100 by default).
+    """
+
+    def __call__(self):
+        self.request.response.setHeader('Content-Type', 'text/plain')
+        try:
+            limit = get_positive_int(self.request.form, 'limit', LIMIT)
+        except ValueError as error:
+            self.request.response.setStatus(400)
+            return error.args[0]
+
+        PostOnly(self.request)
+        CheckAuthenticator(self.request)
+        processed = process_queue(self.context, limit=limit)
+        return u'processed: {0}\n{1}'.format(processed, self.report())
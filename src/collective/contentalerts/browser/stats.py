@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.stats import render
+from zope.publisher.browser import BrowserView
+
+
+class StatsView(BrowserView):
+    """Report the scans done on this process in Prometheus text format."""
+
+    def __call__(self):
+        self.request.response.setHeader(
+            'Content-Type',
+            'text/plain; version=0.0.4; charset=utf-8'
+        )
+        return render()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+from Products.CMFPlone.utils import safe_unicode
+from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
+from collective.contentalerts import _
+from collective.contentalerts.patterns import InvalidStopWord
+from collective.contentalerts.rescan import queue_rescan
+from collective.contentalerts.wordlist import add_word_list
+from collective.contentalerts.wordlist import get_word_list
+from collective.contentalerts.wordlist import get_word_lists
+from collective.contentalerts.wordlist import remove_word_list
+from plone import api
+from plone.batching import Batch
+from plone.protect import CheckAuthenticator
+from plone.protect import PostOnly
+from zope.publisher.browser import BrowserView
+
+import urllib
+
+
+BATCH_SIZE = 100
+
+
+class WordListView(BrowserView):
+    """Browse, search, add and remove the stop words of the site word lists.
+
+    Request parameters:
+
+    - ``list``: the named word list to work on, the default one if not given
+    - ``search``: only list the stop words starting with it
+    - ``b_start`` and ``b_size``: the page to show
+    - ``form.buttons.import``: add the stop words on ``words`` (one per line)
+      and on the ``file`` uploaded (a text file, one per line)
+    - ``form.buttons.remove``: remove the stop words on ``remove``
+    - ``form.buttons.add_list``: add a named word list called ``name``,
+      with an optional ``title``
+    - ``form.buttons.remove_list``: remove the named word list ``list``
+
+    Stop words and word lists are only added or removed on POST requests
+    with a valid authenticator.
+    """
+
+    template = ViewPageTemplateFile('word_list.pt')
+
+    def __call__(self):
+        form = self.request.form
+        self.name = form.get('list') or None
+        if form.get('form.buttons.import'):
+            self.handle_import()
+        elif form.get('form.buttons.remove'):
+            self.handle_remove()
+        elif form.get('form.buttons.add_list'):
+            self.handle_add_list()
+        elif form.get('form.buttons.remove_list'):
+            self.handle_remove_list()
+        self.update()
+        return self.template()
+
+    def update(self):
+        form = self.request.form
+        self.search = safe_unicode(form.get('search') or u'').strip() or None
+        self.b_start = int(form.get('b_start', 0))
+        self.b_size = int(form.get('b_size', BATCH_SIZE))
+
+        self.word_list = get_word_list(self.context, create=False,
+                                       name=self.name)
+        if self.word_list is None:
+            # an unknown named list, show the default one instead
+            self.name = None
+            self.word_list = get_word_list(self.context)
+        self.batch = Batch(
+            self.word_list.search(self.search),
+            self.b_size,
+            start=self.b_start
+        )
+
+    def word_lists(self):
+        """The default and named word lists, to switch between them."""
+        lists = [{
+            'name': None,
+            'title': _(u'word_list_default', default=u'Default'),
+            'url': self.list_url(None),
+            'selected': self.name is None,
+        }]
+        word_lists = get_word_lists(self.context, create=False) or {}
+        for name, word_list in word_lists.items():
+            lists.append({
+                'name': name,
+                'title': word_list.title or name,
+                'url': self.list_url(name),
+                'selected': name == self.name,
+            })
+        return lists
+
+    def list_url(self, name):
+        url = '{0}/@@stop-words-list'.format(self.context.absolute_url())
+        if name:
+            url = '{0}?{1}'.format(url, urllib.urlencode({'list': name}))
+        return url
+
+    def _get_word_list(self):
+        return get_word_list(self.context, create=False, name=self.name)
+
+    def handle_import(self):
+        self._check_request()
+        form = self.request.form
+        lines = safe_unicode(form.get('words') or u'').splitlines()
+        upload = form.get('file')
+        if upload:
+            lines.extend(safe_unicode(upload.read()).splitlines())
+
+        word_list = self._get_word_list()
+        if word_list is None:
+            word_list = get_word_list(self.context)
+        new_words = set(
+            word.strip()
+            for word in lines
+            if word.strip() and word not in word_list
+        )
+        try:
+            added = word_list.bulk_import(lines)
+        except InvalidStopWord as error:
+            self._show_message(error.doc(), 'error')
+            return
+        if self.name is None and new_words:
+            # only the default list is used to flag content
+            queue_rescan(added=new_words, portal=self.context)
+
+        self._show_message(
+            _(
+                u'word_list_imported_message',
+                default=u'${count} stop words added.',
+                mapping={'count': added}
+            )
+        )
+
+    def handle_remove(self):
+        self._check_request()
+        word_list = self._get_word_list()
+        if word_list is None:
+            return
+        words = self.request.form.get('remove') or []
+        if not isinstance(words, list):
+            words = [words]
+        words = [safe_unicode(word) for word in words]
+        removed_words = set(
+            word.strip() for word in words if word in word_list
+        )
+        removed = word_list.bulk_remove(words)
+        if self.name is None and removed_words:
+            queue_rescan(removed=removed_words, portal=self.context)
+        self._show_message(
+            _(
+                u'word_list_removed_message',
+                default=u'${count} stop words removed.',
+                mapping={'count': removed}
+            )
+        )
+
+    def handle_add_list(self):
+        self._check_request()
+        form = self.request.form
+        name = (form.get('name') or '').strip()
+        title = safe_unicode(form.get('title') or u'').strip() or None
+        try:
+            add_word_list(str(name), title=title, portal=self.context)
+        except (ValueError, UnicodeEncodeError):
+            self._show_message(
+                _(
+                    u'word_list_invalid_name_message',
+                    default=u'The name is either already used or not valid, '
+                            u'only letters, digits, - and _ can be used.'
+                ),
+                'error'
+            )
+            return
+        self.name = str(name)
+
+    def handle_remove_list(self):
+        self._check_request()
+        if self.name and remove_word_list(self.name, portal=self.context):
+            self._show_message(
+                _(
+                    u'word_list_list_removed_message',
+                    default=u'The word list has been removed.'
+                )
+            )
+        self.name = None
+
+    def _check_request(self):
+        PostOnly(self.request)
+        CheckAuthenticator(self.request)
+
+    def _show_message(self, message, type='info'):
+        api.portal.show_message(
+            message=message,
+            request=self.request,
+            type=type,
+        )
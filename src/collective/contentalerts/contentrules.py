@@ -1,19 +1,250 @@
 # -*- coding: utf-8 -*-
+from Acquisition import aq_base
+from Acquisition import aq_inner
+from Acquisition import aq_parent
+from DateTime import DateTime
 from OFS.SimpleItem import SimpleItem
+from Products.CMFCore.interfaces import ISiteRoot
+from ZODB.POSException import ConflictError
 from collective.contentalerts import _
+from collective.contentalerts.incremental import incremental_scan
 from collective.contentalerts.interfaces import IAlert
 from collective.contentalerts.interfaces import IHasStopWords
 from collective.contentalerts.interfaces import ITextAlertCondition
+from collective.contentalerts.matcher import StopWordsMatcher
+from collective.contentalerts.queue import get_queue
+from collective.contentalerts.stats import EXECUTOR_CACHED
+from collective.contentalerts.stats import EXECUTOR_CALLS
+from collective.contentalerts.stats import EXECUTOR_HITS
+from collective.contentalerts.stats import EXECUTOR_SECONDS
+from collective.contentalerts.stats import MARKER_SECONDS
+from collective.contentalerts.stats import REINDEXED
+from collective.contentalerts.stats import SCANNED_CHARACTERS
+from collective.contentalerts.stats import SLOW_SCANS
+from collective.contentalerts.stats import timer
+from collective.contentalerts.utilities import SLOW_SCAN_RECORD
+from collective.contentalerts.utilities import get_text
+from collective.contentalerts.utilities import get_versioned
+from collective.contentalerts.utilities import resolve_whole_words
+from collective.contentalerts.utilities import set_versioned
+from collective.contentalerts.utilities import stop_words_version
+from collective.contentalerts.utilities import text_digest
+from plone import api
 from plone.app.contentrules.browser.formhelper import AddForm
 from plone.app.contentrules.browser.formhelper import EditForm
+from plone.contentrules.engine.interfaces import IRuleAssignmentManager
+from plone.contentrules.engine.interfaces import IRuleStorage
+from plone.contentrules.rule.interfaces import IExecutable
 from plone.contentrules.rule.interfaces import IRuleElementData
+from plone.registry.interfaces import IRegistry
 from plone.stringinterp.adapters import BaseSubstitution
+from plone.uuid.interfaces import IUUID
+from zope.annotation.interfaces import IAnnotations
+from zope.component import getMultiAdapter
 from zope.component import getUtility
+from zope.component import queryUtility
+from zope.component.interfaces import IObjectEvent
 from zope.formlib import form
 from zope.interface import alsoProvides
 from zope.interface import implementer
 from zope.interface import noLongerProvides
 
+import logging
+import time
+import transaction
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+
+SCANS_KEY = 'collective.contentalerts.scans'
+COMMENT_KEY = 'collective.contentalerts.comment'
+# comment text on plone.app.discussion's comment form
+COMMENT_FORM_FIELD = 'form.widgets.text'
+VERDICT_KEY = 'collective.contentalerts.verdict'
+# stop words lists whose scan result is kept on each object
+MAX_VERDICTS = 8
+# snippets shown at most by the text_alert and comment_alert substitutions,
+# so that texts with lots of stop words still give a readable email
+MAX_SNIPPETS = 50
+
+# catalog indexes that need to be updated whenever an object is flagged
+FLAG_INDEXES = ('has_stop_words', 'stop_words', 'stop_words_flagged', )
+
+FOUND_KEY = 'collective.contentalerts.found'
+FLAGGED_KEY = 'collective.contentalerts.flagged'
+
+
+def remember_scan(request, obj, scan):
+    """Keep the scan of an object's text for the rest of the request.
+
+    :param request: the current request.
+    :param obj: the object whose text was scanned.
+    :param scan: as returned by IAlert.scan.
+    :type scan: collective.contentalerts.utilities.Scan
+    """
+    scans = IAnnotations(request).setdefault(SCANS_KEY, {})
+    scans[(id(aq_base(obj)), scan.version)] = scan
+
+
+def get_remembered_scan(request, obj, text, version):
+    """Get an scan done earlier on this request.
+
+    :param request: the current request.
+    :param obj: the object whose text was scanned, if not known, any scan
+      done with the same text is returned.
+    :param text: the text that needs to be scanned, if it is not the same
+      that was scanned before, the scan is not returned.
+    :param version: version of the stop words list the text needs to be
+      scanned with.
+    :type version: str
+    :returns: the scan or None if there is none.
+    :rtype: collective.contentalerts.utilities.Scan
+    """
+    scans = IAnnotations(request).get(SCANS_KEY)
+    if not scans or version is None:
+        return None
+
+    if obj is not None:
+        scan = scans.get((id(aq_base(obj)), version))
+        candidates = [scan] if scan is not None else []
+    else:
+        candidates = [
+            scan
+            for key, scan in scans.items()
+            if key[1] == version
+        ]
+
+    for scan in candidates:
+        if scan.text is text or scan.text == text:
+            return scan
+    return None
+
+
+def remember_comment(request, comment):
+    """Keep the comment being checked for the rest of the request.
+
+    The comment_alert substitution is adapted to the commented object, so
+    that is how it gets the comment (and its scan).
+
+    :param request: the current request.
+    :param comment: the comment whose text is checked.
+    """
+    IAnnotations(request)[COMMENT_KEY] = comment
+
+
+def get_remembered_comment(request):
+    """Get the last comment checked on this request.
+
+    :param request: the current request.
+    :returns: the comment or None if no comment was checked.
+    """
+    return IAnnotations(request).get(COMMENT_KEY)
+
+
+def get_cached_verdict(obj, digest, version):
+    """Get the result of the last scan of the object, if still valid.
+
+    :param obj: the object whose text is about to be scanned.
+    :param digest: digest of the text about to be scanned.
+    :type digest: str
+    :param version: version of the stop words list it will be scanned with.
+    :type version: str
+    :returns: whether the text had stop words, or None if the text or the
+      stop words changed since the last scan.
+    :rtype: bool
+    """
+    annotations = IAnnotations(obj, None)
+    if annotations is None:
+        return None
+
+    verdict = get_versioned(annotations, VERDICT_KEY, version)
+    if verdict is None or verdict[0] != digest:
+        return None
+    return verdict[1]
+
+
+def cache_verdict(obj, digest, version, has_stop_words):
+    """Keep the result of scanning the object's text on the object itself.
+
+    The text itself is not kept, only its digest, so that unrelated changes
+    on the object do not need a new scan. A result is kept for each stop
+    words list (up to MAX_VERDICTS), so that rules with different lists do
+    not drop each other's.
+    """
+    annotations = IAnnotations(obj, None)
+    if annotations is None:
+        return
+
+    set_versioned(
+        annotations,
+        VERDICT_KEY,
+        version,
+        (digest, has_stop_words),
+        MAX_VERDICTS
+    )
+
+
+def get_found_stop_words(obj):
+    """Get the stop words found on the object's text on its last scan.
+
+    :returns: the stop words, normalized.
+    :rtype: tuple
+    """
+    annotations = IAnnotations(obj, None)
+    if annotations is None:
+        return ()
+    return annotations.get(FOUND_KEY, ())
+
+
+def set_found_stop_words(obj, words):
+    """Keep the stop words found on the object's text.
+
+    :param words: the stop words found, normalized.
+    :type words: tuple
+    :returns: whether they are different from the ones already kept.
+    :rtype: bool
+    """
+    annotations = IAnnotations(obj, None)
+    if annotations is None:
+        return False
+
+    words = tuple(words)
+    if annotations.get(FOUND_KEY, ()) == words:
+        return False
+    if words:
+        annotations[FOUND_KEY] = words
+    else:
+        del annotations[FOUND_KEY]
+    return True
+
+
+def get_flagged_date(obj):
+    """Get when the object was found to have stop words.
+
+    :returns: the date or None if it is not flagged.
+    :rtype: DateTime
+    """
+    annotations = IAnnotations(obj, None)
+    if annotations is None:
+        return None
+    return annotations.get(FLAGGED_KEY)
+
+
+def set_flagged_date(obj, date):
+    """Keep when the object was found to have stop words.
+
+    :param date: the date, or None if it is no longer flagged.
+    :type date: DateTime
+    """
+    annotations = IAnnotations(obj, None)
+    if annotations is None:
+        return
+    if date is not None:
+        annotations[FLAGGED_KEY] = date
+    elif FLAGGED_KEY in annotations:
+        del annotations[FLAGGED_KEY]
+
 
 class TextAlertConditionExecutor(object):
     """The executor for this condition."""
@@ -23,6 +254,21 @@ class TextAlertConditionExecutor(object):
         self.event = event
 
     def __call__(self):
+        # objects taken from the queue are scanned right away
+        defer = getattr(self.element, 'asynchronous', False) and \
+            not isinstance(self.event, DeferredScanEvent)
+        return self.execute(defer=defer)
+
+    def execute(self, defer=False):
+        """Check if the object's text has stop words.
+
+        :param defer: whether to queue the object to be scanned later on,
+          rather than now.
+        :type defer: bool
+        :returns: whether the text has stop words, always False if deferred.
+        :rtype: bool
+        """
+        EXECUTOR_CALLS.increment()
         obj = None
         text = None
 
@@ -31,58 +277,400 @@ class TextAlertConditionExecutor(object):
             if getattr(self.event.comment, 'text', None):
                 obj = self.event.comment
                 text = obj.text
+                remember_comment(self.context.REQUEST, obj)
         # if it's a AT/DX
         elif getattr(self.event, 'object', None):
             obj = self.event.object
-            if getattr(obj, 'getText', None):
-                text = obj.getText()
-            elif getattr(obj, 'text', None):
-                text = obj.text
+            text = get_text(obj)
 
         if not text:
             return False
 
+        if defer and self._defer(obj):
+            return False
+
+        start = time.time()
+        request = self.context.REQUEST
+        whole_words = resolve_whole_words(
+            getattr(self.element, 'whole_words', False) or None
+        )
+        request.set('whole_words', whole_words)
+        # do not let the substitutions use the stop words of another rule
+        # executed on the same request
+        request.set('stop_words', None)
+        request.set('word_list', None)
+
+        alert_utility = getUtility(IAlert)
         stop_words = self.element.stop_words
-        if stop_words is None or stop_words.strip() == u'':
-            stop_words = None
-        else:
-            request = self.context.REQUEST
+        word_list = getattr(self.element, 'word_list', None)
+        if stop_words is not None and stop_words.strip() != u'':
             request.set('stop_words', stop_words)
+            matcher = alert_utility.compile_stop_words(
+                self.element.get_matcher(),
+                whole_words=whole_words
+            )
+        elif word_list:
+            request.set('word_list', word_list)
+            matcher = alert_utility.compile_word_list(
+                word_list,
+                whole_words=whole_words
+            )
+        else:
+            matcher = alert_utility.compile_stop_words(
+                whole_words=whole_words
+            )
 
-        alert_utility = getUtility(IAlert)
+        words = None
+        if not matcher:
+            ret_value = False
+        else:
+            ret_value, words = self._scan(obj, text, matcher)
+
+        self._apply_marker_interface(obj, ret_value, words)
 
-        ret_value = alert_utility.has_stop_words(text, stop_words=stop_words)
-        self._apply_marker_interface(obj, ret_value)
+        elapsed = time.time() - start
+        EXECUTOR_SECONDS.observe(elapsed)
+        if ret_value:
+            EXECUTOR_HITS.increment()
+        self._log_slow_scan(obj, text, matcher, elapsed)
         return ret_value
 
     @staticmethod
-    def _apply_marker_interface(obj, has_stop_words):
-        reindex = False
-        if has_stop_words:
-            alsoProvides(obj, IHasStopWords)
-            reindex = True
-        elif IHasStopWords.providedBy(obj):
-            noLongerProvides(obj, IHasStopWords)
-            reindex = True
+    def _log_slow_scan(obj, text, matcher, elapsed):
+        """Log the check if it took longer than the slow scan threshold.
+
+        :param elapsed: how long the check took, in seconds.
+        :type elapsed: float
+        """
+        threshold = get_slow_scan_threshold()
+        if not threshold or elapsed * 1000 < threshold:
+            return
+
+        SLOW_SCANS.increment()
+        path = getattr(obj, 'getPhysicalPath', None)
+        path = '/'.join(path()) if path is not None else repr(obj)
+        logger.warning(
+            u'Slow scan of {0}: {1:.0f} ms, {2} characters, '
+            u'{3} stop words'.format(
+                path,
+                elapsed * 1000,
+                len(text),
+                len(matcher) if matcher else 0,
+            )
+        )
 
-        if reindex:
-            obj.reindexObject(idxs=('object_provides', ))
+    def _defer(self, obj):
+        """Queue the object to be scanned later on.
+
+        :returns: whether it could be queued.
+        :rtype: bool
+        """
+        uid = IUUID(obj, None)
+        rule_id = get_rule_id(self.element)
+        if uid is None or rule_id is None:
+            return False
+
+        get_queue().put(uid, rule_id)
+        return True
+
+    def _scan(self, obj, text, matcher):
+        """Check if the text has stop words, unless it was already done.
+
+        :returns: whether the text has stop words and which ones, the latter
+          is None if the text was not scanned again.
+        :rtype: tuple
+        """
+        digest = text_digest(text)
+        ret_value = get_cached_verdict(obj, digest, matcher.version)
+        if ret_value is not None:
+            EXECUTOR_CACHED.increment()
+            return ret_value, None
+
+        SCANNED_CHARACTERS.increment(len(text))
+        # find all occurrences (not only whether there is any) so that the
+        # string substitutions used by the rule actions can reuse the scan,
+        # long texts are only scanned again where they changed
+        scan = incremental_scan(obj, text, matcher)
+        remember_scan(self.context.REQUEST, obj, scan)
+
+        ret_value = bool(scan)
+        cache_verdict(obj, digest, matcher.version, ret_value)
+        return ret_value, scan.words
+
+    @staticmethod
+    def _apply_marker_interface(obj, has_stop_words, words=None):
+        """Flag the object as having stop words or not.
+
+        Only the FLAG_INDEXES (and the catalog metadata) are updated,
+        and only if anything changed.
+
+        :param has_stop_words: whether the object has stop words.
+        :type has_stop_words: bool
+        :param words: the stop words found, if known.
+        :type words: tuple
+        """
+        with timer(MARKER_SECONDS):
+            reindex = False
+            if has_stop_words:
+                if not IHasStopWords.providedBy(obj):
+                    alsoProvides(obj, IHasStopWords)
+                    set_flagged_date(obj, DateTime())
+                    reindex = True
+            else:
+                words = ()
+                if IHasStopWords.providedBy(obj):
+                    noLongerProvides(obj, IHasStopWords)
+                    set_flagged_date(obj, None)
+                    reindex = True
+
+            if words is not None and set_found_stop_words(obj, words):
+                reindex = True
+
+            if reindex:
+                obj.reindexObject(idxs=FLAG_INDEXES)
+                REINDEXED.increment()
+
+
+def get_slow_scan_threshold():
+    """Get after how many milliseconds a check is logged as slow.
+
+    :returns: the threshold, 0 if slow checks are not logged.
+    :rtype: int
+    """
+    registry = queryUtility(IRegistry)
+    if registry is None:
+        return 0
+    return registry.get(SLOW_SCAN_RECORD, None) or 0
+
+
+def get_rule_id(condition):
+    """Get the id of the content rule the condition belongs to.
+
+    :returns: the id or None if it is not part of any rule.
+    :rtype: str
+    """
+    storage = queryUtility(IRuleStorage)
+    if storage is None:
+        return None
+
+    condition = aq_base(condition)
+    for rule_id, rule in storage.items():
+        for element in rule.conditions:
+            if aq_base(element) is condition:
+                return rule_id
+    return None
+
+
+@implementer(IObjectEvent)
+class DeferredScanEvent(object):
+    """Event used to run the content rule of an object once it is scanned.
+
+    Like the events from plone.app.discussion, for comments the object is
+    the commented object.
+    """
+
+    def __init__(self, obj):
+        if getattr(obj, 'portal_type', None) == 'Discussion Item':
+            self.comment = obj
+            # comment -> conversation -> commented object
+            self.object = aq_parent(aq_parent(aq_inner(obj)))
+        else:
+            self.object = obj
+
+
+def is_rule_assigned(context, rule_id):
+    """Whether the rule applies to the objects within context.
+
+    As when plone.app.contentrules executes rules, the rule has to be
+    assigned, and enabled, on the context itself or on one of its parents
+    that lets rules bubble, and rules have to be active on the site.
+
+    :param context: the container of the object.
+    :param rule_id: the id of the content rule.
+    :type rule_id: str
+    :rtype: bool
+    """
+    storage = queryUtility(IRuleStorage)
+    if storage is None or not getattr(storage, 'active', True):
+        return False
+
+    bubbled = False
+    while context is not None:
+        assignments = IRuleAssignmentManager(context, None)
+        if assignments is not None:
+            assignment = assignments.get(rule_id)
+            if (assignment is not None and assignment.enabled and
+                    (assignment.bubbles or not bubbled)):
+                return True
+        if ISiteRoot.providedBy(context):
+            break
+        context = aq_parent(aq_inner(context))
+        bubbled = True
+    return False
+
+
+def execute_deferred(rule_id, obj):
+    """Scan an object that was queued and run the rule actions if needed.
+
+    All the rule conditions are checked again, the text alert ones now
+    scanning the object, as plone.app.contentrules would: the rule is
+    skipped if it is disabled, or no longer assigned where the object is.
+
+    :param rule_id: the id of the content rule whose condition queued the
+      object.
+    :type rule_id: str
+    :param obj: the object to scan.
+    :returns: the rule if its actions were run, None otherwise.
+    """
+    rule = getUtility(IRuleStorage).get(rule_id)
+    if rule is None or not rule.enabled:
+        return None
+
+    event = DeferredScanEvent(obj)
+    context = aq_parent(aq_inner(event.object))
+    if not is_rule_assigned(context, rule_id):
+        return None
+
+    executable = getMultiAdapter((context, rule, event), IExecutable)
+    if not executable():
+        return None
+    return rule
+
+
+def rescan(obj, matcher):
+    """Scan an object again and flag it, or not, accordingly.
+
+    No content rule actions are run, see collective.contentalerts.rescan.
+
+    Without stop words the object is left as it is: it could have been
+    flagged by a rule's own stop words or word list.
+
+    :param obj: the object to scan.
+    :param matcher: the stop words to scan it with.
+    :type matcher: StopWordsMatcher
+    :returns: whether the object has stop words, None if it was not scanned.
+    :rtype: bool
+    """
+    if matcher is None:
+        return None
+
+    text = get_text(obj)
+    scan = None
+    if text:
+        scan = getUtility(IAlert).scan(text, stop_words=matcher)
+        cache_verdict(obj, text_digest(text), matcher.version, bool(scan))
+
+    words = scan.words if scan else ()
+    TextAlertConditionExecutor._apply_marker_interface(obj, bool(scan), words)
+    return bool(scan)
+
+
+def process_queue(portal, limit=None):
+    """Scan the objects waiting on the queue and run their rules actions.
+
+    Objects queued without a rule (because the default stop words changed)
+    are only flagged or unflagged.
+
+    Each object is processed on a savepoint of its own: if scanning it or
+    running the rule actions fails, the error is logged and the object is
+    dropped from the queue, so that it does not block the ones after it.
+
+    :param portal: the Plone site.
+    :param limit: how many objects to scan at most, all if not given.
+    :type limit: int
+    :returns: how many objects have been taken from the queue.
+    :rtype: int
+    """
+    queue = get_queue(portal, create=False)
+    if queue is None:
+        return 0
+
+    catalog = api.portal.get_tool('portal_catalog')
+    entries = queue.take(limit)
+    matcher = None
+    # objects whose rule asked to stop executing further rules
+    stopped = set()
+    for uid, rule_id, queued in entries:
+        if uid in stopped:
+            continue
+        brains = catalog.unrestrictedSearchResults(UID=uid)
+        if not brains:
+            continue
+
+        savepoint = transaction.savepoint(optimistic=True)
+        try:
+            obj = brains[0]._unrestrictedGetObject()
+            if rule_id is None:
+                if matcher is None:
+                    matcher = getUtility(IAlert).compile_stop_words()
+                rescan(obj, matcher)
+                continue
+            rule = execute_deferred(rule_id, obj)
+            if rule is not None and rule.stop:
+                stopped.add(uid)
+        except ConflictError:
+            raise
+        except Exception:
+            savepoint.rollback()
+            logger.exception(
+                u'Could not process {0} (rule {1}), it is dropped from the '
+                u'queue'.format(brains[0].getPath(), rule_id)
+            )
+    return len(entries)
 
 
 @implementer(ITextAlertCondition, IRuleElementData)
 class TextAlertCondition(SimpleItem):
     """The persistent implementation of the text alert condition."""
     stop_words = None
+    word_list = None
+    asynchronous = False
+    whole_words = False
     element = 'collective.contentalerts.TextAlert'
 
+    # (stop words, whole words, matcher) tuple, not persisted
+    _v_matcher = None
+
     @property
     def summary(self):
         return _(
             u'contentrules_text_alert_condition_summary',
-            default=u'Provide a stop words list, one per line, or leave it '
-                    u'empty to use the shared one (registry based).'
+            default=u'Provide a stop words list, one per line, choose a '
+                    u'named word list, or leave both empty to use the shared '
+                    u'one (registry based).'
         )
 
+    def get_matcher(self):
+        """Get the compiled stop words of this condition.
+
+        The matcher is kept on a volatile attribute, so that it is only
+        compiled again when the stop words (or the whole words mode) change.
+
+        :returns: the matcher or None if the condition has no stop words.
+        :rtype: StopWordsMatcher
+        """
+        stop_words = self.stop_words
+        if stop_words is None or stop_words.strip() == u'':
+            return None
+
+        whole_words = resolve_whole_words(self.whole_words or None)
+        cached = self._v_matcher
+        if cached is None or cached[1] != whole_words or (
+                cached[0] is not stop_words and cached[0] != stop_words):
+            alert_utility = getUtility(IAlert)
+            matcher = alert_utility.compile_stop_words(
+                stop_words,
+                whole_words=whole_words
+            )
+            cached = (stop_words, whole_words, matcher)
+            self._v_matcher = cached
+        return cached[2]
+
+
+def invalidate_condition_matcher(condition, event):
+    """Drop the compiled stop words once the condition is edited."""
+    condition._v_matcher = None
+
 
 class TextAlertConditionAddForm(AddForm):
     form_fields = form.FormFields(ITextAlertCondition)
@@ -109,13 +697,58 @@ class AlertSubstitution(BaseSubstitution):
 
     def safe_call(self):
         text = self._get_text()
-        stop_words = self._get_stop_words()
+        whole_words = resolve_whole_words(
+            self.context.REQUEST.get('whole_words')
+        )
+        stop_words = self._get_stop_words(whole_words)
 
         alert_utility = getUtility(IAlert)
-        return alert_utility.get_snippets(text, stop_words=stop_words)
+        scan = get_remembered_scan(
+            self.context.REQUEST,
+            self._get_scanned_object(),
+            text,
+            self._get_version(stop_words, whole_words)
+        )
+        if scan is None:
+            scan = alert_utility.scan(
+                text,
+                stop_words=stop_words,
+                whole_words=whole_words
+            )
+        return alert_utility.format_snippets(
+            scan,
+            max_snippets=MAX_SNIPPETS
+        )
 
-    def _get_stop_words(self):
-        return self.context.REQUEST.get('stop_words') or None
+    def _get_stop_words(self, whole_words=None):
+        request = self.context.REQUEST
+        word_list = request.get('word_list')
+        if word_list:
+            matcher = getUtility(IAlert).compile_word_list(
+                word_list,
+                whole_words=whole_words
+            )
+            # an empty list, rather than the default stop words, if the word
+            # list no longer exists
+            return matcher or u''
+        return request.get('stop_words') or None
+
+    @staticmethod
+    def _get_version(stop_words, whole_words=False):
+        if isinstance(stop_words, StopWordsMatcher):
+            return stop_words.version
+        if stop_words is not None:
+            return stop_words_version(stop_words, whole_words)
+
+        matcher = getUtility(IAlert).compile_stop_words(
+            whole_words=whole_words
+        )
+        if matcher is None:
+            return None
+        return matcher.version
+
+    def _get_scanned_object(self):
+        return self.context
 
     def _get_text(self):
         raise NotImplemented
@@ -127,12 +760,7 @@ class TextAlertSubstitution(AlertSubstitution):
     description = _(u'Text alert snippets')
 
     def _get_text(self):
-        if getattr(self.context, 'getText', None):
-            return self.context.getText()
-        elif getattr(self.context, 'text', None):
-            return self.context.text
-
-        return u''
+        return get_text(self.context) or u''
 
 
 class CommentAlertSubstitution(AlertSubstitution):
@@ -140,17 +768,18 @@ class CommentAlertSubstitution(AlertSubstitution):
     category = _(u'Comments')
     description = _(u'Comment alert snippets')
 
+    def _get_scanned_object(self):
+        # the context is the commented object, the comment is the one the
+        # text alert condition checked on this request
+        return get_remembered_comment(self.context.REQUEST)
+
     def _get_text(self):
-        # Update this once p.a.discussion is updated to >2.3.3
-        sdm = getattr(self.context, 'session_data_manager', None)
-        session = {}
-        if sdm:
-            data = sdm.getSessionData(create=False)
-            if data:
-                session = data
-        comment = session.get('comment', {})
-        text = comment.get('text', None)
-        if text is not None:
-            return text
-
-        return u''
+        comment = self._get_scanned_object()
+        if comment is not None:
+            return getattr(comment, 'text', None) or u''
+        # no text alert condition checked a comment on this request, use
+        # the one being posted on plone.app.discussion's comment form
+        text = self.context.REQUEST.form.get(COMMENT_FORM_FIELD) or u''
+        if isinstance(text, str):
+            text = text.decode('utf-8', 'replace')
+        return text
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Get the raw text of the fields of an object, to search stop words on.
+
+Only the raw source of each field is read (e.g. ``getRaw`` on Archetypes,
+``RichTextValue.raw`` on Dexterity), so that scanning never goes through
+portal_transforms. Register an ITextExtractor adapter for a type to change
+which fields are scanned, or to make it cheaper.
+
+The Archetypes, Dexterity and comments extractors are only registered if
+the package they are for is installed.
+"""
+
+
+# fields read first, from all objects
+COMMON_FIELDS = ('title', 'description', )
+
+
+class BaseTextExtractor(object):
+
+    def __init__(self, context):
+        self.context = context
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from Products.Archetypes.interfaces import IBaseObject
+from collective.contentalerts.extractors import BaseTextExtractor
+from collective.contentalerts.extractors import COMMON_FIELDS
+from collective.contentalerts.interfaces import ITextExtractor
+from zope.component import adapter
+from zope.interface import implementer
+
+
+@implementer(ITextExtractor)
+@adapter(IBaseObject)
+class ArchetypesTextExtractor(BaseTextExtractor):
+    """Title, description and the raw value of all text fields."""
+
+    def __call__(self):
+        yield self.context.Title()
+        yield self.context.Description()
+        for field in self.context.Schema().fields():
+            if field.type == 'text' and field.getName() not in COMMON_FIELDS:
+                yield field.getRaw(self.context)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.extractors import BaseTextExtractor
+from collective.contentalerts.interfaces import ITextExtractor
+from plone.app.discussion.interfaces import IComment
+from zope.component import adapter
+from zope.interface import implementer
+
+
+@implementer(ITextExtractor)
+@adapter(IComment)
+class CommentTextExtractor(BaseTextExtractor):
+    """Comments only have their text."""
+
+    def __call__(self):
+        yield self.context.text
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.extractors import BaseTextExtractor
+from collective.contentalerts.extractors import COMMON_FIELDS
+from collective.contentalerts.interfaces import ITextExtractor
+from plone.app.textfield.interfaces import IRichText
+from plone.dexterity.interfaces import IDexterityContent
+from plone.dexterity.utils import iterSchemata
+from zope.component import adapter
+from zope.interface import implementer
+from zope.schema import getFieldsInOrder
+from zope.schema.interfaces import IText
+
+
+@implementer(ITextExtractor)
+@adapter(IDexterityContent)
+class DexterityTextExtractor(BaseTextExtractor):
+    """Title, description and all text fields, behaviors ones included.
+
+    Rich text fields are read from their raw source.
+    """
+
+    def __call__(self):
+        yield self.context.title
+        yield self.context.description
+
+        seen = set(COMMON_FIELDS)
+        for schema in iterSchemata(self.context):
+            adapted = schema(self.context, None)
+            if adapted is None:
+                continue
+            for name, field in getFieldsInOrder(schema):
+                if name in seen:
+                    continue
+                seen.add(name)
+                if IRichText.providedBy(field):
+                    # a RichTextValue, but plain text is also accepted
+                    value = field.get(adapted)
+                    yield getattr(value, 'raw', value)
+                elif IText.providedBy(field):
+                    yield field.get(adapted)
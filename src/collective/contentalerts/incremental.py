@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""Scan long texts again only where they changed since the last scan.
+
+The text is split in blocks whose boundaries depend on the text around
+them (not on their offset), so that an edit only changes the blocks it
+touches. Each block is normalized on its own and fingerprinted, then
+compared with the fingerprints kept from the last scan: only the changed
+blocks, plus a margin as long as the longest stop word on each side, are
+scanned again, the occurrences found before on the unchanged blocks are
+reused.
+
+The normalized text is needed for the snippets, so it is still joined
+again on every scan, but blocks that did not change are taken from a cache
+instead of normalized again.
+"""
+from collective.contentalerts.interfaces import IAlert
+from collective.contentalerts.stats import MATCH_SECONDS
+from collective.contentalerts.stats import timer
+from collective.contentalerts.utilities import Alert
+from collective.contentalerts.utilities import Scan
+from collective.contentalerts.utilities import get_versioned
+from collective.contentalerts.utilities import set_versioned
+from collective.contentalerts.utilities import text_digest
+from operator import itemgetter
+from zope.annotation.interfaces import IAnnotations
+from zope.component import getUtility
+
+import re
+import zlib
+
+
+INCREMENTAL_KEY = 'collective.contentalerts.incremental'
+# stop words lists whose state is kept on each object, states are big
+MAX_STATES = 2
+
+# shorter texts are always fully scanned, without keeping any state
+MIN_TEXT_SIZE = 20000
+
+# a block ends after a piece of text whose checksum has these bits unset,
+# once it is at least MIN_BLOCK_SIZE long (and always at MAX_BLOCK_SIZE)
+MIN_BLOCK_SIZE = 1024
+MAX_BLOCK_SIZE = 8192
+BOUNDARY_MASK = 0x7
+
+# characters of the normalized blocks kept at most (up to 8 MB on UCS-4
+# builds), the cache is emptied once they would be more
+NORMALIZED_CACHE_CHARS = 2 * 1024 * 1024
+
+# pieces of text end on a new line or the end of a tag, neither can be
+# part of an HTML entity nor a whitespace run
+PIECE_RE = re.compile(r'[^\n>]*[\n>]|[^\n>]+$')
+
+
+class NormalizedCache(dict):
+    """Normalized blocks, keyed by the digest of the block.
+
+    Bounded by the characters of the blocks rather than by their number,
+    as blocks can be up to MAX_BLOCK_SIZE long.
+    """
+
+    chars = 0
+
+    def add(self, digest, text):
+        if self.chars + len(text) > NORMALIZED_CACHE_CHARS:
+            self.clear()
+        self[digest] = text
+        self.chars += len(text)
+
+    def clear(self):
+        super(NormalizedCache, self).clear()
+        self.chars = 0
+
+
+# shared by all threads
+_normalized_cache = NormalizedCache()
+
+
+def split_blocks(text):
+    """Split a text on blocks whose boundaries only depend on its content.
+
+    :param text: any text.
+    :type text: unicode
+    :returns: the blocks, joined they are the text again.
+    :rtype: list of unicode
+    """
+    blocks = []
+    current = []
+    size = 0
+    for piece in PIECE_RE.findall(text):
+        current.append(piece)
+        size += len(piece)
+        if size < MIN_BLOCK_SIZE:
+            continue
+        if isinstance(piece, unicode):
+            piece = piece.encode('utf-8')
+        checksum = zlib.crc32(piece)
+        if size >= MAX_BLOCK_SIZE or not checksum & BOUNDARY_MASK:
+            blocks.append(u''.join(current))
+            current = []
+            size = 0
+    if current:
+        blocks.append(u''.join(current))
+    return blocks
+
+
+def normalize_blocks(blocks):
+    """Normalize each block as html_normalize does with the whole text.
+
+    Whitespace runs that span two blocks are collapsed to a single space,
+    so that joining the normalized blocks gives the whole text normalized.
+    Only whitespace is collapsed, not the spaces that entities (e.g.
+    ``&nbsp;``) stand for, as html_normalize does.
+    Blocks already normalized by this process are taken from a cache.
+
+    :param blocks: as returned by split_blocks.
+    :type blocks: list of unicode
+    :returns: the normalized blocks and their fingerprints: the digest of
+      the block, whether its first space was dropped and its normalized
+      length.
+    :rtype: tuple
+    """
+    normalize = Alert.html_normalize
+    normalized = []
+    fingerprints = []
+    after_space = False
+    for block in blocks:
+        digest = text_digest(block)
+        text = _normalized_cache.get(digest)
+        if text is None:
+            text = normalize(block)
+            _normalized_cache.add(digest, text)
+        # the whitespace run goes on from the previous block
+        dropped = after_space and block[:1].isspace()
+        if dropped:
+            text = text[1:]
+        if block:
+            after_space = block[-1].isspace()
+        normalized.append(text)
+        fingerprints.append((digest, dropped, len(text)))
+    return normalized, tuple(fingerprints)
+
+
+def scan_blocks(text, matcher, state=None):
+    """Scan a text, reusing the result of the last scan of its previous text.
+
+    :param text: the text to scan.
+    :type text: unicode
+    :param matcher: the stop words to search for.
+    :type matcher: StopWordsMatcher
+    :param state: as returned by the last call for the previous text.
+    :type state: tuple
+    :returns: the scan and the state to pass on the next call.
+    :rtype: tuple
+    """
+    normalized_blocks, blocks = normalize_blocks(split_blocks(text))
+    normalized_text = u''.join(normalized_blocks)
+    digest = text_digest(normalized_text)
+
+    with timer(MATCH_SECONDS):
+        if state is not None and state[0] == matcher.version:
+            if state[1] == digest:
+                matches = list(state[3])
+            else:
+                matches = _rescan(normalized_text, blocks, state, matcher)
+        else:
+            matches = sorted(matcher.finditer(normalized_text), key=_order)
+
+    scan = Scan(text, normalized_text, matcher, matches)
+    return scan, (matcher.version, digest, blocks, tuple(matches))
+
+
+def _rescan(text, blocks, state, matcher):
+    """Find the occurrences on the changed blocks, reuse the other ones."""
+    old_blocks = state[2]
+    old_matches = state[3]
+
+    # blocks that did not change at the beginning and at the end
+    shortest = min(len(blocks), len(old_blocks))
+    prefix = 0
+    changed_start = 0
+    while prefix < shortest and blocks[prefix] == old_blocks[prefix]:
+        changed_start += blocks[prefix][-1]
+        prefix += 1
+    suffix = 0
+    suffix_size = 0
+    while (suffix < shortest - prefix and
+           blocks[-1 - suffix] == old_blocks[-1 - suffix]):
+        suffix_size += blocks[-1 - suffix][-1]
+        suffix += 1
+    changed_end = len(text) - suffix_size
+    shift = len(text) - sum(block[-1] for block in old_blocks)
+
+    # occurrences can reach that far from the changed blocks, one more
+    # character is needed to know if they are whole words
+    margin = matcher.max_length + 1
+    window_start = max(0, changed_start - margin)
+    window_end = min(len(text), changed_end + margin)
+
+    matches = [match for match in old_matches if match[0] < window_start]
+    matches.extend(matcher.finditer(text, window_start, window_end))
+    matches.extend(
+        (start + shift, end + shift, position)
+        for start, end, position in old_matches
+        if end + shift > window_end
+    )
+    matches.sort(key=_order)
+    return matches
+
+
+# occurrences are sorted as StopWordsMatcher.finditer yields them
+_order = itemgetter(1, 0, 2)
+
+
+def incremental_scan(obj, text, matcher):
+    """Scan the text of an object, only where it changed since last time.
+
+    The state needed is kept on an annotation of the object, for each of
+    the last MAX_STATES stop words lists. Short (or not unicode) texts and
+    stop words with patterns (whose occurrences can be of any length) are
+    scanned in full.
+
+    :param obj: the object whose text is scanned.
+    :param text: the text of the object.
+    :type text: unicode
+    :param matcher: the stop words to search for.
+    :type matcher: StopWordsMatcher
+    :returns: the scan.
+    :rtype: collective.contentalerts.utilities.Scan
+    """
+    annotations = IAnnotations(obj, None)
+    if (annotations is None or matcher.max_length is None or
+            not isinstance(text, unicode) or len(text) < MIN_TEXT_SIZE):
+        if annotations is not None and INCREMENTAL_KEY in annotations:
+            del annotations[INCREMENTAL_KEY]
+        return getUtility(IAlert).scan(text, stop_words=matcher)
+
+    scan, state = scan_blocks(
+        text,
+        matcher,
+        get_versioned(annotations, INCREMENTAL_KEY, matcher.version)
+    )
+    set_versioned(
+        annotations,
+        INCREMENTAL_KEY,
+        matcher.version,
+        state,
+        MAX_STATES
+    )
+    return scan
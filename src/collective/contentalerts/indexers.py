@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.contentrules import get_flagged_date
+from collective.contentalerts.contentrules import get_found_stop_words
+from collective.contentalerts.interfaces import IHasStopWords
+from plone.indexer import indexer
+from zope.interface import Interface
+
+
+@indexer(Interface)
+def has_stop_words(obj):
+    return IHasStopWords.providedBy(obj)
+
+
+@indexer(Interface)
+def stop_words(obj):
+    if not IHasStopWords.providedBy(obj):
+        return ()
+    return get_found_stop_words(obj)
+
+
+@indexer(Interface)
+def stop_words_flagged(obj):
+    if not IHasStopWords.providedBy(obj):
+        return None
+    return get_flagged_date(obj)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Module where all interfaces, events and exceptions live."""
 from collective.contentalerts import _
+from collective.contentalerts.patterns import check_stop_words
 from zope import schema
 from zope.interface import Interface
 
@@ -20,42 +21,178 @@ class IStopWords(Interface):
         description=_(
             u'settings_stop_words_list_description',
             default=u'Words/sentences that will generate an alert, '
-                    u'one per line.'
+                    u'one per line. Use * as a wildcard (e.g. free mon*y) '
+                    u'or start a line with re: for a regular expression.'
         ),
         required=False,
+        constraint=check_stop_words,
+    )
+
+    whole_words = schema.Bool(
+        title=_(
+            u'settings_stop_words_whole_words_title',
+            default=u'Whole words'
+        ),
+        description=_(
+            u'settings_stop_words_whole_words_description',
+            default=u'Only match stop words as whole words, '
+                    u'e.g. "ass" does not match "class".'
+        ),
+        required=False,
+        default=False,
+    )
+
+    slow_scan_threshold = schema.Int(
+        title=_(
+            u'settings_stop_words_slow_scan_threshold_title',
+            default=u'Slow scan threshold'
+        ),
+        description=_(
+            u'settings_stop_words_slow_scan_threshold_description',
+            default=u'Log the path of the objects, and the size of their '
+                    u'text and of the stop words list, when checking them '
+                    u'takes longer than these milliseconds. 0 to not log '
+                    u'them.'
+        ),
+        required=False,
+        default=0,
+        min=0,
     )
 
 
 class IAlert(Interface):
     """Utility to know if a given text contains stop words."""
 
-    def get_snippets(text, stop_words=None, chars=150):
+    def get_snippets(text, stop_words=None, chars=150, max_snippets=None,
+                     whole_words=None):
         """Returns the stop words found in the text surrounded by some text.
 
+        Stop words close enough to share their surrounding text are shown
+        together on a single snippet.
+
         :param text: where stop words will be searched on.
         :type text: str
         :param chars: how many surrounding characters should be shown around
             a stop word.
         :type chars: int
-        :param stop_words: list of words that will be searched on the text.
+        :param max_snippets: how many snippets to show at most, all stop
+            words found are listed nevertheless. If not provided, no limit.
+        :type max_snippets: int
+        :param stop_words: list of words that will be searched on the text,
+            one per line, or a matcher as returned by compile_stop_words.
             If not provided the default.
-        :type stop_words: list
+        :type stop_words: unicode or StopWordsMatcher
+        :param whole_words: whether stop words only match whole words
+            (``ass`` does not match ``class``), if not provided the registry
+            setting is used. Ignored if stop_words is a matcher.
+        :type whole_words: bool
         :returns: formatted text with a list of the stop words found and the
           snippets below them.
         :rtype: str
         """
 
-    def has_stop_words(text, stop_words=None):
+    def scan(text, stop_words=None, whole_words=None):
+        """Finds all the occurrences of the stop words in the text.
+
+        :param text: where stop words will be searched on.
+        :type text: str
+        :param stop_words: list of words that will be searched on the text,
+            one per line, or a matcher as returned by compile_stop_words.
+            If not provided the default.
+        :type stop_words: unicode or StopWordsMatcher
+        :param whole_words: whether stop words only match whole words
+            (``ass`` does not match ``class``), if not provided the registry
+            setting is used. Ignored if stop_words is a matcher.
+        :type whole_words: bool
+        :returns: the occurrences found, or None if there is no text or no
+          stop words.
+        :rtype: collective.contentalerts.utilities.Scan
+        """
+
+    def format_snippets(scan, chars=150, max_snippets=None):
+        """Same as get_snippets but for an already scanned text.
+
+        :param scan: as returned by scan.
+        :type scan: collective.contentalerts.utilities.Scan
+        :param chars: how many surrounding characters should be shown around
+            a stop word.
+        :type chars: int
+        :param max_snippets: how many snippets to show at most.
+        :type max_snippets: int
+        :returns: formatted text with a list of the stop words found and the
+          snippets below them.
+        :rtype: str
+        """
+
+    def find_matches(text, stop_words=None, whole_words=None):
+        """Finds each occurrence of the stop words on the text, lazily.
+
+        Occurrences are generated as the text is scanned (in the order in
+        which they end on the text), so that callers can stop early.
+
+        :param text: where stop words will be searched on.
+        :type text: str
+        :param stop_words: list of words that will be searched on the text,
+            one per line, or a matcher as returned by compile_stop_words.
+            If not provided the default.
+        :type stop_words: unicode or StopWordsMatcher
+        :param whole_words: whether stop words only match whole words
+            (``ass`` does not match ``class``), if not provided the registry
+            setting is used. Ignored if stop_words is a matcher.
+        :type whole_words: bool
+        :returns: the occurrences, with where they start and end on the
+          normalized text, the stop word normalized and as it was written.
+        :rtype: iterator of collective.contentalerts.utilities.Match
+        """
+
+    def has_stop_words(text, stop_words=None, whole_words=None):
         """Checks if the given text has words from the provided stop words.
 
         :param text: where stop words will be searched on.
         :type text: str
-        :param stop_words: list of words that will be searched on the text.
-        :type stop_words: list
+        :param stop_words: list of words that will be searched on the text,
+            one per line, or a matcher as returned by compile_stop_words.
+            If not provided the default.
+        :type stop_words: unicode or StopWordsMatcher
+        :param whole_words: whether stop words only match whole words
+            (``ass`` does not match ``class``), if not provided the registry
+            setting is used. Ignored if stop_words is a matcher.
+        :type whole_words: bool
         :returns: whether the text contains words from the stop words.
         :rtype: bool
         """
 
+    def compile_stop_words(stop_words=None, whole_words=None):
+        """Get a matcher that can be reused to search for the stop words.
+
+        Whole words are matched on the same single pass over the text.
+
+        :param stop_words: list of words, one per line. If not provided the
+            default: the registry ones together with the site word list.
+        :type stop_words: unicode
+        :param whole_words: whether stop words only match whole words, if not
+            provided the registry setting is used.
+        :type whole_words: bool
+        :returns: the compiled stop words or None if there are none.
+        :rtype: StopWordsMatcher
+        """
+
+    def compile_word_list(name, whole_words=None):
+        """Get a matcher for a named stop words list of the site.
+
+        It is only compiled the first time it is needed, and then shared by
+        all content rules and threads until the list changes.
+
+        :param name: the name of the word list.
+        :type name: str
+        :param whole_words: whether stop words only match whole words, if not
+            provided the registry setting is used.
+        :type whole_words: bool
+        :returns: the compiled stop words or None if the list does not exist
+            or is empty.
+        :rtype: StopWordsMatcher
+        """
+
 
 class ITextAlertCondition(Interface):
     """Schema for the text alert plone.app.contentrules condition."""
@@ -68,11 +205,76 @@ class ITextAlertCondition(Interface):
         description=_(
             u'contentrules_text_alert_condition_field_description',
             default=u'One stop word per line, keep it empty if you want to '
-                    u'use the generic one.'
+                    u'use the generic one. Use * as a wildcard or start a '
+                    u'line with re: for a regular expression.'
         ),
         required=False,
+        constraint=check_stop_words,
     )
 
+    word_list = schema.Choice(
+        title=_(
+            u'contentrules_text_alert_condition_word_list_title',
+            default=u'Word list'
+        ),
+        description=_(
+            u'contentrules_text_alert_condition_word_list_description',
+            default=u'Use one of the named word lists of the site '
+                    u'(see @@stop-words-list), only if there are no stop '
+                    u'words above.'
+        ),
+        vocabulary='collective.contentalerts.WordLists',
+        required=False,
+    )
+
+    asynchronous = schema.Bool(
+        title=_(
+            u'contentrules_text_alert_condition_asynchronous_title',
+            default=u'Deferred'
+        ),
+        description=_(
+            u'contentrules_text_alert_condition_asynchronous_description',
+            default=u'Do not search for stop words while the object is '
+                    u'being saved, but queue it to be scanned later on '
+                    u'(see @@contentalerts-process-queue). The rule actions '
+                    u'are run once it is scanned.'
+        ),
+        required=False,
+        default=False,
+    )
+
+    whole_words = schema.Bool(
+        title=_(
+            u'contentrules_text_alert_condition_whole_words_title',
+            default=u'Whole words'
+        ),
+        description=_(
+            u'contentrules_text_alert_condition_whole_words_description',
+            default=u'Only match stop words as whole words, e.g. "ass" does '
+                    u'not match "class". Always the case if it is enabled on '
+                    u'the stop words settings.'
+        ),
+        required=False,
+        default=False,
+    )
+
+
+class ITextExtractor(Interface):
+    """Adapter that gets the texts to search for stop words on an object.
+
+    Register one for a content type to choose which fields are scanned.
+    """
+
+    def __call__():
+        """Get the raw source of each field to search for stop words on.
+
+        Raw sources should be used (e.g. ``getRaw`` rather than ``getText``
+        on Archetypes), so that no transform needs to run.
+
+        :returns: the texts, None values are skipped.
+        :rtype: iterator of str or unicode
+        """
+
 
 class IHasStopWords(Interface):
     """Marker interface attached to objects that have stop words."""
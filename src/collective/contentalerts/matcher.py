@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""Multi-pattern matching engine used by the alert utility."""
+from collections import deque
+from collective.contentalerts.patterns import compile_patterns
+from itertools import islice
+
+import heapq
+import re
+
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_word_char(char):
+    """Whether the character can be part of a word, as regex \\w does."""
+    return char.isalnum() or char == u'_'
+
+
+def tokenize(text):
+    """Get the set of words of a text.
+
+    :param text: normalized text.
+    :type text: unicode
+    :rtype: set of unicode
+    """
+    return set(WORD_RE.findall(text))
+
+
+class StopWordsMatcher(object):
+    """Aho-Corasick automaton that finds all stop words in a single pass.
+
+    The automaton is compiled once from an already normalized list of stop
+    words, then any amount of texts can be scanned with it: the cost of a scan
+    grows with the length of the text and the number of occurrences found,
+    not with the number of stop words.
+
+    Empty stop words are ignored, as they would match everywhere.
+
+    With ``whole_words`` occurrences that are part of a longer word (e.g.
+    ``ass`` on ``class``) are skipped, as a regex ``\\b`` boundary would do,
+    while the text is still scanned only once for all stop words.
+
+    Wildcard and regular expression stop words (``patterns``) can not be
+    part of the automaton, they are combined into as few regular expressions
+    as possible instead (see collective.contentalerts.patterns).
+
+    In whole words mode, an occurrence of a single word stop word is exactly
+    one of the words of the text, and every word of a phrase has to be one of
+    them too: ``check_words`` answers most texts out of the set of their
+    words, without walking the automaton at all.
+    """
+
+    def __init__(self, words, version=None, originals=None,
+                 whole_words=False, patterns=()):
+        """Compile the automaton.
+
+        :param words: normalized stop words, the position of each word within
+          this sequence is what gets reported on matches.
+        :type words: sequence of unicode
+        :param version: identifies the stop words list the automaton was
+          compiled from.
+        :type version: str
+        :param originals: the stop words as they were written before being
+          normalized, on the same positions as words (followed by the
+          patterns). If not given, words.
+        :type originals: sequence of unicode
+        :param whole_words: whether to only report occurrences that are
+          whole words.
+        :type whole_words: bool
+        :param patterns: pairs of the normalized stop word and its regular
+          expression source, their positions follow the ones of words.
+        :type patterns: sequence of tuples
+        """
+        patterns = tuple(patterns)
+        self.words = tuple(words) + tuple(word for word, source in patterns)
+        self.version = version
+        if originals is None:
+            self.originals = self.words
+        else:
+            self.originals = tuple(originals)
+        self.whole_words = whole_words
+        self._lengths = tuple(len(word) for word in self.words)
+        # patterns can match texts of any length
+        self.max_length = None
+        if not patterns:
+            self.max_length = max(self._lengths or (0, ))
+        # whether each word starts/ends with a word character, only those
+        # edges need a word boundary on the text
+        self._starts_word = tuple(
+            bool(word) and is_word_char(word[0]) for word in self.words
+        )
+        self._ends_word = tuple(
+            bool(word) and is_word_char(word[-1]) for word in self.words
+        )
+        self._goto = [{}]
+        self._output = [()]
+        for position, word in enumerate(words):
+            if word:
+                self._add(word, position)
+        self._fail = self._build_failure_links()
+        self._single_words = frozenset()
+        self._phrases = ()
+        self.tokenized = bool(whole_words) and not patterns
+        if self.tokenized:
+            self._split_words(words)
+        self._patterns = compile_patterns(
+            (
+                (len(words) + index, source)
+                for index, (word, source) in enumerate(patterns)
+            ),
+            whole_words=whole_words,
+        )
+
+    def _add(self, word, position):
+        """Add the word to the trie that backs the automaton."""
+        goto = self._goto
+        state = 0
+        for char in word:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto.append({})
+                self._output.append(())
+                goto[state][char] = next_state
+            state = next_state
+        self._output[state] += (position, )
+
+    def _split_words(self, words):
+        """Sort the stop words into single words and phrases.
+
+        Phrases are kept as the set of their words. Stop words without any
+        word character (e.g. ``$$$``) can be anywhere on a text, they can
+        only be found by the automaton.
+        """
+        single_words = set()
+        phrases = set()
+        for word in words:
+            if not word:
+                continue
+            tokens = WORD_RE.findall(word)
+            if not tokens:
+                self.tokenized = False
+                return
+            if len(tokens) == 1 and len(tokens[0]) == len(word):
+                single_words.add(word)
+            else:
+                phrases.add(frozenset(tokens))
+        self._single_words = frozenset(single_words)
+        self._phrases = tuple(phrases)
+
+    def _build_failure_links(self):
+        """Compute, breadth first, where to continue when a transition fails.
+
+        Outputs of the failure state are merged into each state so that words
+        that are suffixes of other words are reported as well.
+        """
+        goto = self._goto
+        output = self._output
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fallback = goto[fallback].get(char, 0)
+                fail[next_state] = fallback
+                if output[fallback]:
+                    output[next_state] += output[fallback]
+        return fail
+
+    def __len__(self):
+        return len(self.words)
+
+    def live_originals(self):
+        """The stop words of the matcher, as they were written."""
+        return set(self.originals)
+
+    def finditer(self, text, start=0, end=None):
+        """Yield every occurrence of every stop word in the text.
+
+        Occurrences are yielded in the order in which they end on the text,
+        overlapping ones included (except between patterns). In whole words
+        mode, occurrences within other words are not yielded.
+
+        :param text: normalized text to scan.
+        :type text: unicode
+        :param start: only yield occurrences that start from here on.
+        :type start: int
+        :param end: only yield occurrences that end up to here, the end of
+          the text if not given. Whole words are still checked against the
+          text outside of start and end.
+        :type end: int
+        :returns: the index where the occurrence starts, where it ends and
+          the position of the stop word found.
+        :rtype: iterator of tuples
+        """
+        if end is None:
+            end = len(text)
+        if self._patterns:
+            occurrences = heapq.merge(
+                self._find_words(text, start, end),
+                *[
+                    self._find_patterns(text, regex, positions, start, end)
+                    for regex, positions in self._patterns
+                ]
+            )
+        else:
+            occurrences = self._find_words(text, start, end)
+
+        for end, start, position in occurrences:
+            yield start, end, position
+
+    def _find_words(self, text, start=0, end=None):
+        """Yield the occurrences of the words of the automaton.
+
+        :returns: the end, start and position of each occurrence, sorted.
+        :rtype: iterator of tuples
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        lengths = self._lengths
+        whole_words = self.whole_words
+        starts_word = self._starts_word
+        ends_word = self._ends_word
+        last = len(text) - 1
+        chars = text
+        if start or (end is not None and end <= last):
+            chars = islice(text, start, end)
+        state = 0
+        for index, char in enumerate(chars, start):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for position in output[state]:
+                    begin = index - lengths[position] + 1
+                    if whole_words:
+                        if (starts_word[position] and begin > 0 and
+                                is_word_char(text[begin - 1])):
+                            continue
+                        if (ends_word[position] and index < last and
+                                is_word_char(text[index + 1])):
+                            continue
+                    yield index + 1, begin, position
+
+    @staticmethod
+    def _find_patterns(text, regex, positions, start=0, end=None):
+        """Yield the occurrences of a combined pattern.
+
+        :returns: the end, start and position of each occurrence, sorted.
+        :rtype: iterator of tuples
+        """
+        if end is None:
+            end = len(text)
+        for match in regex.finditer(text, start, end):
+            start, end = match.span()
+            if start != end:
+                yield end, start, positions[match.lastindex]
+
+    def check_words(self, tokens):
+        """Check the stop words against the words of a text.
+
+        Only meaningful if the matcher is ``tokenized``.
+
+        :param tokens: the words of the normalized text, see tokenize.
+        :type tokens: set of unicode
+        :returns: True if a single word stop word is on the text, False if
+          no stop word can be on it, None if it has to be scanned to know.
+        :rtype: bool or None
+        """
+        if not self._single_words.isdisjoint(tokens):
+            return True
+        for phrase in self._phrases:
+            if phrase <= tokens:
+                return None
+        return False
+
+    def search(self, text):
+        """Check if any stop word is found in the text.
+
+        :param text: normalized text to scan.
+        :type text: unicode
+        :returns: whether at least one stop word is found.
+        :rtype: bool
+        """
+        if self.tokenized:
+            found = self.check_words(tokenize(text))
+            if found is not None:
+                return found
+        for _ in self.finditer(text):
+            return True
+        return False
+
+
+class ExtendedMatcher(StopWordsMatcher):
+    """A matcher with some stop words added to and removed from another one.
+
+    Building the automaton of a big list is what is expensive, so when only
+    a few stop words change, the automaton of the base matcher is shared as
+    is: the added stop words are found by a small matcher of their own, and
+    the occurrences of the removed ones are skipped.
+
+    Positions of the added stop words follow the ones of the base matcher.
+    """
+
+    def __init__(self, base, added=None, removed=(), version=None):
+        """Extend a matcher.
+
+        :param base: the matcher to build on, it is not modified.
+        :type base: StopWordsMatcher
+        :param added: the matcher of the added stop words, if any.
+        :type added: StopWordsMatcher
+        :param removed: the stop words of the base matcher that are removed,
+          as they were written (see originals).
+        :type removed: iterable of unicode
+        :param version: identifies the resulting stop words list.
+        :type version: str
+        """
+        self.base = base
+        self._added = added
+        self.version = version
+        self.whole_words = base.whole_words
+
+        removed = frozenset(removed)
+        self._removed = frozenset(
+            position
+            for position, original in enumerate(base.originals)
+            if original in removed
+        )
+        kept = set(
+            word
+            for position, word in enumerate(base.words)
+            if position not in self._removed
+        )
+        # normalized words whose every occurrence on the base was removed
+        self._removed_words = frozenset(
+            base.words[position] for position in self._removed
+        ) - kept
+
+        self.words = base.words
+        self.originals = base.originals
+        self.tokenized = base.tokenized
+        self.max_length = base.max_length
+        if added is not None:
+            self.words += added.words
+            self.originals += added.originals
+            self.tokenized = self.tokenized and added.tokenized
+            if self.max_length is not None:
+                if added.max_length is None:
+                    self.max_length = None
+                else:
+                    self.max_length = max(self.max_length, added.max_length)
+
+    def __len__(self):
+        return len(self.words) - len(self._removed)
+
+    @property
+    def delta(self):
+        """How many stop words are added or removed from the base matcher."""
+        added = len(self._added) if self._added is not None else 0
+        return added + len(self._removed)
+
+    def live_originals(self):
+        """The stop words of the matcher, as they were written."""
+        removed = self._removed
+        originals = set(
+            original
+            for position, original in enumerate(self.base.originals)
+            if position not in removed
+        )
+        if self._added is not None:
+            originals.update(self._added.originals)
+        return originals
+
+    def finditer(self, text, start=0, end=None):
+        removed = self._removed
+        occurrences = (
+            (occurrence_end, occurrence_start, position)
+            for occurrence_start, occurrence_end, position
+            in self.base.finditer(text, start, end)
+            if position not in removed
+        )
+        if self._added is not None:
+            offset = len(self.base.words)
+            occurrences = heapq.merge(
+                occurrences,
+                (
+                    (occurrence_end, occurrence_start, position + offset)
+                    for occurrence_start, occurrence_end, position
+                    in self._added.finditer(text, start, end)
+                )
+            )
+        for occurrence_end, occurrence_start, position in occurrences:
+            yield occurrence_start, occurrence_end, position
+
+    def check_words(self, tokens):
+        found = False
+        if self._added is not None:
+            found = self._added.check_words(tokens)
+            if found:
+                return True
+        hits = self.base._single_words.intersection(tokens)
+        if hits and not hits <= self._removed_words:
+            return True
+        for phrase in self.base._phrases:
+            if phrase <= tokens:
+                return None
+        return found
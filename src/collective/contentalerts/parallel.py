@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Search for stop words on many texts using a pool of processes."""
+from collective.contentalerts.utilities import Alert
+
+import multiprocessing
+
+
+# matcher used by each worker process, see _init_worker
+_matcher = None
+
+
+def _init_worker(matcher):
+    global _matcher
+    _matcher = matcher
+
+
+def _scan(item):
+    """Return the key of the item and the stop words found on its text."""
+    key, text = item
+    if _matcher:
+        scan = Alert().scan(text, stop_words=_matcher)
+        if scan:
+            return key, scan.words
+    return None
+
+
+class ScannerPool(object):
+    """Pool of worker processes that search for stop words on texts.
+
+    Only plain texts are sent to the workers, and only the keys of the ones
+    that have stop words (and the stop words found) are sent back, so that
+    the workers do not need any database connection, and the parent process
+    only gets to handle the (usually few) matches.
+
+    As it forks the current process, it is meant to be used from scripts
+    and not from within a running Zope server.
+    """
+
+    def __init__(self, matcher, workers=None):
+        """
+        :param matcher: the stop words to search for, as returned by
+          IAlert.compile_stop_words.
+        :type matcher: StopWordsMatcher
+        :param workers: how many processes to start, if not given one per
+          CPU.
+        :type workers: int
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self._pool = multiprocessing.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(matcher, ),
+        )
+
+    def scan(self, items):
+        """Search for stop words on the texts.
+
+        :param items: pairs of a key (e.g. an UID) and a text.
+        :type items: iterable
+        :returns: the keys of the texts that have stop words, mapped to the
+          stop words found on each one.
+        :rtype: dict
+        """
+        items = list(items)
+        if not items:
+            return {}
+
+        chunk_size = max(1, len(items) // (self.workers * 4))
+        return dict(
+            found
+            for found in self._pool.imap_unordered(_scan, items, chunk_size)
+            if found is not None
+        )
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
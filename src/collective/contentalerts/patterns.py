@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""Wildcard and regular expression stop words.
+
+Besides plain words, a stop words list can have:
+
+- wildcards: ``*`` stands for any amount of letters, e.g. ``free mon*y``
+- regular expressions: lines starting with ``re:``, e.g. ``re:fr[e3]+ cash``
+
+As texts are normalized before being scanned (lower case, no accents),
+regular expressions should be written accordingly.
+
+Regular expressions that could take exponential or polynomial time to
+match (e.g. nested unbounded repetitions, back references or repetitions
+next to each other that can match the same text) or that match an empty
+text are rejected, so that a single bad entry can not stall a Zope thread.
+"""
+from collective.contentalerts import _
+from sre_constants import MAXREPEAT
+from zope.schema import ValidationError
+
+import logging
+import re
+import sre_compile
+import sre_constants
+import sre_parse
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+REGEX_PREFIX = u're:'
+WILDCARD = u'*'
+# letters a wildcard stands for at most: an unbounded \w* would be tried
+# again from every letter of a long word, taking quadratic time
+MAX_WILDCARD_LENGTH = 30
+WILDCARD_REGEX = u'\\w{{0,{0}}}'.format(MAX_WILDCARD_LENGTH)
+MAX_WILDCARDS = 4
+MAX_PATTERN_LENGTH = 200
+
+# python 2 regular expressions can have 100 groups at most
+MAX_GROUPS = 99
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, )
+_GROUP_REFERENCES = (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS, )
+_ZERO_WIDTH = (sre_constants.AT, sre_constants.ASSERT,
+               sre_constants.ASSERT_NOT, )
+
+# characters tried, besides the ones written on the pattern, to know if two
+# parts of a pattern can match the same text
+SAMPLE_CHARACTERS = u'az09_ \n.,;:!?\'"-+*/\\()[]$€@#%&äßéñαб'
+
+
+class InvalidStopWord(ValidationError):
+    """Invalid stop word"""
+
+    def __init__(self, line, reason):
+        super(InvalidStopWord, self).__init__(line, reason)
+        self.line = line
+        self.reason = reason
+
+    def doc(self):
+        return _(
+            u'invalid_stop_word_message',
+            default=u'Invalid stop word "${line}": ${reason}',
+            mapping={
+                'line': self.line,
+                'reason': self.reason,
+            }
+        )
+
+
+def is_pattern(line):
+    """Whether a line of a stop words list is a wildcard or a regex."""
+    return line.startswith(REGEX_PREFIX) or WILDCARD in line
+
+
+def wildcard_regex(parts):
+    """Get the regular expression of a wildcard stop word.
+
+    :param parts: the already normalized text between the wildcards.
+    :type parts: list of unicode
+    :returns: the regular expression source.
+    :rtype: unicode
+    """
+    return WILDCARD_REGEX.join(re.escape(part) for part in parts)
+
+
+def check_pattern(line, source):
+    """Check that a pattern can be safely used to scan texts.
+
+    :param line: the line of the stop words list, used to report errors.
+    :type line: unicode
+    :param source: the regular expression source of the line.
+    :type source: unicode
+    :raises InvalidStopWord: if the pattern is not safe to use.
+    :returns: the compiled pattern.
+    """
+    if len(source) > MAX_PATTERN_LENGTH:
+        raise InvalidStopWord(line, _(u'it is too long'))
+
+    try:
+        parsed = sre_parse.parse(source, re.UNICODE)
+        compiled = re.compile(source, re.UNICODE)
+    except (re.error, OverflowError, RuntimeError, AssertionError):
+        raise InvalidStopWord(line, _(u'it is not a valid regular expression'))
+
+    if compiled.groups >= MAX_GROUPS:
+        raise InvalidStopWord(line, _(u'it has too many groups'))
+    _check_backtracking(line, parsed)
+    if compiled.match(u''):
+        raise InvalidStopWord(line, _(u'it matches an empty text'))
+    _check_restarts(line, parsed)
+    _check_adjacent_repeats(line, parsed)
+    return compiled
+
+
+def _check_backtracking(line, pattern, in_repeat=False):
+    """Reject what could make matching take exponential time.
+
+    That is, repetitions or alternatives within unbounded repetitions,
+    e.g. ``(a+)+`` or ``(a|ab)*``, and back references.
+
+    :param pattern: as parsed by sre_parse.
+    :param in_repeat: whether the pattern is within an unbounded repetition.
+    :type in_repeat: bool
+    """
+    for op, av in pattern:
+        if op in _REPEATS:
+            minimum, maximum, item = av
+            if in_repeat and maximum > 1:
+                raise InvalidStopWord(line, _(u'it has nested repetitions'))
+            _check_backtracking(line, item, in_repeat or maximum == MAXREPEAT)
+        elif op == sre_constants.BRANCH and in_repeat:
+            raise InvalidStopWord(
+                line,
+                _(u'it has alternatives within repetitions')
+            )
+        elif op in _GROUP_REFERENCES:
+            raise InvalidStopWord(line, _(u'it has back references'))
+        else:
+            for sub_pattern in _sub_patterns(av):
+                _check_backtracking(line, sub_pattern, in_repeat)
+
+
+def _check_restarts(line, parsed):
+    """Reject unbounded repetitions over where the pattern can start again.
+
+    e.g. ``\\w*x`` or ``a\\w*x``: on a long run of letters, the pattern is
+    tried from each of them and each time the repetition runs up to the end
+    of the run, taking quadratic time. Bounded repetitions (``\\w{0,30}x``),
+    or unbounded ones that can not match the start of the pattern
+    (``fr[e3]+``), take linear time.
+
+    :param parsed: the pattern as parsed by sre_parse.
+    """
+    starts = [
+        _compile_items(parsed, items)
+        for items in _first_items(parsed)
+    ]
+    samples = set(SAMPLE_CHARACTERS) | _literals(parsed)
+    for op, av in _walk(parsed):
+        if op not in _REPEATS or av[1] != MAXREPEAT:
+            continue
+        repeated = [
+            _compile_items(parsed, items)
+            for items in _first_items(av[2])
+        ]
+        for char in samples:
+            if (any(start.match(char) for start in starts) and
+                    any(item.match(char) for item in repeated)):
+                raise InvalidStopWord(
+                    line,
+                    _(u'it has an unbounded repetition that can match where '
+                      u'it starts, bound it, e.g. {0,30}')
+                )
+
+
+def _check_adjacent_repeats(line, parsed):
+    """Reject repetitions that can split the same text between them.
+
+    e.g. ``x[^x]*[^x]*y`` or ``a\\w{0,30}a\\w{0,30}z`` (``a*a*z``): when
+    the rest of the pattern does not match, every way of splitting the text
+    between the repetitions is tried, taking polynomial time (the more
+    repetitions, the higher the degree). Bounded repetitions are no
+    exception, as each one multiplies the attempts by its length.
+
+    Two repetitions of a variable length clash when they can match the same
+    character and everything between them can be matched by the first one.
+
+    :param parsed: the pattern as parsed by sre_parse.
+    """
+    samples = set(SAMPLE_CHARACTERS) | _literals(parsed)
+    sequences = [parsed] + [
+        sub_pattern
+        for op, av in _walk(parsed)
+        for sub_pattern in _sub_patterns(av)
+    ]
+    for sequence in sequences:
+        # characters of the repetitions that can still take more text
+        previous = []
+        for op, av in _flatten(sequence):
+            if op in _ZERO_WIDTH:
+                continue
+            chars = set(
+                char
+                for char in samples
+                if any(
+                    _compile_items(parsed, items).match(char)
+                    for items in _first_items([(op, av)])
+                )
+            )
+            if op in _REPEATS and av[0] != av[1]:
+                if any(chars & other for other in previous):
+                    raise InvalidStopWord(
+                        line,
+                        _(u'it has repetitions next to each other that can '
+                          u'match the same text')
+                    )
+                previous = [other for other in previous if chars & other]
+                previous.append(chars)
+            else:
+                previous = [other for other in previous if chars & other]
+
+
+def _flatten(pattern):
+    """Yield the parsed items of a pattern, with groups inlined."""
+    for op, av in pattern:
+        if op == sre_constants.SUBPATTERN:
+            for item in _flatten(av[-1]):
+                yield item
+        else:
+            yield op, av
+
+
+def _first_items(pattern):
+    """Yield the parsed items a match of the pattern can start with."""
+    for op, av in pattern:
+        if op in _ZERO_WIDTH:
+            continue
+        if op == sre_constants.SUBPATTERN:
+            for items in _first_items(av[-1]):
+                yield items
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                for items in _first_items(branch):
+                    yield items
+        elif op in _REPEATS:
+            for items in _first_items(av[2]):
+                yield items
+        else:
+            yield [(op, av)]
+        return
+
+
+def _compile_items(parsed, items):
+    return sre_compile.compile(
+        sre_parse.SubPattern(parsed.pattern, items),
+        re.UNICODE
+    )
+
+
+def _walk(pattern):
+    """Yield all the parsed items of a pattern, nested ones included."""
+    for op, av in pattern:
+        yield op, av
+        for sub_pattern in _sub_patterns(av):
+            for item in _walk(sub_pattern):
+                yield item
+
+
+def _literals(pattern):
+    """Get the characters written on a pattern."""
+    chars = set()
+    for op, av in _walk(pattern):
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL):
+            chars.add(unichr(av))
+        elif op == sre_constants.IN:
+            for set_op, set_av in av:
+                if set_op == sre_constants.LITERAL:
+                    chars.add(unichr(set_av))
+                elif set_op == sre_constants.RANGE:
+                    chars.update((unichr(set_av[0]), unichr(set_av[1])))
+    return chars
+
+
+def _sub_patterns(av):
+    """Find the patterns nested within the arguments of a parsed opcode."""
+    if isinstance(av, sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (list, tuple, )):
+        for item in av:
+            for sub_pattern in _sub_patterns(item):
+                yield sub_pattern
+
+
+def check_stop_words(value):
+    """Schema constraint for stop words lists.
+
+    :raises InvalidStopWord: if any wildcard or regex is not safe to use.
+    """
+    if not value:
+        return True
+
+    for line in value.splitlines():
+        if not line or not is_pattern(line):
+            continue
+        if line.startswith(REGEX_PREFIX):
+            check_pattern(line, line[len(REGEX_PREFIX):])
+        else:
+            parts = line.lower().split(WILDCARD)
+            if len(parts) > MAX_WILDCARDS + 1:
+                raise InvalidStopWord(line, _(u'it has too many wildcards'))
+            check_pattern(line, wildcard_regex(parts))
+    return True
+
+
+def compile_patterns(patterns, whole_words=False):
+    """Combine patterns into as few regular expressions as possible.
+
+    Each pattern is wrapped on a group, so that the pattern that matched can
+    be told by the index of the group. Patterns that are not safe to use are
+    skipped (they can only get there if the stop words were not validated,
+    e.g. set through GenericSetup).
+
+    :param patterns: pairs of the position of the pattern on the stop words
+      list and its regular expression source.
+    :type patterns: iterable
+    :param whole_words: whether patterns only match whole words.
+    :type whole_words: bool
+    :returns: pairs of the combined regular expression and a mapping of each
+      group index to the position of its pattern.
+    :rtype: list
+    """
+    combined = []
+    sources = []
+    positions = {}
+    groups = 0
+    for position, source in patterns:
+        try:
+            compiled = check_pattern(source, source)
+        except InvalidStopWord:
+            logger.warning(u'Skipping unsafe stop word {0}'.format(source))
+            continue
+
+        if sources and groups + compiled.groups + 1 > MAX_GROUPS:
+            combined.append(_combine(sources, positions))
+            sources = []
+            positions = {}
+            groups = 0
+
+        if whole_words:
+            source = u'(?<!\\w)(?:{0})(?!\\w)'.format(source)
+        sources.append(u'({0})'.format(source))
+        groups += 1
+        positions[groups] = position
+        groups += compiled.groups
+
+    if sources:
+        combined.append(_combine(sources, positions))
+    return combined
+
+
+def _combine(sources, positions):
+    return re.compile(u'|'.join(sources), re.UNICODE), positions
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Persistent queue of objects waiting to be scanned for stop words."""
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+from persistent import Persistent
+from plone import api
+from zope.annotation.interfaces import IAnnotations
+
+import time
+
+
+QUEUE_KEY = 'collective.contentalerts.queue'
+
+
+class ScanQueue(Persistent):
+    """Objects waiting to be scanned, oldest first.
+
+    Each entry is an object's UID together with the id of the content rule
+    whose condition deferred the scan, or None if the object only needs to
+    be flagged or unflagged (see collective.contentalerts.rescan). An entry
+    that is already waiting is not added again, so that saving an object
+    many times before the queue is processed only scans it once.
+    """
+
+    def __init__(self):
+        # (queued time, uid, rule id) -> None, sorted by time
+        self._queue = OOBTree()
+        # (uid, rule id) -> queued time, to not add the same entry twice
+        self._pending = OOBTree()
+        # conflict free counter, so that adding to the queue from different
+        # threads does not conflict on it
+        self._length = Length()
+
+    def __len__(self):
+        return self._length()
+
+    def put(self, uid, rule_id, queued=None):
+        """Add an object to the queue, unless it is already waiting.
+
+        :param uid: UID of the object to scan.
+        :type uid: str
+        :param rule_id: id of the content rule that needs the object scanned,
+          None if no rule does.
+        :type rule_id: str
+        :param queued: when the object was queued, now if not given.
+        :type queued: float
+        :returns: whether the object was added.
+        :rtype: bool
+        """
+        if (uid, rule_id) in self._pending:
+            return False
+
+        if queued is None:
+            queued = time.time()
+        self._pending[(uid, rule_id)] = queued
+        self._queue[(queued, uid, rule_id)] = None
+        self._length.change(1)
+        return True
+
+    def take(self, limit=None):
+        """Remove the oldest entries from the queue.
+
+        :param limit: how many entries to take at most, all if not given.
+        :type limit: int
+        :returns: (uid, rule id, queued time) tuples, oldest first.
+        :rtype: list
+        """
+        entries = []
+        for key in self._queue.keys():
+            if limit is not None and len(entries) >= limit:
+                break
+            entries.append(key)
+
+        for queued, uid, rule_id in entries:
+            del self._queue[(queued, uid, rule_id)]
+            del self._pending[(uid, rule_id)]
+        self._length.change(-len(entries))
+        return [(uid, rule_id, queued) for queued, uid, rule_id in entries]
+
+    def lag(self, now=None):
+        """Seconds that the oldest entry has been waiting.
+
+        :param now: current time, if not given the actual current time.
+        :type now: float
+        :returns: the seconds or 0 if the queue is empty.
+        :rtype: float
+        """
+        if not len(self):
+            return 0.0
+        if now is None:
+            now = time.time()
+        return max(0.0, now - self._queue.minKey()[0])
+
+
+def get_queue(portal=None, create=True):
+    """Get the scan queue of the site.
+
+    :param portal: the Plone site, the current one if not given.
+    :param create: whether to create the queue if it does not exist yet.
+    :type create: bool
+    :returns: the queue or None if it does not exist and create is False.
+    :rtype: ScanQueue
+    """
+    if portal is None:
+        portal = api.portal.get()
+    annotations = IAnnotations(portal)
+    queue = annotations.get(QUEUE_KEY)
+    if queue is None and create:
+        queue = annotations[QUEUE_KEY] = ScanQueue()
+    return queue
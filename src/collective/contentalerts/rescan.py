@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Scan existing content again once the default stop words change.
+
+Rather than scanning the whole site, only the objects that could be
+affected are queued (see collective.contentalerts.queue), without a content
+rule, so that processing the queue only flags or unflags them:
+
+- for added stop words, the objects whose ``SearchableText`` has all the
+  words of the stop word (or words starting with them, if stop words do not
+  only match whole words)
+- for removed stop words, the objects flagged with them (their found stop
+  words are indexed), objects flagged only by a rule's own stop words or
+  word list are left alone
+
+Stop words can also be found inside other words (e.g. ``ass`` in ``class``)
+when they do not only match whole words, and regular expressions can not
+be searched on the catalog at all: those occurrences are only found by an
+audit (see collective.contentalerts.audit).
+"""
+from Products.ZCTextIndex.ParseTree import ParseError
+from collective.contentalerts.interfaces import IAlert
+from collective.contentalerts.patterns import REGEX_PREFIX
+from collective.contentalerts.patterns import WILDCARD
+from collective.contentalerts.queue import get_queue
+from collective.contentalerts.utilities import STOP_WORDS_RECORD
+from collective.contentalerts.utilities import resolve_whole_words
+from plone import api
+from zope.component import getUtility
+from zope.component.hooks import getSite
+
+import logging
+import re
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+# queue entries without a content rule: the object is only flagged or not
+RESCAN_RULE_ID = None
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# can not be globbed, as they are operators on ZCTextIndex queries
+QUERY_OPERATORS = ('AND', 'OR', 'NOT', )
+
+
+def get_changes(old, new):
+    """Get the stop words added and removed between two stop words lists.
+
+    :param old: the stop words before, one per line.
+    :type old: unicode
+    :param new: the stop words after, one per line.
+    :type new: unicode
+    :returns: the added and the removed stop words.
+    :rtype: tuple of sets
+    """
+    old = set(line for line in (old or u'').splitlines() if line.strip())
+    new = set(line for line in (new or u'').splitlines() if line.strip())
+    return new - old, old - new
+
+
+def searchable_text_query(stop_word, whole_words=False):
+    """Get a ZCTextIndex query of the objects that could have a stop word.
+
+    :param stop_word: a stop word, wildcard or regular expression.
+    :type stop_word: unicode
+    :param whole_words: whether the stop word only matches whole words.
+    :type whole_words: bool
+    :returns: the query or None if it can not be searched on the catalog.
+    :rtype: unicode
+    """
+    if stop_word.startswith(REGEX_PREFIX):
+        return None
+
+    terms = []
+    for chunk in stop_word.split():
+        glob = not whole_words
+        if WILDCARD in chunk:
+            # only the text before the wildcard is known
+            chunk = chunk.split(WILDCARD)[0]
+            glob = True
+        words = WORD_RE.findall(chunk)
+        for index, word in enumerate(words):
+            last = index == len(words) - 1
+            if glob and last and word.upper() not in QUERY_OPERATORS:
+                terms.append(u'{0}*'.format(word))
+            else:
+                terms.append(u'"{0}"'.format(word))
+
+    if not terms:
+        return None
+    return u' AND '.join(terms)
+
+
+def get_candidates(catalog, added=(), removed=(), whole_words=False):
+    """Get the UIDs of the objects that need to be scanned again.
+
+    :param catalog: the portal catalog.
+    :param added: stop words added.
+    :type added: iterable of unicode
+    :param removed: stop words removed.
+    :type removed: iterable of unicode
+    :param whole_words: whether stop words only match whole words.
+    :type whole_words: bool
+    :returns: the UIDs and the added stop words that could not be searched
+      on the catalog.
+    :rtype: tuple
+    """
+    uids = set()
+    not_searched = []
+    for stop_word in sorted(added):
+        query = searchable_text_query(stop_word, whole_words)
+        if query is None:
+            not_searched.append(stop_word)
+            continue
+        try:
+            brains = catalog.unrestrictedSearchResults(SearchableText=query)
+        except ParseError:
+            # e.g. only words that the lexicon ignores
+            not_searched.append(stop_word)
+            continue
+        uids.update(brain.UID for brain in brains)
+
+    if removed:
+        # found stop words are indexed normalized
+        words = getUtility(IAlert).get_normalized_stop_words(
+            u'\n'.join(sorted(removed))
+        )
+        brains = catalog.unrestrictedSearchResults(stop_words=words)
+        uids.update(brain.UID for brain in brains)
+
+    uids.discard(None)
+    return uids, not_searched
+
+
+def queue_rescan(added=(), removed=(), portal=None):
+    """Queue the objects that could be affected by a stop words change.
+
+    :param added: stop words added.
+    :type added: iterable of unicode
+    :param removed: stop words removed.
+    :type removed: iterable of unicode
+    :param portal: the Plone site, the current one if not given.
+    :returns: how many objects were queued.
+    :rtype: int
+    """
+    if portal is None:
+        portal = api.portal.get()
+    catalog = api.portal.get_tool('portal_catalog')
+    uids, not_searched = get_candidates(
+        catalog,
+        added=added,
+        removed=removed,
+        whole_words=resolve_whole_words()
+    )
+    for stop_word in not_searched:
+        logger.warning(
+            u'Existing content is not searched for the stop word {0}, '
+            u'run an audit to find it.'.format(stop_word)
+        )
+
+    queue = get_queue(portal)
+    queued = sum(queue.put(uid, RESCAN_RULE_ID) for uid in sorted(uids))
+    logger.info(u'{0} objects queued to be scanned again.'.format(queued))
+    return queued
+
+
+def stop_words_modified(event):
+    """Queue the objects affected by a change on the registry stop words."""
+    if getattr(event.record, '__name__', None) != STOP_WORDS_RECORD:
+        return
+    if getSite() is None:
+        return
+
+    added, removed = get_changes(event.oldValue, event.newValue)
+    if added or removed:
+        queue_rescan(added=added, removed=removed)
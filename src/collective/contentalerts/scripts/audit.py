@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Scan the content that already exists on a Plone site for stop words.
+
+Run it through the Zope instance script, it can be stopped at any time and
+it continues from where it was left the next time it is run::
+
+    bin/instance run \
+        src/collective/contentalerts/scripts/audit.py --site Plone
+
+See ``--help`` for all the options.
+"""
+from Testing.makerequest import makerequest
+from collective.contentalerts.audit import Audit
+from collective.contentalerts.audit import BATCH_SIZE
+from zope.component.hooks import setSite
+
+import argparse
+import logging
+import sys
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Search for stop words on existing content.'
+    )
+    parser.add_argument(
+        '--site',
+        required=True,
+        help='Path of the Plone site within the Zope application root.',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=BATCH_SIZE,
+        help='Objects scanned between each commit.',
+    )
+    parser.add_argument(
+        '--max-batches',
+        type=int,
+        default=None,
+        help='Stop after that many batches.',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='Processes used to scan the texts, by default it is all done '
+             'on the current process.',
+    )
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='Start from the first object, even if an audit was underway.',
+    )
+    return parser.parse_args(argv)
+
+
+def main(app, argv):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+
+    app = makerequest(app)
+    portal = app.unrestrictedTraverse(args.site)
+    setSite(portal)
+
+    audit = Audit(
+        portal,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+    if args.restart:
+        audit.reset()
+    audit.run(max_batches=args.max_batches)
+    logger.info(u'Audit status:\n{0}'.format(audit.report()))
+
+
+if __name__ == '__main__':
+    # bin/instance run provides the Zope application root as ``app``
+    main(globals()['app'], sys.argv[1:])
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Scan the objects that text alert conditions have queued.
+
+Meant to be run regularly by a cron job::
+
+    bin/instance run \
+        src/collective/contentalerts/scripts/process_queue.py --site Plone
+
+See ``--help`` for all the options.
+"""
+from Testing.makerequest import makerequest
+from collective.contentalerts.contentrules import process_queue
+from collective.contentalerts.queue import get_queue
+from zope.component.hooks import setSite
+
+import argparse
+import logging
+import sys
+import transaction
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+BATCH_SIZE = 100
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Scan the objects waiting on the queue.'
+    )
+    parser.add_argument(
+        '--site',
+        required=True,
+        help='Path of the Plone site within the Zope application root.',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=BATCH_SIZE,
+        help='Objects scanned between each commit.',
+    )
+    return parser.parse_args(argv)
+
+
+def main(app, argv):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+
+    app = makerequest(app)
+    portal = app.unrestrictedTraverse(args.site)
+    setSite(portal)
+
+    queue = get_queue(portal)
+    logger.info(u'Queue depth: {0}, lag: {1:.0f} seconds'.format(
+        len(queue),
+        queue.lag(),
+    ))
+    processed = 0
+    while len(queue):
+        processed += process_queue(portal, limit=args.batch_size)
+        transaction.commit()
+    logger.info(u'{0} objects scanned'.format(processed))
+
+
+if __name__ == '__main__':
+    # bin/instance run provides the Zope application root as ``app``
+    main(globals()['app'], sys.argv[1:])
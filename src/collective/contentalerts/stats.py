@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Counters and latency histograms of the scans done on this process.
+
+Each metric has its own lock, held only to add a number, so that they can
+be updated from any thread at almost no cost. They are kept in memory per
+process (i.e. per ZEO client) and start again from zero on restart, see
+the ``@@contentalerts-stats`` view to read them in Prometheus text format.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+
+import threading
+import time
+
+
+# upper bounds, in seconds, of the latency histograms buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, )
+
+
+class Counter(object):
+    """A number that only goes up."""
+
+    type = 'counter'
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def increment(self, value=1):
+        with self._lock:
+            self.value += value
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Histogram(object):
+    """How many observations fall on each bucket, their count and sum."""
+
+    type = 'histogram'
+
+    def __init__(self, name, description, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def reset(self):
+        with self._lock:
+            # one more for the observations above the last bucket
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            total = self.sum
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield '{0}_bucket{{le="{1}"}}'.format(self.name, bound), cumulative
+        yield '{0}_bucket{{le="+Inf"}}'.format(self.name), count
+        yield '{0}_sum'.format(self.name), total
+        yield '{0}_count'.format(self.name), count
+
+
+_metrics = OrderedDict()
+
+
+def _add(metric):
+    _metrics[metric.name] = metric
+    return metric
+
+
+EXECUTOR_CALLS = _add(Counter(
+    'contentalerts_executor_calls_total',
+    'Text alert conditions checked.'
+))
+EXECUTOR_HITS = _add(Counter(
+    'contentalerts_executor_hits_total',
+    'Text alert conditions checked that found stop words.'
+))
+EXECUTOR_CACHED = _add(Counter(
+    'contentalerts_executor_cached_total',
+    'Text alert conditions answered by the verdict of the last scan.'
+))
+EXECUTOR_SECONDS = _add(Histogram(
+    'contentalerts_executor_seconds',
+    'Time spent checking text alert conditions that were not deferred.'
+))
+SCANNED_CHARACTERS = _add(Counter(
+    'contentalerts_scanned_characters_total',
+    'Characters of text scanned by text alert conditions.'
+))
+SLOW_SCANS = _add(Counter(
+    'contentalerts_slow_scans_total',
+    'Text alert conditions that took longer than the slow scan threshold.'
+))
+NORMALIZE_SECONDS = _add(Histogram(
+    'contentalerts_normalize_seconds',
+    'Time spent normalizing texts (Alert.html_normalize).'
+))
+NORMALIZED_CHARACTERS = _add(Counter(
+    'contentalerts_normalized_characters_total',
+    'Characters of text normalized.'
+))
+MATCH_SECONDS = _add(Histogram(
+    'contentalerts_match_seconds',
+    'Time spent finding stop words on normalized texts.'
+))
+MARKER_SECONDS = _add(Histogram(
+    'contentalerts_marker_seconds',
+    'Time spent flagging objects and reindexing them.'
+))
+REINDEXED = _add(Counter(
+    'contentalerts_reindexed_total',
+    'Objects reindexed because they were flagged or unflagged.'
+))
+
+
+class timer(object):
+    """Observe on a histogram how long a block of code takes.
+
+    Usage::
+
+        with timer(MATCH_SECONDS):
+            matches = list(matcher.finditer(text))
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.time() - self.start
+        self.histogram.observe(self.elapsed)
+
+
+def render():
+    """Get all metrics in Prometheus text exposition format.
+
+    :rtype: str
+    """
+    lines = []
+    for metric in _metrics.values():
+        lines.append(
+            '# HELP {0} {1}'.format(metric.name, metric.description)
+        )
+        lines.append('# TYPE {0} {1}'.format(metric.name, metric.type))
+        for name, value in metric.samples():
+            lines.append('{0} {1}'.format(name, _format(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def _format(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+
+def reset():
+    """Set all metrics back to zero."""
+    for metric in _metrics.values():
+        metric.reset()
@@ -1,11 +1,24 @@
 # -*- coding: utf-8 -*-
 from collective.contentalerts.interfaces import IAlert
 from collective.contentalerts.interfaces import IStopWords
+from collective.contentalerts.matcher import ExtendedMatcher
 from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
 from collective.contentalerts.utilities import Alert
+from collective.contentalerts.utilities import ENTITY_TABLE
+from collective.contentalerts.utilities import ENTITY_TABLE_SIZE
+from collective.contentalerts.utilities import NBSP_RE
+from collective.contentalerts.utilities import NORMALIZE_TABLE
+from collective.contentalerts.utilities import NORMALIZE_TABLE_SIZE
+from collective.contentalerts.utilities import _registry_cache
+from collective.contentalerts.utilities import get_versioned
+from collective.contentalerts.utilities import set_versioned
+from collective.contentalerts.utilities import stop_words_version
 from plone.registry.interfaces import IRegistry
 from zope.component import getUtility
 
+import threading
+import time
+import unicodedata
 import unittest
 
 
@@ -59,6 +72,18 @@ class AlertUtilityTestCase(unittest.TestCase):
             self.utility.has_stop_words(u'some specific text')
         )
 
+    def test_whole_words_from_registry(self):
+        """Check that the registry whole words setting is used."""
+        self.records.stop_words = u'ass'
+        self.assertTrue(self.utility.has_stop_words(u'some class'))
+
+        self.records.whole_words = True
+        self.assertFalse(self.utility.has_stop_words(u'some class'))
+        self.assertTrue(self.utility.has_stop_words(u'some ass'))
+        self.assertTrue(
+            self.utility.has_stop_words(u'some class', whole_words=False)
+        )
+
     def test_get_snippets_from_registry(self):
         """Check that get_snippets works with the registry."""
         self.records.stop_words = u'random\nalert me\nlala'
@@ -75,6 +100,135 @@ class AlertUtilityTestCase(unittest.TestCase):
             u''
         )
 
+    def test_registry_stop_words_compiled_once(self):
+        """Check that registry stop words are not compiled on every call."""
+        self.records.stop_words = u'random\nalert me\nlala'
+        self.assertIs(
+            self.utility.compile_stop_words(),
+            self.utility.compile_stop_words()
+        )
+
+    def test_registry_change_invalidates_cache(self):
+        """Check that a change on the registry drops the compiled list."""
+        old_stop_words = u'random\nalert me\nlala'
+        self.records.stop_words = old_stop_words
+        self.utility.compile_stop_words()
+        self.assertIn((old_stop_words, None, False), _registry_cache)
+
+        self.records.stop_words = u'specific'
+        self.assertNotIn((old_stop_words, None, False), _registry_cache)
+        self.assertTrue(
+            self.utility.has_stop_words(u'some specific text')
+        )
+
+
+class CompileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.utility = Alert()
+        self.words = u'\n'.join(u'word{0}'.format(i) for i in range(200))
+        self.matcher = self.utility._compile(self.words)
+
+    def tearDown(self):
+        _registry_cache.clear()
+
+    def test_few_changes_extend(self):
+        matcher = self.utility._compile(
+            u'{0}\nMore words'.format(self.words.replace(u'word0\n', u'')),
+            previous=self.matcher
+        )
+        self.assertIsInstance(matcher, ExtendedMatcher)
+        self.assertIs(matcher.base, self.matcher)
+        self.assertEqual(matcher.delta, 2)
+        self.assertTrue(self.utility.has_stop_words(u'more words', matcher))
+        self.assertFalse(self.utility.has_stop_words(u'word0', matcher))
+        self.assertTrue(self.utility.has_stop_words(u'word1', matcher))
+
+    def test_extended_twice_same_base(self):
+        matcher = self.utility._compile(
+            u'{0}\none'.format(self.words),
+            previous=self.matcher
+        )
+        matcher = self.utility._compile(
+            u'{0}\ntwo'.format(self.words),
+            previous=matcher
+        )
+        self.assertIs(matcher.base, self.matcher)
+        self.assertEqual(matcher.delta, 1)
+        self.assertFalse(self.utility.has_stop_words(u'one', matcher))
+        self.assertTrue(self.utility.has_stop_words(u'two', matcher))
+
+    def test_many_changes_rebuild(self):
+        matcher = self.utility._compile(u'one\ntwo', previous=self.matcher)
+        self.assertNotIsInstance(matcher, ExtendedMatcher)
+        self.assertEqual(matcher.words, (u'one', u'two'))
+
+    def test_compiled_by_one_thread(self):
+        built = []
+        compile_ = self.utility._compile
+
+        def counted(*args, **kwargs):
+            built.append(1)
+            time.sleep(0.01)
+            return compile_(*args, **kwargs)
+
+        self.utility._compile = counted
+        matchers = []
+        threads = [
+            threading.Thread(
+                target=lambda: matchers.append(
+                    self.utility._get_cached(self.words, None, False)
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len(set(id(matcher) for matcher in matchers)), 1)
+
+
+class VersionedTestCase(unittest.TestCase):
+
+    def test_get_missing(self):
+        self.assertIsNone(get_versioned({}, 'key', '1'))
+
+    def test_per_version(self):
+        annotations = {}
+        set_versioned(annotations, 'key', '1', 'one', 2)
+        set_versioned(annotations, 'key', '2', 'two', 2)
+        self.assertEqual(get_versioned(annotations, 'key', '1'), 'one')
+        self.assertEqual(get_versioned(annotations, 'key', '2'), 'two')
+
+    def test_replaced(self):
+        annotations = {}
+        set_versioned(annotations, 'key', '1', 'one', 2)
+        set_versioned(annotations, 'key', '1', 'uno', 2)
+        self.assertEqual(annotations['key'], (('1', 'uno'), ))
+
+    def test_bounded(self):
+        annotations = {}
+        for version in '1234':
+            set_versioned(annotations, 'key', version, version, 2)
+        self.assertEqual(annotations['key'], (('4', '4'), ('3', '3')))
+
+    def test_least_recently_set_dropped(self):
+        annotations = {}
+        for version in '121':
+            set_versioned(annotations, 'key', version, version, 2)
+        set_versioned(annotations, 'key', '3', '3', 2)
+        self.assertIsNone(get_versioned(annotations, 'key', '2'))
+        self.assertEqual(get_versioned(annotations, 'key', '1'), '1')
+
+    def test_single_value_ignored(self):
+        """Annotations kept before by version are ignored."""
+        annotations = {'key': ('digest', '1', True)}
+        self.assertIsNone(get_versioned(annotations, 'key', '1'))
+        set_versioned(annotations, 'key', '1', 'one', 2)
+        self.assertEqual(annotations['key'], (('1', 'one'), ))
+
 
 class HTMLNormalizeTestCase(unittest.TestCase):
 
@@ -101,6 +255,30 @@ class HTMLNormalizeTestCase(unittest.TestCase):
         text = u'alert&#220;s'
         self.assertEqual(self.normalize(text), u'alertus')
 
+    def test_html_entity_table_bounded(self):
+        """Zero padded entities are all different, they are not all kept."""
+        text = u' '.join(
+            u'&#{0};'.format(str(65).zfill(width))
+            for width in range(2, 3 * ENTITY_TABLE_SIZE)
+        )
+        self.assertEqual(self.normalize(text), u' '.join(
+            [u'a'] * (3 * ENTITY_TABLE_SIZE - 2)
+        ))
+        self.assertTrue(len(ENTITY_TABLE) <= ENTITY_TABLE_SIZE)
+
+    def test_normalize_table_bounded(self):
+        """Codepoints found on texts are not all kept."""
+        start = 0x4e00
+        text = u''.join(
+            unichr(codepoint)
+            for codepoint in range(start, start + NORMALIZE_TABLE_SIZE + 100)
+        )
+        self.assertEqual(self.normalize(text), text)
+        self.assertTrue(len(NORMALIZE_TABLE) <= NORMALIZE_TABLE_SIZE)
+        # the precomputed ones are kept
+        self.assertIn(ord(u'A'), NORMALIZE_TABLE)
+        self.assertEqual(self.normalize(u'ÀÉ'), u'ae')
+
     def test_html_entity_lower_case(self):
         text = u'alert&#252;s'
         self.assertEqual(self.normalize(text), u'alertus')
@@ -109,6 +287,14 @@ class HTMLNormalizeTestCase(unittest.TestCase):
         text = u'alert     text'
         self.assertEqual(self.normalize(text), u'alert text')
 
+    def test_leading_and_trailing_spaces(self):
+        text = u'\t alert text\n\n'
+        self.assertEqual(self.normalize(text), u' alert text ')
+
+    def test_only_spaces(self):
+        text = u' \n '
+        self.assertEqual(self.normalize(text), u' ')
+
     def test_string(self):
         text = 'some string'
         self.assertEqual(self.normalize(text), text)
@@ -117,6 +303,32 @@ class HTMLNormalizeTestCase(unittest.TestCase):
         text = 'some \xfc'
         self.assertEqual(self.normalize(text), u'some u')
 
+    def test_string_html_entity(self):
+        text = 'some &uuml;'
+        self.assertEqual(self.normalize(text), u'some u')
+
+    def test_nbsp(self):
+        text = u'alert&nbsp;text&#160;here'
+        self.assertEqual(self.normalize(text), u'alert text here')
+
+    def test_compatibility_decomposition(self):
+        text = u'\ufb01ve \u2460'
+        self.assertEqual(self.normalize(text), u'five 1')
+
+    def test_same_as_full_decomposition(self):
+        """Check that the translation table gives the same result as
+        decomposing the whole text at once."""
+        text = u''.join([unichr(c) for c in range(0x80, 0x2000)])
+        expected = u''.join(
+            [c
+             for c in unicodedata.normalize(
+                 'NFKD',
+                 NBSP_RE.sub(u' ', text).lower()
+             )
+             if not unicodedata.combining(c)]
+        )
+        self.assertEqual(self.normalize(text), expected)
+
 
 class SnippetTestCase(unittest.TestCase):
 
@@ -270,6 +482,208 @@ class GetSnippetsTestCase(unittest.TestCase):
             u'two, one\n\n...s two t...\n\n...d one m...\n\n...e two t...'
         )
 
+    def test_close_stop_words_merged(self):
+        text = u'Alerts one and two text'
+        stop_words = u'one\ntwo'
+        snippet_text = self.snippets(text, stop_words, chars=3)
+        self.assertEqual(snippet_text, u'one, two\n\n...ts one and two te...')
+
+    def test_overlapping_stop_words_merged(self):
+        text = u'Text one alert here'
+        stop_words = u'one alert\nalert'
+        snippet_text = self.snippets(text, stop_words, chars=2)
+        self.assertEqual(
+            snippet_text,
+            u'one alert, alert\n\n...t one alert h...'
+        )
+
+    def test_max_snippets(self):
+        text = u'Alerts one text and two more text and some more two tired'
+        stop_words = u'one\ntwo'
+        snippet_text = self.snippets(text, stop_words, chars=2, max_snippets=1)
+        self.assertEqual(snippet_text, u'one, two\n\n...s one t...')
+
+    def test_many_stop_words(self):
+        text = u' '.join([u'one'] * 1000)
+        snippet_text = self.snippets(text, u'one', chars=150)
+        self.assertEqual(snippet_text, u'one\n\n...{0}...'.format(text))
+
+
+class ScanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.utility = Alert()
+
+    def test_no_text(self):
+        self.assertIsNone(self.utility.scan(None, u'one\ntwo'))
+
+    def test_no_stop_words(self):
+        self.assertIsNone(self.utility.scan(u'one', u'\n'))
+
+    def test_whole_words(self):
+        scan = self.utility.scan(u'Class ass', u'ass', whole_words=True)
+        self.assertEqual(scan.matches, [(6, 9, 0)])
+
+    def test_whole_words_no_stop_word_in_text(self):
+        """Texts that do not have the words are not scanned."""
+        scan = self.utility.scan(
+            u'Class, alert one',
+            u'ass\none alert',
+            whole_words=True
+        )
+        self.assertFalse(scan)
+        self.assertEqual(scan.normalized_text, u'class, alert one')
+
+    def test_whole_words_phrase(self):
+        scan = self.utility.scan(
+            u'this is ONE alert',
+            u'ass\none alert',
+            whole_words=True
+        )
+        self.assertEqual(scan.matches, [(8, 17, 1)])
+
+    def test_whole_words_version(self):
+        self.assertNotEqual(
+            self.utility.compile_stop_words(u'ass').version,
+            self.utility.compile_stop_words(u'ass', whole_words=True).version
+        )
+
+    def test_no_stop_word_in_text(self):
+        scan = self.utility.scan(u'Random normal text', u'one\ntwo')
+        self.assertFalse(scan)
+        self.assertEqual(scan.matches, [])
+
+    def test_stop_words_in_text(self):
+        scan = self.utility.scan(u'Alerts two and ONE', u'one\ntwo')
+        self.assertTrue(scan)
+        self.assertEqual(scan.normalized_text, u'alerts two and one')
+        self.assertEqual(sorted(scan.matches), [(7, 10, 1), (15, 18, 0)])
+
+    def test_version(self):
+        stop_words = u'one\ntwo'
+        scan = self.utility.scan(u'Alerts two', stop_words)
+        self.assertEqual(scan.version, stop_words_version(stop_words))
+
+    def test_words(self):
+        scan = self.utility.scan(u'two one two', u'one\ntwo\nthree')
+        self.assertEqual(scan.words, (u'one', u'two', ))
+
+    def test_format_snippets(self):
+        text = u'Alerts two text and one more text'
+        stop_words = u'one\ntwo'
+        scan = self.utility.scan(text, stop_words)
+        self.assertEqual(
+            self.utility.format_snippets(scan, chars=3),
+            self.utility.get_snippets(text, stop_words, chars=3)
+        )
+
+    def test_format_no_scan(self):
+        self.assertEqual(self.utility.format_snippets(None), u'')
+
+
+class FindMatchesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.utility = Alert()
+
+    def test_no_text(self):
+        self.assertEqual(list(self.utility.find_matches(None, u'one')), [])
+
+    def test_no_stop_words(self):
+        self.assertEqual(list(self.utility.find_matches(u'one', u'\n')), [])
+
+    def test_no_stop_word_in_text(self):
+        matches = self.utility.find_matches(u'Random normal text', u'one')
+        self.assertEqual(list(matches), [])
+
+    def test_match(self):
+        matches = list(self.utility.find_matches(u'Alerts Twö', u'Twö'))
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].start, 7)
+        self.assertEqual(matches[0].end, 10)
+        self.assertEqual(matches[0].word, u'two')
+        self.assertEqual(matches[0].original, u'Twö')
+
+    def test_all_occurrences(self):
+        matches = self.utility.find_matches(
+            u'one alert, and another alert',
+            u'one alert\nalert'
+        )
+        self.assertEqual(
+            [(match.start, match.original) for match in matches],
+            [(0, u'one alert'), (4, u'alert'), (23, u'alert')]
+        )
+
+    def test_lazy(self):
+        matches = self.utility.find_matches(u'one two', u'one\ntwo')
+        self.assertEqual(next(matches).word, u'one')
+
+    def test_compact(self):
+        match = next(self.utility.find_matches(u'one', u'one'))
+        self.assertFalse(hasattr(match, '__dict__'))
+
+
+class PatternsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.utility = Alert()
+
+    def test_wildcard(self):
+        self.assertTrue(
+            self.utility.has_stop_words(u'Get FREE Mooney', u'free mo*y')
+        )
+        self.assertFalse(
+            self.utility.has_stop_words(u'Get free mo', u'free mo*y')
+        )
+
+    def test_wildcard_normalized(self):
+        self.assertTrue(
+            self.utility.has_stop_words(u'Ünïcode', u'ÜNI*de')
+        )
+
+    def test_regex(self):
+        self.assertTrue(
+            self.utility.has_stop_words(u'fr33 cash', u're:fr[e3]+ cash')
+        )
+
+    def test_wildcards_linear(self):
+        """Wildcards do not take quadratic time on long words."""
+        matcher = self.utility.compile_stop_words(u'*a\nab*c\nfree mon*y')
+        for text in (u'b' * 100000, u'ab' * 50000):
+            start = time.time()
+            self.utility.has_stop_words(text, matcher)
+            self.assertTrue(time.time() - start < 1)
+
+    def test_polynomial_patterns_skipped(self):
+        """Unvalidated stop words that take polynomial time are skipped."""
+        matcher = self.utility.compile_stop_words(
+            u're:x[^x]*[^x]*[^x]*y\na*a*a*a*a*z'
+        )
+        for text in (u'x' + u'b' * 2400, u'a' * 305):
+            start = time.time()
+            self.assertFalse(self.utility.has_stop_words(text, matcher))
+            self.assertTrue(time.time() - start < 1)
+
+    def test_snippets(self):
+        self.assertEqual(
+            self.utility.get_snippets(u'get free money', u'free mon*y', 1),
+            u'free mon*y\n\n... free money...'
+        )
+
+    def test_match(self):
+        matches = list(self.utility.find_matches(
+            u'free monkey and one',
+            u'one\nFree mon*y'
+        ))
+        self.assertEqual(
+            [(match.start, match.end, match.word, match.original)
+             for match in matches],
+            [
+                (0, 11, u'free mon*y', u'Free mon*y'),
+                (16, 19, u'one', u'one'),
+            ]
+        )
+
 
 class HasStopWordsTestCase(unittest.TestCase):
 
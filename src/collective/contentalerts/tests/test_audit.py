@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.audit import Audit
+from collective.contentalerts.audit import discard_alerts
+from collective.contentalerts.contentrules import TextAlertConditionExecutor
+from collective.contentalerts.contentrules import get_found_stop_words
+from collective.contentalerts.interfaces import IHasStopWords
+from collective.contentalerts.interfaces import IStopWords
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_FUNCTIONAL_TESTING  # noqa
+from plone import api
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from plone.registry.interfaces import IRegistry
+from zExceptions import Forbidden
+from zope.component import getUtility
+from zope.interface import alsoProvides
+
+import transaction
+import unittest
+
+
+class AuditTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_FUNCTIONAL_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+
+        records = getUtility(IRegistry).forInterface(IStopWords)
+        records.stop_words = u'one alert\nanother alert'
+
+        self.alert = self._create('alert', 'this gives one alert')
+        self.no_alert = self._create('no-alert', 'this does not')
+        transaction.commit()
+
+    def _create(self, id_, text):
+        document = api.content.create(
+            container=self.portal,
+            id=id_,
+            title=id_,
+            type='Document'
+        )
+        document.setText(text)
+        return document
+
+    def _catalog_size(self):
+        catalog = api.portal.get_tool('portal_catalog')
+        return len(catalog._catalog.paths)
+
+    def test_flag_existing_content(self):
+        Audit(self.portal, batch_size=1).run()
+        self.assertTrue(IHasStopWords.providedBy(self.portal['alert']))
+        self.assertFalse(IHasStopWords.providedBy(self.portal['no-alert']))
+
+    def test_flag_existing_content_with_workers(self):
+        status = Audit(self.portal, workers=2).run()
+        self.assertTrue(IHasStopWords.providedBy(self.portal['alert']))
+        self.assertFalse(IHasStopWords.providedBy(self.portal['no-alert']))
+        self.assertEqual(status['scanned'], self._catalog_size())
+
+    def test_stop_words_found(self):
+        Audit(self.portal).run()
+        self.assertEqual(
+            get_found_stop_words(self.portal['alert']),
+            (u'one alert', )
+        )
+        brains = api.content.find(stop_words=u'one alert')
+        self.assertEqual([brain.getId for brain in brains], ['alert'])
+        self.assertEqual(brains[0].stop_words, (u'one alert', ))
+
+    def test_stop_words_found_with_workers(self):
+        Audit(self.portal, workers=2).run()
+        self.assertEqual(
+            get_found_stop_words(self.portal['alert']),
+            (u'one alert', )
+        )
+        brains = api.content.find(stop_words=u'one alert')
+        self.assertEqual([brain.getId for brain in brains], ['alert'])
+
+    def test_unflag_existing_content(self):
+        alsoProvides(self.no_alert, IHasStopWords)
+        transaction.commit()
+
+        status = Audit(self.portal).run()
+        self.assertFalse(IHasStopWords.providedBy(self.portal['no-alert']))
+        self.assertEqual(status['unflagged'], 1)
+        self.assertEqual(status['flagged'], 1)
+
+    def test_all_objects_scanned(self):
+        status = Audit(self.portal, batch_size=1).run()
+        self.assertEqual(status['scanned'], self._catalog_size())
+        self.assertIsNotNone(status['finished'])
+
+    def test_resume(self):
+        audit = Audit(self.portal, batch_size=1)
+        status = audit.run(max_batches=1)
+        self.assertEqual(status['scanned'], 1)
+        self.assertIsNotNone(status['cursor'])
+        self.assertIsNone(status['finished'])
+
+        status = Audit(self.portal, batch_size=1).run()
+        self.assertEqual(status['scanned'], self._catalog_size())
+        self.assertIsNotNone(status['finished'])
+
+    def test_reset(self):
+        audit = Audit(self.portal, batch_size=1)
+        audit.run(max_batches=1)
+        audit.reset()
+        self.assertIsNone(audit.status['cursor'])
+        self.assertEqual(audit.status['scanned'], 0)
+
+    def test_no_stop_words(self):
+        audit = Audit(self.portal, stop_words=u'')
+        with self.assertRaises(ValueError):
+            audit.run()
+
+    def _view(self):
+        return api.content.get_view(
+            name='contentalerts-audit',
+            context=self.portal,
+            request=self.request
+        )
+
+    def test_view(self):
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form.update({
+            'run': '1',
+            '_authenticator': api.content.get_view(
+                name='authenticator',
+                context=self.portal,
+                request=self.request
+            ).token(),
+        })
+        self.assertIn(
+            'scanned: {0}'.format(self._catalog_size()),
+            self._view()()
+        )
+        self.assertTrue(IHasStopWords.providedBy(self.portal['alert']))
+
+    def test_view_report(self):
+        self.assertIn('scanned: 0', self._view()())
+
+    def test_view_run_get_forbidden(self):
+        self.request.form['run'] = '1'
+        self.assertRaises(Forbidden, self._view())
+        self.assertFalse(IHasStopWords.providedBy(self.portal['alert']))
+
+    def test_view_invalid_batch_size(self):
+        self.request.form['batch_size'] = 'many'
+        self.assertIn('positive integer', self._view()())
+        self.assertEqual(self.request.response.getStatus(), 400)
+
+    def test_discard_alerts(self):
+        """Alerts are discarded on as many transactions as batches."""
+        for obj in (self.alert, self.no_alert):
+            TextAlertConditionExecutor._apply_marker_interface(obj, True)
+        transaction.commit()
+
+        discarded = discard_alerts(self.portal, {}, batch_size=1)
+        transaction.commit()
+        self.assertEqual(discarded, 2)
+        self.assertFalse(IHasStopWords.providedBy(self.portal['alert']))
+        self.assertFalse(api.content.find(has_stop_words=True))
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
-from Testing.ZopeTestCase.utils import setupCoreSessions
+from collective.contentalerts.contentrules import MAX_VERDICTS
 from collective.contentalerts.contentrules import TextAlertCondition
 from collective.contentalerts.contentrules import TextAlertConditionEditForm
+from collective.contentalerts.contentrules import cache_verdict
+from collective.contentalerts.contentrules import get_cached_verdict
+from collective.contentalerts.contentrules import get_remembered_scan
+from collective.contentalerts.interfaces import IAlert
 from collective.contentalerts.interfaces import IHasStopWords
 from collective.contentalerts.interfaces import IStopWords
 from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_DEXTERITY_INTEGRATION_TESTING  # noqa
 from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.utilities import stop_words_version
+from collective.contentalerts.wordlist import add_word_list
 from plone import api
 from plone.app.contentrules.rule import Rule
 from plone.app.discussion.interfaces import IConversation
@@ -21,7 +27,10 @@ from zope.component import getAdapter
 from zope.component import getMultiAdapter
 from zope.component import getUtility
 from zope.component.interfaces import IObjectEvent
+from zope.event import notify
 from zope.interface import implementer
+from zope.interface import noLongerProvides
+from zope.lifecycleevent import ObjectModifiedEvent
 
 import unittest
 
@@ -134,6 +143,41 @@ class TextAlertConditionTestCase(unittest.TestCase):
             isinstance(edit_view, TextAlertConditionEditForm)
         )
 
+    def test_matcher_cached_on_condition(self):
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        self.assertIs(condition.get_matcher(), condition.get_matcher())
+
+    def test_no_stop_words_no_matcher(self):
+        condition = TextAlertCondition()
+        self.assertIsNone(condition.get_matcher())
+
+    def test_matcher_rebuilt_on_stop_words_change(self):
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        matcher = condition.get_matcher()
+
+        condition.stop_words = u'last one'
+        self.assertIsNot(matcher, condition.get_matcher())
+        self.assertEqual(condition.get_matcher().words, (u'last one', ))
+
+    def test_matcher_rebuilt_on_whole_words_change(self):
+        condition = TextAlertCondition()
+        condition.stop_words = u'ass'
+        matcher = condition.get_matcher()
+        self.assertFalse(matcher.whole_words)
+
+        condition.whole_words = True
+        self.assertTrue(condition.get_matcher().whole_words)
+
+    def test_matcher_dropped_on_edit(self):
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        condition.get_matcher()
+
+        notify(ObjectModifiedEvent(condition))
+        self.assertIsNone(condition._v_matcher)
+
     def test_empty_text_no_condition(self):
         comment = self._add_comment('')
         condition = TextAlertCondition()
@@ -388,9 +432,43 @@ class TextAlertConditionTestCase(unittest.TestCase):
         executable()
         brains = api.content.find(
             self.portal,
-            object_provides=IHasStopWords.__identifier__
+            has_stop_words=True
         )
         self.assertEqual(len(brains), 1)
+        self.assertEqual(brains[0].stop_words, (u'one alert', ))
+
+    def test_stop_words_found_updated_on_catalog(self):
+        document = api.content.create(
+            container=self.portal,
+            id='doc2',
+            title='Document 2',
+            type='Document'
+        )
+        document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+
+        executable = getMultiAdapter(
+            (self.portal, condition, ContentTypeDummyEvent(document)),
+            IExecutable
+        )
+        executable()
+        document.setText('this gives another alert and one alert')
+        executable()
+        brains = api.content.find(self.portal, has_stop_words=True)
+        self.assertEqual(
+            brains[0].stop_words,
+            (u'another alert', u'one alert', )
+        )
+
+        document.setText('no alert anymore')
+        executable()
+        brains = api.content.find(
+            self.portal,
+            UID=document.UID(),
+            has_stop_words=False
+        )
+        self.assertEqual(brains[0].stop_words, ())
 
     def test_no_stop_words_no_interface_on_catalog(self):
         comment = self._add_comment('no alert')
@@ -404,7 +482,7 @@ class TextAlertConditionTestCase(unittest.TestCase):
         executable()
         brains = api.content.find(
             self.portal,
-            object_provides=IHasStopWords.__identifier__
+            has_stop_words=True
         )
         self.assertEqual(len(brains), 0)
 
@@ -423,7 +501,7 @@ class TextAlertConditionTestCase(unittest.TestCase):
         executable()
         brains = api.content.find(
             self.portal,
-            object_provides=IHasStopWords.__identifier__
+            has_stop_words=True
         )
         self.assertEqual(len(brains), 1)
 
@@ -431,10 +509,224 @@ class TextAlertConditionTestCase(unittest.TestCase):
         executable()
         brains = api.content.find(
             self.portal,
-            object_provides=IHasStopWords.__identifier__
+            has_stop_words=True
         )
         self.assertEqual(len(brains), 0)
 
+    def test_scan_remembered_on_request(self):
+        comment = self._add_comment('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+
+        executable = getMultiAdapter(
+            (self.portal, condition, CommentDummyEvent(comment)),
+            IExecutable
+        )
+        executable()
+        scan = get_remembered_scan(
+            self.request,
+            comment,
+            comment.text,
+            stop_words_version(condition.stop_words)
+        )
+        self.assertTrue(scan)
+        self.assertEqual(scan.text, comment.text)
+
+    def test_remembered_scan_not_used_if_text_changes(self):
+        comment = self._add_comment('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+
+        executable = getMultiAdapter(
+            (self.portal, condition, CommentDummyEvent(comment)),
+            IExecutable
+        )
+        executable()
+        self.assertIsNone(
+            get_remembered_scan(
+                self.request,
+                comment,
+                u'some other text',
+                stop_words_version(condition.stop_words)
+            )
+        )
+
+    def test_remembered_scan_not_used_for_other_stop_words(self):
+        comment = self._add_comment('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+
+        executable = getMultiAdapter(
+            (self.portal, condition, CommentDummyEvent(comment)),
+            IExecutable
+        )
+        executable()
+        self.assertIsNone(
+            get_remembered_scan(
+                self.request,
+                comment,
+                comment.text,
+                stop_words_version(u'one alert')
+            )
+        )
+
+    def test_substitution_reuses_condition_scan(self):
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+
+        executable = getMultiAdapter(
+            (self.portal, condition, ContentTypeDummyEvent(self.document)),
+            IExecutable
+        )
+        executable()
+
+        text_alert = getAdapter(
+            self.document,
+            IStringSubstitution,
+            name=u'text_alert'
+        )
+        alert_utility = getUtility(IAlert)
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError('the text should not be scanned again')
+
+        alert_utility.scan = no_scan
+        try:
+            self.assertIn('one alert', text_alert())
+        finally:
+            del alert_utility.scan
+
+    def _execute_on_document(self, condition):
+        executable = getMultiAdapter(
+            (self.portal, condition, ContentTypeDummyEvent(self.document)),
+            IExecutable
+        )
+        return executable()
+
+    def test_unchanged_text_not_scanned_again(self):
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        self.assertTrue(self._execute_on_document(condition))
+
+        alert_utility = getUtility(IAlert)
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError('the text should not be scanned again')
+
+        alert_utility.scan = no_scan
+        try:
+            self.document.setSubject(['another', 'tag'])
+            self.assertTrue(self._execute_on_document(condition))
+        finally:
+            del alert_utility.scan
+
+    def test_whole_words(self):
+        self.document.setText('this is a classic')
+        condition = TextAlertCondition()
+        condition.stop_words = u'class'
+        self.assertTrue(self._execute_on_document(condition))
+
+        condition.whole_words = True
+        self.assertFalse(self._execute_on_document(condition))
+
+    def test_changed_text_scanned_again(self):
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        self.assertTrue(self._execute_on_document(condition))
+
+        self.document.setText('this does not')
+        self.assertFalse(self._execute_on_document(condition))
+
+    def test_changed_stop_words_scanned_again(self):
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        self.assertTrue(self._execute_on_document(condition))
+
+        condition.stop_words = u'another alert'
+        self.assertFalse(self._execute_on_document(condition))
+
+    def test_word_list(self):
+        add_word_list('spam').add(u'one alert')
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.word_list = 'spam'
+        self.assertTrue(self._execute_on_document(condition))
+        self.assertEqual(self.request.get('word_list'), 'spam')
+
+        self.document.setText('this does not')
+        self.assertFalse(self._execute_on_document(condition))
+
+    def test_word_list_not_the_default(self):
+        self.records.stop_words = u'one alert'
+        add_word_list('spam').add(u'another alert')
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.word_list = 'spam'
+        self.assertFalse(self._execute_on_document(condition))
+
+    def test_missing_word_list(self):
+        self.records.stop_words = u'one alert'
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.word_list = 'spam'
+        self.assertFalse(self._execute_on_document(condition))
+
+    def test_stop_words_take_precedence_over_word_list(self):
+        add_word_list('spam').add(u'one alert')
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'another alert'
+        condition.word_list = 'spam'
+        self.assertFalse(self._execute_on_document(condition))
+        self.assertIsNone(self.request.get('word_list'))
+
+    def test_word_list_substitution(self):
+        add_word_list('spam').add(u'one alert')
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.word_list = 'spam'
+        self._execute_on_document(condition)
+
+        text_alert = getAdapter(
+            self.document,
+            IStringSubstitution,
+            name=u'text_alert'
+        )
+        self.assertIn(u'one alert', text_alert())
+
+    def test_cached_verdict_keeps_marker_interface(self):
+        self.document.setText('this gives one alert')
+        condition = TextAlertCondition()
+        condition.stop_words = u'one alert\nanother alert'
+        self._execute_on_document(condition)
+        noLongerProvides(self.document, IHasStopWords)
+
+        self._execute_on_document(condition)
+        self.assertTrue(IHasStopWords.providedBy(self.document))
+
+    def test_cached_verdict_per_stop_words(self):
+        """Rules with different stop words do not drop each other's."""
+        cache_verdict(self.document, 'digest', 'global', True)
+        cache_verdict(self.document, 'digest', 'spam', False)
+        self.assertTrue(get_cached_verdict(self.document, 'digest', 'global'))
+        self.assertIs(
+            get_cached_verdict(self.document, 'digest', 'spam'),
+            False
+        )
+        self.assertIsNone(get_cached_verdict(self.document, 'other', 'spam'))
+
+    def test_cached_verdicts_bounded(self):
+        for index in range(MAX_VERDICTS + 1):
+            cache_verdict(self.document, 'digest', str(index), True)
+        self.assertIsNone(get_cached_verdict(self.document, 'digest', '0'))
+        self.assertTrue(
+            get_cached_verdict(self.document, 'digest', str(MAX_VERDICTS))
+        )
+
 
 class DexterityTextAlertConditionTestCase(unittest.TestCase):
     layer = COLLECTIVE_CONTENTALERTS_DEXTERITY_INTEGRATION_TESTING
@@ -492,8 +784,6 @@ class ContentRulesSubstitutionsTest(unittest.TestCase):
     layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
 
     def setUp(self):
-        setupCoreSessions(self.layer['app'])
-
         self.portal = self.layer['portal']
         self.request = self.layer['request']
         setRoles(self.portal, TEST_USER_ID, ['Manager'])
@@ -513,6 +803,16 @@ class ContentRulesSubstitutionsTest(unittest.TestCase):
         comment.author_email = 'jim@example.com'
         conversation = IConversation(self.document)
         conversation.addComment(comment)
+        return comment
+
+    def _execute_on_comment(self, comment, stop_words=u'random'):
+        condition = TextAlertCondition()
+        condition.stop_words = stop_words
+        executable = getMultiAdapter(
+            (self.portal, condition, CommentDummyEvent(comment)),
+            IExecutable
+        )
+        return executable()
 
     def test_stop_words_on_request(self):
         stop_words = 'hi\nI am around'
@@ -537,7 +837,7 @@ class ContentRulesSubstitutionsTest(unittest.TestCase):
 
     def test_get_text_from_comment(self):
         text = 'some random text'
-        self._add_comment(text=text)
+        self._execute_on_comment(self._add_comment(text=text))
         text_alert = getAdapter(
             self.document,
             IStringSubstitution,
@@ -548,6 +848,62 @@ class ContentRulesSubstitutionsTest(unittest.TestCase):
             text
         )
 
+    def test_comment_not_checked_no_text(self):
+        """Only the comment checked by the text alert condition is used."""
+        self._add_comment(text='some random text')
+        text_alert = getAdapter(
+            self.document,
+            IStringSubstitution,
+            name=u'comment_alert'
+        )
+        self.assertEqual(text_alert._get_text(), u'')
+
+    def test_comment_not_checked_form_text(self):
+        """Without a checked comment, the comment form text is used."""
+        self.request.form['form.widgets.text'] = 'some posted text'
+        text_alert = getAdapter(
+            self.document,
+            IStringSubstitution,
+            name=u'comment_alert'
+        )
+        self.assertEqual(text_alert._get_text(), u'some posted text')
+
+    def test_comment_checked_over_form_text(self):
+        self.request.form['form.widgets.text'] = 'some posted text'
+        self._execute_on_comment(self._add_comment(text='some random text'))
+        text_alert = getAdapter(
+            self.document,
+            IStringSubstitution,
+            name=u'comment_alert'
+        )
+        self.assertEqual(text_alert._get_text(), u'some random text')
+
+    def test_comment_scan_reused(self):
+        comment = self._add_comment(text='some random text')
+        self.assertTrue(self._execute_on_comment(comment))
+        text_alert = getAdapter(
+            self.document,
+            IStringSubstitution,
+            name=u'comment_alert'
+        )
+        scan = get_remembered_scan(
+            self.request,
+            comment,
+            comment.text,
+            stop_words_version(u'random')
+        )
+        self.assertIsNotNone(scan)
+        self.assertIs(
+            get_remembered_scan(
+                self.request,
+                text_alert._get_scanned_object(),
+                text_alert._get_text(),
+                stop_words_version(u'random')
+            ),
+            scan
+        )
+        self.assertIn(u'random', text_alert())
+
     def test_no_comment_no_text(self):
         text_alert = getAdapter(
             self.document,
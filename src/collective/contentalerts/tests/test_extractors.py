@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.interfaces import ITextExtractor
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_DEXTERITY_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.utilities import Alert
+from collective.contentalerts.utilities import FIELD_SEPARATOR
+from collective.contentalerts.utilities import get_text
+from plone import api
+from plone.app.discussion.interfaces import IConversation
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from plone.app.textfield.value import RichTextValue
+from zope.component import adapter
+from zope.component import createObject
+from zope.component import getGlobalSiteManager
+from zope.interface import Interface
+from zope.interface import alsoProvides
+from zope.interface import implementer
+
+import unittest
+
+
+class IDummy(Interface):
+    """Marker interface to register a custom extractor for."""
+
+
+class Dummy(object):
+
+    text = None
+
+
+@implementer(ITextExtractor)
+@adapter(IDummy)
+class DummyTextExtractor(object):
+
+    def __init__(self, context):
+        self.context = context
+
+    def __call__(self):
+        yield u'first field'
+        yield None
+        yield 'second field'
+
+
+class GetTextTestCase(unittest.TestCase):
+
+    def test_no_extractor_text_attribute(self):
+        obj = Dummy()
+        obj.text = u'some text'
+        self.assertEqual(get_text(obj), u'some text')
+
+    def test_no_extractor_no_text(self):
+        self.assertIsNone(get_text(Dummy()))
+
+    def test_str_decoded(self):
+        obj = Dummy()
+        obj.text = 'älert'
+        self.assertEqual(get_text(obj), u'älert')
+
+    def test_custom_extractor(self):
+        site_manager = getGlobalSiteManager()
+        site_manager.registerAdapter(DummyTextExtractor)
+        try:
+            obj = Dummy()
+            alsoProvides(obj, IDummy)
+            self.assertEqual(
+                get_text(obj),
+                u'first field{0}second field'.format(FIELD_SEPARATOR)
+            )
+        finally:
+            site_manager.unregisterAdapter(DummyTextExtractor)
+
+    def test_stop_words_do_not_match_across_fields(self):
+        text = FIELD_SEPARATOR.join([u'the first', u'field'])
+        alert_utility = Alert()
+        self.assertFalse(
+            alert_utility.has_stop_words(text, stop_words=u'first field')
+        )
+        self.assertFalse(
+            alert_utility.has_stop_words(text, stop_words=u'first*field')
+        )
+        self.assertTrue(
+            alert_utility.has_stop_words(text, stop_words=u'field')
+        )
+
+
+class ArchetypesTextExtractorTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.document = api.content.create(
+            container=self.portal,
+            id='doc1',
+            title='Document title',
+            description='Document description',
+            type='Document'
+        )
+        self.document.setText('<p>Document text</p>')
+
+    def test_fields(self):
+        self.assertEqual(
+            get_text(self.document),
+            FIELD_SEPARATOR.join([
+                u'Document title',
+                u'Document description',
+                u'<p>Document text</p>',
+            ])
+        )
+
+    def test_no_transforms(self):
+        def transform(*args, **kwargs):
+            raise AssertionError('getText should not be called')
+
+        self.document.getText = transform
+        self.assertIn(u'Document text', get_text(self.document))
+
+    def test_comment(self):
+        comment = createObject('plone.Comment')
+        comment.text = 'Comment text'
+        conversation = IConversation(self.document)
+        comment = conversation[conversation.addComment(comment)]
+        self.assertEqual(get_text(comment), u'Comment text')
+
+
+class DexterityTextExtractorTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_DEXTERITY_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.document = api.content.create(
+            container=self.portal,
+            id='doc1',
+            title=u'Document title',
+            description=u'Document description',
+            type='Document'
+        )
+
+    def test_rich_text_raw(self):
+        self.document.text = RichTextValue(
+            u'<p>Document text</p>',
+            'text/html',
+            'text/x-html-safe'
+        )
+        self.assertEqual(
+            get_text(self.document),
+            FIELD_SEPARATOR.join([
+                u'Document title',
+                u'Document description',
+                u'<p>Document text</p>',
+            ])
+        )
+
+    def test_plain_text(self):
+        self.document.text = u'Document text'
+        self.assertIn(u'Document text', get_text(self.document))
+
+    def test_no_text(self):
+        self.assertEqual(
+            get_text(self.document),
+            FIELD_SEPARATOR.join([
+                u'Document title',
+                u'Document description',
+            ])
+        )
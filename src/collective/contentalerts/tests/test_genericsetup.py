@@ -22,6 +22,12 @@ class GenericSetupTest(unittest.TestCase):
         record = 'collective.contentalerts.interfaces.IStopWords.stop_words'
         self.assertIsNone(api.portal.get_registry_record(record))
 
+    def test_slow_scan_threshold_record(self):
+        """Check that slow scans are not logged by default."""
+        record = 'collective.contentalerts.interfaces.IStopWords.' \
+                 'slow_scan_threshold'
+        self.assertEqual(api.portal.get_registry_record(record), 0)
+
     def test_roles_with_permission(self):
         """Check that the permission is given to the appropriate roles."""
         permission = 'collective.contentalerts: Edit stop words'
@@ -55,3 +61,25 @@ class GenericSetupTest(unittest.TestCase):
             'collective.contentalerts.settings',
             actions_ids
         )
+        self.assertIn(
+            'collective.contentalerts.word_list',
+            actions_ids
+        )
+
+    def test_folder_button(self):
+        """Check that flagged content can be discarded from folder_contents."""
+        actions = api.portal.get_tool('portal_actions')
+        self.assertIn('discard_alerts', actions.folder_buttons.objectIds())
+
+    def test_catalog_index(self):
+        """Check that flagged content has its own index."""
+        catalog = api.portal.get_tool('portal_catalog')
+        self.assertEqual(
+            catalog._catalog.getIndex('has_stop_words').meta_type,
+            'BooleanIndex'
+        )
+
+    def test_catalog_metadata(self):
+        """Check that the stop words found are on the catalog metadata."""
+        catalog = api.portal.get_tool('portal_catalog')
+        self.assertIn('stop_words', catalog.schema())
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts import incremental
+from collective.contentalerts.incremental import INCREMENTAL_KEY
+from collective.contentalerts.incremental import incremental_scan
+from collective.contentalerts.incremental import normalize_blocks
+from collective.contentalerts.incremental import scan_blocks
+from collective.contentalerts.incremental import split_blocks
+from collective.contentalerts.interfaces import IAlert
+from collective.contentalerts.matcher import StopWordsMatcher
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.utilities import Alert
+from collective.contentalerts.utilities import get_versioned
+from plone import api
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from zope.annotation.interfaces import IAnnotations
+from zope.component import getUtility
+
+import random
+import unittest
+
+
+TEXT = u''.join(
+    u'<p>Paragraph {0} has  an alert,\n on it &amp; ändern</p>\n'.format(i)
+    for i in range(40)
+)
+
+
+class IncrementalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # small blocks, so that short texts are split on many of them
+        self.sizes = (incremental.MIN_BLOCK_SIZE, incremental.MAX_BLOCK_SIZE)
+        incremental.MIN_BLOCK_SIZE = 32
+        incremental.MAX_BLOCK_SIZE = 128
+        incremental._normalized_cache.clear()
+
+    def tearDown(self):
+        incremental.MIN_BLOCK_SIZE, incremental.MAX_BLOCK_SIZE = self.sizes
+        incremental._normalized_cache.clear()
+
+    def _matcher(self, whole_words=False):
+        return StopWordsMatcher(
+            [u'alert', u'paragraph 1', u'amp ander', u'n'],
+            version='1',
+            whole_words=whole_words
+        )
+
+    def _assert_same_scan(self, text, matcher, state):
+        scan, state = scan_blocks(text, matcher, state)
+        expected = Alert().scan(text, stop_words=matcher)
+        self.assertEqual(scan.normalized_text, expected.normalized_text)
+        self.assertEqual(scan.matches, expected.matches)
+        return state
+
+    def test_split_blocks(self):
+        blocks = split_blocks(TEXT)
+        self.assertTrue(len(blocks) > 1)
+        self.assertEqual(u''.join(blocks), TEXT)
+
+    def test_split_blocks_content_defined(self):
+        """Only the blocks around an edit change."""
+        blocks = split_blocks(TEXT)
+        edited = split_blocks(u'<p>new</p>\n' + TEXT)
+        self.assertEqual(blocks[-5:], edited[-5:])
+
+    def test_normalize_blocks(self):
+        normalized, fingerprints = normalize_blocks(split_blocks(TEXT))
+        self.assertEqual(u''.join(normalized), Alert.html_normalize(TEXT))
+        self.assertEqual(len(normalized), len(fingerprints))
+
+    def test_normalize_blocks_whitespace(self):
+        """Whitespace runs spanning two blocks are a single space."""
+        normalized, fingerprints = normalize_blocks([u'one  ', u'  two'])
+        self.assertEqual(normalized, [u'one ', u'two'])
+        self.assertFalse(fingerprints[0][1])
+        self.assertTrue(fingerprints[1][1])
+
+    def test_normalize_blocks_entities(self):
+        """Spaces from entities are not collapsed, as on the whole text."""
+        for blocks in ([u'one\n', u'&nbsp;two'], [u'one&nbsp;', u'\ntwo'],
+                       [u'one \n', u'\t', u'\n', u'&#160; two']):
+            normalized, fingerprints = normalize_blocks(blocks)
+            self.assertEqual(
+                u''.join(normalized),
+                Alert.html_normalize(u''.join(blocks))
+            )
+
+    def test_normalized_cache_bounded(self):
+        """The cache is bounded by the characters it keeps."""
+        chars = incremental.NORMALIZED_CACHE_CHARS
+        incremental.NORMALIZED_CACHE_CHARS = 1000
+        try:
+            blocks = [u'block {0} '.format(index) * 10 for index in range(50)]
+            normalize_blocks(blocks)
+        finally:
+            incremental.NORMALIZED_CACHE_CHARS = chars
+        cache = incremental._normalized_cache
+        self.assertTrue(cache.chars <= 1000)
+        self.assertEqual(cache.chars, sum(map(len, cache.values())))
+
+    def test_scan_blocks(self):
+        matcher = self._matcher()
+        scan, state = scan_blocks(TEXT, matcher)
+        self.assertEqual(scan.matches,
+                         Alert().scan(TEXT, stop_words=matcher).matches)
+        self.assertEqual(state[0], '1')
+
+    def test_scan_blocks_unchanged(self):
+        matcher = self._matcher()
+        scan, state = scan_blocks(TEXT, matcher)
+        scan_again, state_again = scan_blocks(TEXT, matcher, state)
+        self.assertEqual(scan.matches, scan_again.matches)
+        self.assertEqual(state, state_again)
+
+    def test_scan_blocks_other_version(self):
+        """A state of other stop words is not reused."""
+        scan, state = scan_blocks(TEXT, self._matcher())
+        matcher = StopWordsMatcher([u'on it'], version='2')
+        scan, state = scan_blocks(TEXT, matcher, state)
+        self.assertEqual(len(scan.matches), 40)
+
+    def test_scan_blocks_edits(self):
+        """Random edits find the same as scanning the whole text."""
+        rand = random.Random(42)
+        pieces = [u'alert', u' ', u'  ', u'\n', u'<br/>', u'&amp;', u'ä',
+                  u'n', u'paragraph 1', u'x']
+        for whole_words in (False, True):
+            matcher = self._matcher(whole_words)
+            text = TEXT
+            state = self._assert_same_scan(text, matcher, None)
+            for _ in range(100):
+                start = rand.randint(0, len(text))
+                end = min(len(text), start + rand.randint(0, 20))
+                insert = u''.join(
+                    rand.choice(pieces) for _ in range(rand.randint(0, 4))
+                )
+                text = text[:start] + insert + text[end:]
+                state = self._assert_same_scan(text, matcher, state)
+
+    def test_scan_blocks_random_texts(self):
+        """Any text gives the same scan as scanning the whole text."""
+        rand = random.Random(42)
+        pieces = [u'free', u'été', u'ete', u' ', u'  ', u'\n', u'\n\n',
+                  u'\t', u'&nbsp;', u'&#160;', u'&amp;', u'&eacute;',
+                  u'<p>', u'</p>\n', u'\xa0', u'\xa8', u'x']
+        for whole_words in (False, True):
+            matcher = Alert().compile_stop_words(
+                u'free été\nete\nx x',
+                whole_words=whole_words
+            )
+            state = None
+            for _ in range(200):
+                text = u''.join(
+                    rand.choice(pieces) for _ in range(rand.randint(0, 300))
+                )
+                self._assert_same_scan(text, matcher, None)
+                state = self._assert_same_scan(text, matcher, state)
+
+
+class IncrementalScanTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.document = api.content.create(
+            container=self.portal,
+            type='Document',
+            id='doc',
+        )
+        self.utility = getUtility(IAlert)
+
+    def _text(self, size):
+        return TEXT * (size // len(TEXT) + 1)
+
+    def test_long_text(self):
+        text = self._text(incremental.MIN_TEXT_SIZE)
+        matcher = StopWordsMatcher([u'alert'], version='1')
+        scan = incremental_scan(self.document, text, matcher)
+        self.assertEqual(
+            scan.matches,
+            self.utility.scan(text, stop_words=matcher).matches
+        )
+        self.assertIn(INCREMENTAL_KEY, IAnnotations(self.document))
+
+        text = u'<p>an alert</p>' + text
+        scan = incremental_scan(self.document, text, matcher)
+        self.assertEqual(
+            scan.matches,
+            self.utility.scan(text, stop_words=matcher).matches
+        )
+
+    def test_state_per_stop_words(self):
+        """Rules with different stop words do not drop each other's."""
+        text = self._text(incremental.MIN_TEXT_SIZE)
+        first = StopWordsMatcher([u'alert'], version='1')
+        second = StopWordsMatcher([u'and'], version='2')
+        incremental_scan(self.document, text, first)
+        incremental_scan(self.document, text, second)
+        annotations = IAnnotations(self.document)
+        self.assertIsNotNone(get_versioned(annotations, INCREMENTAL_KEY, '1'))
+        self.assertIsNotNone(get_versioned(annotations, INCREMENTAL_KEY, '2'))
+
+    def test_short_text(self):
+        matcher = StopWordsMatcher([u'alert'], version='1')
+        incremental_scan(self.document, self._text(30000), matcher)
+        scan = incremental_scan(self.document, TEXT, matcher)
+        self.assertEqual(len(scan.matches), 40)
+        self.assertNotIn(INCREMENTAL_KEY, IAnnotations(self.document))
+
+    def test_patterns(self):
+        """Stop words with patterns are always scanned in full."""
+        matcher = StopWordsMatcher(
+            [u'alert'],
+            version='1',
+            patterns=[(u'and*n', u'and\\w{0,30}n')]
+        )
+        scan = incremental_scan(self.document, self._text(30000), matcher)
+        self.assertTrue(scan.matches)
+        self.assertNotIn(INCREMENTAL_KEY, IAnnotations(self.document))
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.matcher import ExtendedMatcher
+from collective.contentalerts.matcher import StopWordsMatcher
+from collective.contentalerts.matcher import tokenize
+
+import unittest
+
+
+class StopWordsMatcherTestCase(unittest.TestCase):
+
+    def _find(self, words, text, **kwargs):
+        """Get where each occurrence starts and the stop word found."""
+        matcher = StopWordsMatcher(words, **kwargs)
+        return sorted(
+            (start, position)
+            for start, end, position in matcher.finditer(text)
+        )
+
+    def test_no_words(self):
+        self.assertEqual(self._find([], u'some text'), [])
+
+    def test_no_match(self):
+        self.assertEqual(self._find([u'one', u'two'], u'some text'), [])
+
+    def test_single_match(self):
+        self.assertEqual(
+            self._find([u'one', u'two'], u'and two more'),
+            [(4, 1)]
+        )
+
+    def test_multiple_occurrences(self):
+        self.assertEqual(
+            self._find([u'one'], u'one and one'),
+            [(0, 0), (8, 0)]
+        )
+
+    def test_overlapping_occurrences(self):
+        self.assertEqual(
+            self._find([u'aa'], u'aaa'),
+            [(0, 0), (1, 0)]
+        )
+
+    def test_word_inside_another_word(self):
+        self.assertEqual(
+            self._find([u'one alert', u'alert'], u'one alert'),
+            [(0, 0), (4, 1)]
+        )
+
+    def test_same_start_different_words(self):
+        self.assertEqual(
+            self._find([u'alert', u'alert me'], u'alert me'),
+            [(0, 0), (0, 1)]
+        )
+
+    def test_empty_word_ignored(self):
+        self.assertEqual(self._find([u'', u'one'], u'one'), [(0, 1)])
+
+    def test_search(self):
+        matcher = StopWordsMatcher([u'one', u'two'])
+        self.assertTrue(matcher.search(u'number two'))
+        self.assertFalse(matcher.search(u'number three'))
+
+    def test_originals_default_to_words(self):
+        matcher = StopWordsMatcher([u'one'])
+        self.assertEqual(matcher.originals, (u'one', ))
+
+    def test_originals(self):
+        matcher = StopWordsMatcher([u'one'], originals=[u'ONE'])
+        self.assertEqual(matcher.originals, (u'ONE', ))
+
+    def test_whole_words(self):
+        self.assertEqual(
+            self._find([u'ass'], u'ass, class assessment', whole_words=True),
+            [(0, 0)]
+        )
+
+    def test_whole_words_edges(self):
+        matcher = StopWordsMatcher([u'ass'], whole_words=True)
+        self.assertTrue(matcher.search(u'ass'))
+        self.assertTrue(matcher.search(u'(ass)'))
+        self.assertFalse(matcher.search(u'ass_'))
+
+    def test_whole_words_non_word_characters(self):
+        """Boundaries are only checked on word characters."""
+        matcher = StopWordsMatcher([u'c++'], whole_words=True)
+        self.assertTrue(matcher.search(u'c++rocks'))
+        self.assertFalse(matcher.search(u'abc++'))
+
+    def test_whole_words_overlapping(self):
+        self.assertEqual(
+            self._find(
+                [u'one alert', u'alert'],
+                u'one alert, alerts',
+                whole_words=True
+            ),
+            [(0, 0), (4, 1)]
+        )
+
+    def test_end(self):
+        matcher = StopWordsMatcher([u'one'])
+        self.assertEqual(list(matcher.finditer(u'a one')), [(2, 5, 0)])
+
+    def test_patterns(self):
+        matcher = StopWordsMatcher(
+            [u'one'],
+            patterns=[
+                (u'mon*y', u'mon\\w{0,30}y'),
+                (u're:fr[e3]+', u'fr[e3]+'),
+            ]
+        )
+        self.assertEqual(len(matcher), 3)
+        self.assertEqual(
+            list(matcher.finditer(u'one money for fr33')),
+            [(0, 3, 0), (5, 8, 0), (4, 9, 1), (14, 18, 2)]
+        )
+
+    def test_patterns_whole_words(self):
+        matcher = StopWordsMatcher(
+            [],
+            patterns=[(u'mon*y', u'mon\\w{0,30}y')],
+            whole_words=True
+        )
+        self.assertTrue(matcher.search(u'monkey'))
+        self.assertFalse(matcher.search(u'monkeys'))
+
+    def test_patterns_many(self):
+        """More patterns than groups a regular expression can have."""
+        patterns = [
+            (u'w{0}x*'.format(index), u'w{0}x\\w{{0,30}}'.format(index))
+            for index in range(250)
+        ]
+        matcher = StopWordsMatcher([], patterns=patterns)
+        self.assertEqual(list(matcher.finditer(u'x w249xy')), [(2, 8, 249)])
+
+    def test_unsafe_patterns_skipped(self):
+        matcher = StopWordsMatcher([], patterns=[(u're:(a+)+', u'(a+)+')])
+        self.assertFalse(matcher.search(u'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaab'))
+
+    def test_quadratic_patterns_skipped(self):
+        matcher = StopWordsMatcher([], patterns=[(u're:\\w*x', u'\\w*x')])
+        self.assertFalse(matcher.search(u'ax'))
+
+    def test_max_length(self):
+        self.assertEqual(StopWordsMatcher([]).max_length, 0)
+        self.assertEqual(
+            StopWordsMatcher([u'one', u'three']).max_length,
+            5
+        )
+
+    def test_max_length_patterns(self):
+        """Patterns occurrences can be of any length."""
+        matcher = StopWordsMatcher(
+            [u'one'],
+            patterns=[(u'mon*y', u'mon\\w{0,30}y')]
+        )
+        self.assertIsNone(matcher.max_length)
+
+    def test_finditer_window(self):
+        matcher = StopWordsMatcher([u'one'])
+        self.assertEqual(
+            list(matcher.finditer(u'one one one', 2, 9)),
+            [(4, 7, 0)]
+        )
+
+    def test_finditer_window_whole_words(self):
+        """Whole words are checked against the text outside the window."""
+        matcher = StopWordsMatcher([u'one'], whole_words=True)
+        self.assertEqual(list(matcher.finditer(u'xone one', 1, 8)), [
+            (5, 8, 0)
+        ])
+
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize(u'one, e-mail über_all'),
+            set([u'one', u'e', u'mail', u'über_all'])
+        )
+
+    def test_tokenized(self):
+        self.assertFalse(StopWordsMatcher([u'one']).tokenized)
+        self.assertTrue(StopWordsMatcher([u'one'], whole_words=True).tokenized)
+
+    def test_tokenized_patterns(self):
+        matcher = StopWordsMatcher(
+            [u'one'],
+            whole_words=True,
+            patterns=[(u'mon*y', u'mon\\w{0,30}y')]
+        )
+        self.assertFalse(matcher.tokenized)
+
+    def test_tokenized_no_word_characters(self):
+        """Stop words without words can only be found by the automaton."""
+        matcher = StopWordsMatcher([u'one', u'$$$'], whole_words=True)
+        self.assertFalse(matcher.tokenized)
+        self.assertTrue(matcher.search(u'costs $$$'))
+
+    def test_check_words_single_word(self):
+        matcher = StopWordsMatcher([u'one', u'two'], whole_words=True)
+        self.assertTrue(matcher.check_words(tokenize(u'this one')))
+        self.assertFalse(matcher.check_words(tokenize(u'someone')))
+
+    def test_check_words_phrases(self):
+        """Phrases are only scanned if all their words are on the text."""
+        matcher = StopWordsMatcher([u'one alert', u'c++'], whole_words=True)
+        self.assertIsNone(matcher.check_words(tokenize(u'alert, one')))
+        self.assertIsNone(matcher.check_words(tokenize(u'a c')))
+        self.assertFalse(matcher.check_words(tokenize(u'one')))
+
+    def test_search_tokenized(self):
+        """The prefilter gives the same answers as the automaton."""
+        words = [u'one', u'one alert', u'e-mail', u'c++', u'über']
+        texts = [
+            u'this one', u'someone', u'one, alert', u'one alert!',
+            u'send e-mail', u'email', u'c++ code', u'c+ code', u'übermut',
+            u'', u'über',
+        ]
+        matcher = StopWordsMatcher(words, whole_words=True)
+        for text in texts:
+            self.assertEqual(
+                matcher.search(text),
+                bool(list(matcher.finditer(text))),
+                text
+            )
+
+
+class ExtendedMatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.base = StopWordsMatcher(
+            [u'one', u'two', u'three four'],
+            originals=[u'One', u'two', u'three four'],
+        )
+
+    def _find(self, matcher, text):
+        return [
+            (start, matcher.words[position])
+            for start, end, position in matcher.finditer(text)
+        ]
+
+    def test_added(self):
+        matcher = ExtendedMatcher(self.base, added=StopWordsMatcher([u'five']))
+        self.assertEqual(
+            self._find(matcher, u'five and one'),
+            [(0, u'five'), (9, u'one')]
+        )
+        self.assertEqual(len(matcher), 4)
+        self.assertEqual(matcher.delta, 1)
+
+    def test_removed(self):
+        matcher = ExtendedMatcher(self.base, removed=[u'One'])
+        self.assertEqual(self._find(matcher, u'one and two'), [(8, u'two')])
+        self.assertEqual(len(matcher), 2)
+        self.assertEqual(
+            matcher.live_originals(),
+            set([u'two', u'three four'])
+        )
+
+    def test_base_shared(self):
+        matcher = ExtendedMatcher(self.base, added=StopWordsMatcher([u'five']))
+        self.assertEqual(self._find(self.base, u'five'), [])
+        self.assertIs(matcher.base, self.base)
+
+    def test_check_words(self):
+        base = StopWordsMatcher(self.base.words, whole_words=True)
+        matcher = ExtendedMatcher(
+            base,
+            added=StopWordsMatcher([u'five'], whole_words=True),
+            removed=[u'one'],
+        )
+        self.assertTrue(matcher.tokenized)
+        self.assertIs(matcher.check_words(set([u'five'])), True)
+        self.assertIs(matcher.check_words(set([u'two'])), True)
+        self.assertIs(matcher.check_words(set([u'one'])), False)
+        self.assertIsNone(matcher.check_words(set([u'three', u'four'])))
+        self.assertFalse(matcher.search(u'one more'))
+        self.assertTrue(matcher.search(u'one five'))
+
+    def test_max_length(self):
+        matcher = ExtendedMatcher(
+            self.base,
+            added=StopWordsMatcher([u'three four five']),
+        )
+        self.assertEqual(matcher.max_length, 15)
+        matcher = ExtendedMatcher(
+            self.base,
+            added=StopWordsMatcher(
+                [],
+                patterns=[(u'f*e', u'f\\w{0,30}e')]
+            ),
+        )
+        self.assertIsNone(matcher.max_length)
+        self.assertEqual(self._find(matcher, u'fire one'), [
+            (0, u'f*e'),
+            (5, u'one'),
+        ])
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.parallel import ScannerPool
+from collective.contentalerts.utilities import Alert
+
+import unittest
+
+
+class ScannerPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        matcher = Alert().compile_stop_words(u'one alert\nanother alert')
+        self.pool = ScannerPool(matcher, workers=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_no_texts(self):
+        self.assertEqual(self.pool.scan([]), {})
+
+    def test_only_matching_keys(self):
+        items = [
+            ('a', u'this gives one alert'),
+            ('b', u'this does not'),
+            ('c', u'and ANOTHER Älert'),
+        ]
+        self.assertEqual(self.pool.scan(items), {
+            'a': (u'one alert', ),
+            'c': (u'another alert', ),
+        })
+
+    def test_many_texts(self):
+        items = [
+            (index, u'one alert' if index % 3 == 0 else u'nothing')
+            for index in range(100)
+        ]
+        self.assertEqual(
+            sorted(self.pool.scan(items)),
+            range(0, 100, 3)
+        )
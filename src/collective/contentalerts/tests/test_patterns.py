@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.interfaces import IStopWords
+from collective.contentalerts.interfaces import ITextAlertCondition
+from collective.contentalerts.patterns import InvalidStopWord
+from collective.contentalerts.patterns import check_pattern
+from collective.contentalerts.patterns import check_stop_words
+from collective.contentalerts.patterns import wildcard_regex
+
+import unittest
+
+
+class CheckStopWordsTestCase(unittest.TestCase):
+
+    def _reason(self, stop_words):
+        with self.assertRaises(InvalidStopWord) as context:
+            check_stop_words(stop_words)
+        return context.exception.reason
+
+    def test_empty(self):
+        self.assertTrue(check_stop_words(None))
+        self.assertTrue(check_stop_words(u''))
+
+    def test_words(self):
+        self.assertTrue(check_stop_words(u'one\ntwo (three)'))
+
+    def test_patterns(self):
+        self.assertTrue(
+            check_stop_words(u'one\nfree mon*y\nre:fr[e3]+ cash\nre:x(ab?)+c')
+        )
+
+    def test_invalid_regex(self):
+        self.assertIn(u'not a valid', self._reason(u're:(one'))
+
+    def test_nested_repetitions(self):
+        self.assertIn(u'nested', self._reason(u're:(a+)+b'))
+
+    def test_alternatives_within_repetitions(self):
+        self.assertIn(u'alternatives', self._reason(u're:(a|ab)*c'))
+
+    def test_back_references(self):
+        self.assertIn(u'back references', self._reason(u're:(a)\\1'))
+
+    def test_leading_unbounded_repetition(self):
+        self.assertIn(u'unbounded', self._reason(u're:\\w*x'))
+        self.assertIn(u'unbounded', self._reason(u're:\\d+ euros'))
+        self.assertIn(u'unbounded', self._reason(u're:(?:x|y)+z'))
+
+    def test_unbounded_repetition_over_start(self):
+        """The pattern can start again within what the repetition matches."""
+        self.assertIn(u'unbounded', self._reason(u're:a\\w*x'))
+        self.assertIn(u'unbounded', self._reason(u're:free.*money'))
+
+    def test_bounded_repetitions(self):
+        self.assertTrue(check_stop_words(
+            u're:\\d{1,20} euros\nre:free\\s+money\nre:a\\w{0,30}x\n*a'
+        ))
+
+    def test_adjacent_repetitions(self):
+        """Repetitions that can split the same text between them."""
+        for stop_word in (u're:x[^x]*[^x]*[^x]*y',
+                          u're:x[a-w]*[a-w]*[a-w]*y',
+                          u're:x[^x]*y[^x]*z',
+                          u're:x(?:[^x]*)([^x]{0,5})y',
+                          u'a*a*z',
+                          u'*a*'):
+            self.assertIn(u'next to each other', self._reason(stop_word))
+
+    def test_adjacent_repetitions_disjoint(self):
+        self.assertTrue(check_stop_words(
+            u're:colou?r\nre:x[a-c]*[d-f]*y\nbuy * cheap * now'
+        ))
+
+    def test_too_many_wildcards(self):
+        self.assertIn(u'wildcards', self._reason(u'a*a*a*a*a*z'))
+        self.assertIn(u'wildcards', self._reason(u'a * b * c * d * e * f'))
+
+    def test_adjacent_wildcards_source(self):
+        """Also checked on wildcards compiled without being validated."""
+        with self.assertRaises(InvalidStopWord):
+            check_pattern(u'a*a*a*a*a*z', wildcard_regex(u'aaaaaz'))
+
+    def test_empty_match(self):
+        self.assertIn(u'empty', self._reason(u're:a*'))
+        self.assertIn(u'empty', self._reason(u'*'))
+
+    def test_too_long(self):
+        self.assertIn(u'too long', self._reason(u're:' + u'a' * 300))
+
+    def test_message(self):
+        try:
+            check_stop_words(u'one\nre:(a+)+')
+        except InvalidStopWord as error:
+            self.assertEqual(error.doc().mapping['line'], u're:(a+)+')
+
+    def test_schema_fields(self):
+        for field in (IStopWords['stop_words'],
+                      ITextAlertCondition['stop_words']):
+            with self.assertRaises(InvalidStopWord):
+                field.validate(u're:(a+)+')
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.contentrules import TextAlertCondition
+from collective.contentalerts.contentrules import process_queue
+from collective.contentalerts.interfaces import IHasStopWords
+from collective.contentalerts.queue import ScanQueue
+from collective.contentalerts.queue import get_queue
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from plone import api
+from plone.app.contentrules.conditions.portaltype import PortalTypeCondition
+from plone.app.contentrules.rule import Rule
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from plone.contentrules.engine.assignments import RuleAssignment
+from plone.contentrules.engine.interfaces import IRuleAssignmentManager
+from plone.contentrules.engine.interfaces import IRuleStorage
+from plone.contentrules.rule.interfaces import IExecutable
+from zExceptions import Forbidden
+from zope.component import adapter
+from zope.component import getGlobalSiteManager
+from zope.component import getMultiAdapter
+from zope.component import getUtility
+from zope.component.interfaces import IObjectEvent
+from zope.interface import Interface
+from zope.interface import implementer
+
+import unittest
+
+
+@implementer(IObjectEvent)
+class DummyEvent(object):
+
+    def __init__(self, obj):
+        self.object = obj
+
+
+# (action name, object id) of each action run, and the names of the actions
+# that fail: rolling back a savepoint loads the rule actions again, so they
+# can not keep any state themselves
+EXECUTED = []
+FAILING = set()
+
+
+class IDummyAction(Interface):
+    pass
+
+
+@implementer(IDummyAction)
+class DummyAction(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+@implementer(IExecutable)
+@adapter(Interface, IDummyAction, Interface)
+class DummyActionExecutor(object):
+
+    def __init__(self, context, element, event):
+        self.element = element
+        self.event = event
+
+    def __call__(self):
+        if self.element.name in FAILING:
+            raise ValueError('the action failed')
+        EXECUTED.append((self.element.name, self.event.object.getId()))
+        return True
+
+
+class ScanQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = ScanQueue()
+
+    def test_empty(self):
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.queue.take(), [])
+        self.assertEqual(self.queue.lag(), 0.0)
+
+    def test_put(self):
+        self.assertTrue(self.queue.put('uid', 'rule'))
+        self.assertEqual(len(self.queue), 1)
+
+    def test_put_twice(self):
+        self.queue.put('uid', 'rule')
+        self.assertFalse(self.queue.put('uid', 'rule'))
+        self.assertEqual(len(self.queue), 1)
+
+    def test_put_on_another_rule(self):
+        self.queue.put('uid', 'rule')
+        self.assertTrue(self.queue.put('uid', 'another-rule'))
+        self.assertEqual(len(self.queue), 2)
+
+    def test_take_oldest_first(self):
+        self.queue.put('new', 'rule', queued=20)
+        self.queue.put('old', 'rule', queued=10)
+        self.assertEqual(
+            self.queue.take(),
+            [('old', 'rule', 10), ('new', 'rule', 20)]
+        )
+        self.assertEqual(len(self.queue), 0)
+
+    def test_take_limit(self):
+        self.queue.put('new', 'rule', queued=20)
+        self.queue.put('old', 'rule', queued=10)
+        self.assertEqual(self.queue.take(1), [('old', 'rule', 10)])
+        self.assertEqual(len(self.queue), 1)
+
+    def test_put_again_once_taken(self):
+        self.queue.put('uid', 'rule')
+        self.queue.take()
+        self.assertTrue(self.queue.put('uid', 'rule'))
+
+    def test_lag(self):
+        self.queue.put('new', 'rule', queued=20)
+        self.queue.put('old', 'rule', queued=10)
+        self.assertEqual(self.queue.lag(now=25), 15)
+
+
+class DeferredScanTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+
+        self.condition = TextAlertCondition()
+        self.condition.stop_words = u'one alert'
+        self.condition.asynchronous = True
+        self.rule = Rule()
+        self.rule.conditions.append(self.condition)
+        self.rule.actions.append(DummyAction('notify'))
+        getUtility(IRuleStorage)[u'alerts'] = self.rule
+        self.assignment = RuleAssignment(u'alerts')
+        IRuleAssignmentManager(self.portal)[u'alerts'] = self.assignment
+        getGlobalSiteManager().registerAdapter(DummyActionExecutor)
+        del EXECUTED[:]
+        FAILING.clear()
+
+        self.document = api.content.create(
+            container=self.portal,
+            id='doc',
+            title='doc',
+            type='Document'
+        )
+        self.document.setText('this gives one alert')
+
+    def tearDown(self):
+        getGlobalSiteManager().unregisterAdapter(DummyActionExecutor)
+
+    def _execute(self):
+        executable = getMultiAdapter(
+            (self.portal, self.condition, DummyEvent(self.document)),
+            IExecutable
+        )
+        return executable()
+
+    def test_deferred_condition_is_false(self):
+        self.assertFalse(self._execute())
+        self.assertFalse(IHasStopWords.providedBy(self.document))
+
+    def test_deferred_condition_queues_object(self):
+        self._execute()
+        self._execute()
+        self.assertEqual(
+            [entry[:2] for entry in get_queue(self.portal).take()],
+            [(api.content.get_uuid(self.document), u'alerts')]
+        )
+
+    def test_not_deferred_without_rule(self):
+        del getUtility(IRuleStorage)[u'alerts']
+        self.assertTrue(self._execute())
+        self.assertEqual(len(get_queue(self.portal)), 0)
+
+    def test_process_queue(self):
+        self._execute()
+        self.assertEqual(process_queue(self.portal), 1)
+        self.assertTrue(IHasStopWords.providedBy(self.document))
+        self.assertEqual(len(get_queue(self.portal)), 0)
+
+    def test_process_queue_limit(self):
+        self._execute()
+        self.assertEqual(process_queue(self.portal, limit=0), 0)
+        self.assertEqual(len(get_queue(self.portal)), 1)
+
+    def test_process_queue_removed_rule(self):
+        self._execute()
+        del getUtility(IRuleStorage)[u'alerts']
+        self.assertEqual(process_queue(self.portal), 1)
+        self.assertFalse(IHasStopWords.providedBy(self.document))
+
+    def test_process_queue_runs_actions(self):
+        self._execute()
+        process_queue(self.portal)
+        self.assertEqual(EXECUTED, [('notify', 'doc')])
+
+    def test_process_queue_no_stop_words(self):
+        self.document.setText('nothing to see')
+        self._execute()
+        process_queue(self.portal)
+        self.assertEqual(EXECUTED, [])
+
+    def test_process_queue_other_conditions(self):
+        """All the rule conditions are checked, not only the text alert."""
+        condition = PortalTypeCondition()
+        condition.check_types = ['News Item']
+        self.rule.conditions.append(condition)
+        self._execute()
+        process_queue(self.portal)
+        self.assertEqual(EXECUTED, [])
+
+    def test_process_queue_disabled_rule(self):
+        self._execute()
+        self.rule.enabled = False
+        process_queue(self.portal)
+        self.assertEqual(EXECUTED, [])
+
+    def test_process_queue_unassigned_rule(self):
+        self._execute()
+        del IRuleAssignmentManager(self.portal)[u'alerts']
+        process_queue(self.portal)
+        self.assertEqual(EXECUTED, [])
+
+    def test_process_queue_disabled_assignment(self):
+        self._execute()
+        self.assignment.enabled = False
+        process_queue(self.portal)
+        self.assertEqual(EXECUTED, [])
+
+    def test_process_queue_stop(self):
+        """Rules after one that stops are not run on the same object."""
+        rule = Rule()
+        rule.conditions.append(self.condition)
+        rule.actions.append(DummyAction('notify-again'))
+        getUtility(IRuleStorage)[u'more-alerts'] = rule
+        IRuleAssignmentManager(self.portal)[u'more-alerts'] = \
+            RuleAssignment(u'more-alerts')
+        self.rule.stop = True
+        queue = get_queue(self.portal)
+        uid = api.content.get_uuid(self.document)
+        queue.put(uid, u'alerts', queued=10)
+        queue.put(uid, u'more-alerts', queued=20)
+
+        self.assertEqual(process_queue(self.portal), 2)
+        self.assertEqual(EXECUTED, [('notify', 'doc')])
+
+    def test_process_queue_failing_action(self):
+        """A failing object is dropped, the ones after it are processed."""
+        other = api.content.create(
+            container=self.portal,
+            id='other',
+            title='other',
+            type='Document'
+        )
+        other.setText('one alert as well')
+        FAILING.add('notify')
+        queue = get_queue(self.portal)
+        queue.put(api.content.get_uuid(self.document), u'alerts', queued=10)
+        queue.put(api.content.get_uuid(other), u'alerts', queued=20)
+        process_queue(self.portal, limit=1)
+        self.assertEqual(len(queue), 1)
+
+        FAILING.clear()
+        self.assertEqual(process_queue(self.portal), 1)
+        self.assertEqual(EXECUTED, [('notify', 'other')])
+        self.assertEqual(len(queue), 0)
+
+    def test_queue_view(self):
+        self._execute()
+        view = self.portal.restrictedTraverse('@@contentalerts-queue')
+        self.assertIn(u'depth: 1', view())
+
+    def test_process_queue_view(self):
+        self._execute()
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form['_authenticator'] = api.content.get_view(
+            name='authenticator',
+            context=self.portal,
+            request=self.request
+        ).token()
+        view = self.portal.restrictedTraverse('@@contentalerts-process-queue')
+        self.assertIn(u'processed: 1', view())
+        self.assertTrue(IHasStopWords.providedBy(self.document))
+
+    def test_process_queue_view_get_forbidden(self):
+        self._execute()
+        view = self.portal.restrictedTraverse('@@contentalerts-process-queue')
+        self.assertRaises(Forbidden, view)
+        self.assertEqual(len(get_queue(self.portal)), 1)
+
+    def test_process_queue_view_invalid_limit(self):
+        self.request.form['limit'] = '-1'
+        view = self.portal.restrictedTraverse('@@contentalerts-process-queue')
+        self.assertIn(u'positive integer', view())
+        self.assertEqual(self.request.response.getStatus(), 400)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.contentrules import TextAlertConditionExecutor
+from collective.contentalerts.contentrules import get_found_stop_words
+from collective.contentalerts.contentrules import process_queue
+from collective.contentalerts.interfaces import IHasStopWords
+from collective.contentalerts.interfaces import IStopWords
+from collective.contentalerts.queue import get_queue
+from collective.contentalerts.rescan import get_changes
+from collective.contentalerts.rescan import searchable_text_query
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from plone import api
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from plone.registry.interfaces import IRegistry
+from zope.component import getUtility
+
+import unittest
+
+
+class ChangesTestCase(unittest.TestCase):
+
+    def test_get_changes(self):
+        self.assertEqual(
+            get_changes(u'one\ntwo\n', u'two\nthree'),
+            (set([u'three']), set([u'one']))
+        )
+
+    def test_get_changes_empty(self):
+        self.assertEqual(get_changes(None, u'one'), (set([u'one']), set()))
+        self.assertEqual(get_changes(u'\n \n', None), (set(), set()))
+
+    def test_query_whole_words(self):
+        self.assertEqual(
+            searchable_text_query(u'one alert', whole_words=True),
+            u'"one" AND "alert"'
+        )
+
+    def test_query_prefixes(self):
+        """Without whole words, stop words can be the start of a word."""
+        self.assertEqual(
+            searchable_text_query(u'one alert'),
+            u'one* AND alert*'
+        )
+
+    def test_query_wildcard(self):
+        self.assertEqual(
+            searchable_text_query(u'free mon*y', whole_words=True),
+            u'"free" AND mon*'
+        )
+
+    def test_query_operators(self):
+        self.assertEqual(
+            searchable_text_query(u'this and that'),
+            u'this* AND "and" AND that*'
+        )
+
+    def test_query_not_searchable(self):
+        self.assertIsNone(searchable_text_query(u're:fr[e3]+'))
+        self.assertIsNone(searchable_text_query(u'*ing'))
+
+
+class RescanTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.records = getUtility(IRegistry).forInterface(IStopWords)
+
+        self.alert = self._create('alert', 'this gives one alert')
+        self.no_alert = self._create('no-alert', 'this does not')
+        get_queue(self.portal).take()
+
+    def _create(self, id_, text):
+        document = api.content.create(
+            container=self.portal,
+            id=id_,
+            title=id_,
+            type='Document'
+        )
+        document.setText(text)
+        document.reindexObject()
+        return document
+
+    def _post(self, **form):
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form['_authenticator'] = api.content.get_view(
+            name='authenticator',
+            context=self.portal,
+            request=self.request
+        ).token()
+        self.request.form.update(form)
+
+    def _queued(self):
+        return sorted(
+            (uid, rule_id)
+            for uid, rule_id, queued in get_queue(self.portal).take()
+        )
+
+    def test_added_stop_word(self):
+        self.records.stop_words = u'one alert'
+        self.assertEqual(
+            self._queued(),
+            [(api.content.get_uuid(self.alert), None)]
+        )
+
+    def test_added_stop_word_flags(self):
+        self.records.stop_words = u'one alert'
+        process_queue(self.portal)
+        self.assertTrue(IHasStopWords.providedBy(self.alert))
+        self.assertFalse(IHasStopWords.providedBy(self.no_alert))
+        brains = api.content.find(has_stop_words=True)
+        self.assertEqual([brain.getId for brain in brains], ['alert'])
+
+    def test_removed_stop_word(self):
+        """Only flagged objects are scanned again."""
+        self.records.stop_words = u'one alert\nanother alert'
+        process_queue(self.portal)
+
+        self.records.stop_words = u'another alert'
+        self.assertEqual(
+            self._queued(),
+            [(api.content.get_uuid(self.alert), None)]
+        )
+
+    def test_removed_stop_word_unflags(self):
+        self.records.stop_words = u'one alert\nanother alert'
+        process_queue(self.portal)
+        self.assertTrue(IHasStopWords.providedBy(self.alert))
+
+        self.records.stop_words = u'another alert'
+        process_queue(self.portal)
+        self.assertFalse(IHasStopWords.providedBy(self.alert))
+        self.assertFalse(api.content.find(has_stop_words=True))
+
+    def test_removed_stop_word_rule_flagged(self):
+        """Objects flagged by a rule's own stop words are left alone."""
+        flagged = self._create('rule-alert', 'this has a rule word')
+        TextAlertConditionExecutor._apply_marker_interface(
+            flagged,
+            True,
+            (u'rule word', )
+        )
+        self.records.stop_words = u'one alert\nanother alert'
+        process_queue(self.portal)
+
+        self.records.stop_words = u'another alert'
+        self.assertEqual(
+            self._queued(),
+            [(api.content.get_uuid(self.alert), None)]
+        )
+        process_queue(self.portal)
+        self.assertTrue(IHasStopWords.providedBy(flagged))
+        self.assertEqual(get_found_stop_words(flagged), (u'rule word', ))
+
+    def test_removed_all_stop_words_keeps_flags(self):
+        """Without default stop words, nothing is unflagged."""
+        self.records.stop_words = u'one alert'
+        process_queue(self.portal)
+
+        self.records.stop_words = u''
+        process_queue(self.portal)
+        self.assertTrue(IHasStopWords.providedBy(self.alert))
+        self.assertEqual(get_found_stop_words(self.alert), (u'one alert', ))
+
+    def test_unchanged_stop_words(self):
+        self.records.stop_words = u'one alert'
+        get_queue(self.portal).take()
+        self.records.stop_words = u'one alert\n'
+        self.assertEqual(self._queued(), [])
+
+    def test_regular_expression_not_searched(self):
+        self.records.stop_words = u're:one al[e3]rt'
+        self.assertEqual(self._queued(), [])
+
+    def test_word_list(self):
+        self._post(**{
+            'form.buttons.import': '1',
+            'words': u'one alert',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(
+            self._queued(),
+            [(api.content.get_uuid(self.alert), None)]
+        )
+
+    def test_named_word_list_not_rescanned(self):
+        self._post(**{
+            'form.buttons.add_list': '1',
+            'name': 'spam',
+        })
+        api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )()
+        self.request.form.clear()
+        self._post(**{
+            'list': 'spam',
+            'form.buttons.import': '1',
+            'words': u'one alert',
+        })
+        api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )()
+        self.assertEqual(self._queued(), [])
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts import stats
+from collective.contentalerts.contentrules import TextAlertCondition
+from collective.contentalerts.contentrules import TextAlertConditionExecutor
+from collective.contentalerts.interfaces import IStopWords
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.utilities import Alert
+from plone import api
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from plone.contentrules.rule.interfaces import IExecutable
+from plone.registry.interfaces import IRegistry
+from zope.component import getMultiAdapter
+from zope.component import getUtility
+from zope.component.interfaces import IObjectEvent
+from zope.interface import implementer
+
+import logging
+import threading
+import unittest
+
+
+@implementer(IObjectEvent)
+class ContentTypeDummyEvent(object):
+
+    def __init__(self, obj):
+        self.object = obj
+
+
+class LogHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+
+    def tearDown(self):
+        stats.reset()
+
+    def test_counter(self):
+        counter = stats.Counter('test_total', 'Test.')
+        counter.increment()
+        counter.increment(4)
+        self.assertEqual(list(counter.samples()), [('test_total', 5)])
+
+    def test_counter_threads(self):
+        counter = stats.Counter('test_total', 'Test.')
+
+        def increment():
+            for _ in range(1000):
+                counter.increment()
+
+        threads = [threading.Thread(target=increment) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value, 8000)
+
+    def test_histogram(self):
+        histogram = stats.Histogram('test_seconds', 'Test.', (0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(3.0)
+        samples = list(histogram.samples())
+        self.assertEqual(samples[:3], [
+            ('test_seconds_bucket{le="0.1"}', 2),
+            ('test_seconds_bucket{le="1.0"}', 3),
+            ('test_seconds_bucket{le="+Inf"}', 4),
+        ])
+        self.assertEqual(samples[3][0], 'test_seconds_sum')
+        self.assertAlmostEqual(samples[3][1], 3.65)
+        self.assertEqual(samples[4], ('test_seconds_count', 4))
+
+    def test_timer(self):
+        histogram = stats.Histogram('test_seconds', 'Test.')
+        with stats.timer(histogram) as timer:
+            pass
+        self.assertEqual(histogram.count, 1)
+        self.assertEqual(histogram.sum, timer.elapsed)
+
+    def test_render(self):
+        stats.EXECUTOR_CALLS.increment(3)
+        text = stats.render()
+        self.assertIn(
+            '# TYPE contentalerts_executor_calls_total counter\n'
+            'contentalerts_executor_calls_total 3\n',
+            text
+        )
+        self.assertIn(
+            'contentalerts_match_seconds_bucket{le="+Inf"} 0\n',
+            text
+        )
+        self.assertTrue(text.endswith('\n'))
+
+    def test_scan(self):
+        matcher = Alert().compile_stop_words(u'alert')
+        stats.reset()
+        Alert().scan(u'one alert', stop_words=matcher)
+        self.assertEqual(stats.NORMALIZE_SECONDS.count, 1)
+        self.assertEqual(stats.NORMALIZED_CHARACTERS.value, 9)
+        self.assertEqual(stats.MATCH_SECONDS.count, 1)
+
+
+class StatsTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.records = getUtility(IRegistry).forInterface(IStopWords)
+        self.document = api.content.create(
+            container=self.portal,
+            id='doc1',
+            title='Document 1',
+            type='Document'
+        )
+        self.document.setText('this gives one alert')
+        stats.reset()
+
+        self.handler = LogHandler()
+        logging.getLogger('collective.contentalerts').addHandler(
+            self.handler
+        )
+
+    def tearDown(self):
+        logging.getLogger('collective.contentalerts').removeHandler(
+            self.handler
+        )
+        stats.reset()
+
+    def _execute(self, stop_words=u'alert'):
+        condition = TextAlertCondition()
+        condition.stop_words = stop_words
+        executable = getMultiAdapter(
+            (self.portal, condition, ContentTypeDummyEvent(self.document)),
+            IExecutable
+        )
+        return executable()
+
+    def test_executor(self):
+        self.assertTrue(self._execute())
+        self.assertFalse(self._execute(u'nothing'))
+        self.assertEqual(stats.EXECUTOR_CALLS.value, 2)
+        self.assertEqual(stats.EXECUTOR_HITS.value, 1)
+        self.assertEqual(stats.EXECUTOR_SECONDS.count, 2)
+        self.assertEqual(stats.MARKER_SECONDS.count, 2)
+        self.assertEqual(stats.REINDEXED.value, 2)
+        self.assertTrue(stats.SCANNED_CHARACTERS.value > 0)
+
+    def test_executor_cached(self):
+        self._execute()
+        self._execute()
+        self.assertEqual(stats.EXECUTOR_CACHED.value, 1)
+
+    def test_slow_scan_not_logged(self):
+        self._execute()
+        self.assertEqual(stats.SLOW_SCANS.value, 0)
+        self.assertEqual(self.handler.messages, [])
+
+    def test_slow_scan_logged(self):
+        self.records.slow_scan_threshold = 500
+        TextAlertConditionExecutor._log_slow_scan(
+            self.document,
+            u'this gives one alert',
+            Alert().compile_stop_words(u'one\nalert'),
+            0.75
+        )
+        self.assertEqual(stats.SLOW_SCANS.value, 1)
+        self.assertEqual(
+            self.handler.messages,
+            [u'Slow scan of /plone/doc1: 750 ms, 20 characters, '
+             u'2 stop words']
+        )
+
+    def test_slow_scan_below_threshold(self):
+        self.records.slow_scan_threshold = 500
+        TextAlertConditionExecutor._log_slow_scan(
+            self.document,
+            u'this gives one alert',
+            None,
+            0.25
+        )
+        self.assertEqual(stats.SLOW_SCANS.value, 0)
+        self.assertEqual(self.handler.messages, [])
+
+    def test_stats_view(self):
+        self._execute()
+        view = api.content.get_view(
+            name='contentalerts-stats',
+            context=self.portal,
+            request=self.request
+        )
+        text = view()
+        self.assertIn('contentalerts_executor_calls_total 1\n', text)
+        self.assertIn(
+            'text/plain',
+            self.request.response.getHeader('Content-Type')
+        )
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.interfaces import IHasStopWords
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.upgrades import add_catalog_indexes
+from plone import api
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from zope.interface import alsoProvides
+
+import unittest
+
+
+class UpgradesTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.catalog = api.portal.get_tool('portal_catalog')
+        self.setup = api.portal.get_tool('portal_setup')
+
+    def test_add_catalog_indexes(self):
+        api.portal.set_registry_record(
+            'collective.contentalerts.interfaces.IStopWords.stop_words',
+            u'one alert'
+        )
+        document = api.content.create(
+            container=self.portal,
+            id='doc',
+            title='doc',
+            type='Document'
+        )
+        document.setText('this gives one alert')
+        # flagged the way it was done before the index existed
+        alsoProvides(document, IHasStopWords)
+        for name in ('has_stop_words', 'stop_words', 'stop_words_flagged'):
+            self.catalog.delIndex(name)
+        self.catalog.delColumn('stop_words')
+        self.catalog.delColumn('stop_words_flagged')
+
+        add_catalog_indexes(self.setup)
+
+        brains = api.content.find(has_stop_words=True)
+        self.assertEqual(len(brains), 1)
+        self.assertEqual(brains[0].stop_words, (u'one alert', ))
+        self.assertEqual(brains[0].stop_words_flagged, document.modified())
+        self.assertTrue(api.content.find(has_stop_words=False))
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 from Products.statusmessages.interfaces import IStatusMessage
+from collective.contentalerts.contentrules import TextAlertConditionExecutor
 from collective.contentalerts.interfaces import IHasStopWords
 from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
 from plone import api
 from plone.app.discussion.interfaces import IConversation
 from plone.app.testing import TEST_USER_ID
 from plone.app.testing import setRoles
+from zExceptions import Forbidden
 from zope.component import createObject
 from zope.interface import alsoProvides
 
@@ -55,6 +57,21 @@ class DiscardAlertsViewTestCase(unittest.TestCase):
 
         self.assertFalse(IHasStopWords.providedBy(self.document))
 
+    def test_remove_interface_on_catalog(self):
+        """Calling @@discard-alert updates the has_stop_words index."""
+        alsoProvides(self.document, IHasStopWords)
+        self.document.reindexObject(idxs=('has_stop_words', ))
+        self.assertEqual(len(api.content.find(has_stop_words=True)), 1)
+
+        discard_view = api.content.get_view(
+            name='discard-alert',
+            context=self.document,
+            request=self.request
+        )
+        discard_view()
+
+        self.assertEqual(len(api.content.find(has_stop_words=True)), 0)
+
     def test_remove_interface_on_a_comment(self):
         """Calling @@discard-alert on a comment has the IHasStopWords removes
         it."""
@@ -116,3 +133,188 @@ class DiscardAlertsViewTestCase(unittest.TestCase):
         messages = IStatusMessage(self.request)
         show = messages.show()
         self.assertEqual(len(show), 0)
+
+
+class ContentAlertsViewTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+
+        self._create('first', 'A', (u'one', ))
+        self._create('second', 'B', (u'one', u'two', ))
+        self._create('not-flagged', 'C', None)
+
+    def _create(self, id_, title, words):
+        document = api.content.create(
+            container=self.portal,
+            id=id_,
+            title=title,
+            type='Document'
+        )
+        if words:
+            TextAlertConditionExecutor._apply_marker_interface(
+                document,
+                True,
+                words
+            )
+        return document
+
+    def _view(self, **form):
+        self.request.form.update(form)
+        view = api.content.get_view(
+            name='content-alerts',
+            context=self.portal,
+            request=self.request
+        )
+        view.update()
+        return view
+
+    def _titles(self, view):
+        return [item['title'] for item in view.items()]
+
+    def test_only_flagged(self):
+        self.assertEqual(
+            sorted(self._titles(self._view())),
+            ['A', 'B']
+        )
+
+    def test_metadata(self):
+        view = self._view(word=u'two')
+        item = list(view.items())[0]
+        self.assertEqual(item['stop_words'], u'one, two')
+        self.assertEqual(item['path'], '/plone/second')
+        self.assertIsNotNone(item['flagged'])
+
+    def test_filter_by_word(self):
+        self.assertEqual(self._titles(self._view(word=u'TWO')), ['B'])
+
+    def test_filter_by_type(self):
+        self.assertEqual(self._titles(self._view(portal_type='News Item')), [])
+
+    def test_sort_by_title(self):
+        view = self._view(sort_on='title', sort_order='ascending')
+        self.assertEqual(self._titles(view), ['A', 'B'])
+        view = self._view(sort_on='title', sort_order='descending')
+        self.assertEqual(self._titles(view), ['B', 'A'])
+
+    def test_unknown_sort(self):
+        self.assertEqual(self._view(sort_on='foo').sort_on, 'flagged')
+
+    def test_batch(self):
+        view = self._view(b_size=1)
+        self.assertEqual(len(list(view.items())), 1)
+        self.assertEqual(view.batch.sequence_length, 2)
+
+    def test_render(self):
+        view = self._view()
+        self.assertIn('/plone/second', view())
+
+
+class BulkDiscardAlertsViewTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+
+        self.folder = api.content.create(
+            container=self.portal,
+            id='folder',
+            title='Folder',
+            type='Folder'
+        )
+        self.first = self._create(self.folder, 'first', (u'one', ))
+        self.second = self._create(self.folder, 'second', (u'one', u'two'))
+        self.outside = self._create(self.portal, 'outside', (u'two', ))
+
+    def _create(self, container, id_, words):
+        document = api.content.create(
+            container=container,
+            id=id_,
+            title=id_,
+            type='Document'
+        )
+        TextAlertConditionExecutor._apply_marker_interface(
+            document,
+            True,
+            words
+        )
+        return document
+
+    def _discard(self, context=None, **form):
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form['_authenticator'] = api.content.get_view(
+            name='authenticator',
+            context=self.portal,
+            request=self.request
+        ).token()
+        self.request.form.update(form)
+        view = api.content.get_view(
+            name='discard-alerts',
+            context=context or self.portal,
+            request=self.request
+        )
+        view()
+
+    def _flagged(self):
+        return sorted(
+            brain.getId for brain in api.content.find(has_stop_words=True)
+        )
+
+    def test_uids(self):
+        self._discard(uids=[api.content.get_uuid(self.first)])
+        self.assertFalse(IHasStopWords.providedBy(self.first))
+        self.assertEqual(self._flagged(), ['outside', 'second'])
+
+    def test_paths(self):
+        self._discard(
+            context=self.folder,
+            paths=['/plone/folder/first', '/plone/folder/second']
+        )
+        self.assertEqual(self._flagged(), ['outside'])
+
+    def test_word(self):
+        self._discard(word=u'TWO')
+        self.assertEqual(self._flagged(), ['first'])
+
+    def test_all(self):
+        self._discard(all='1')
+        self.assertEqual(self._flagged(), [])
+
+    def test_only_below_context(self):
+        self._discard(context=self.folder, all='1')
+        self.assertEqual(self._flagged(), ['outside'])
+
+    def _view(self):
+        return api.content.get_view(
+            name='discard-alerts',
+            context=self.portal,
+            request=self.request
+        )
+
+    def test_get_forbidden(self):
+        self.request.form['all'] = '1'
+        self.assertRaises(Forbidden, self._view())
+        self.assertEqual(len(self._flagged()), 3)
+
+    def test_no_authenticator_forbidden(self):
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form['all'] = '1'
+        self.assertRaises(Forbidden, self._view())
+        self.assertEqual(len(self._flagged()), 3)
+
+    def test_nothing_selected(self):
+        self._discard()
+        self.assertEqual(self._flagged(), ['first', 'outside', 'second'])
+        show = IStatusMessage(self.request).show()
+        self.assertEqual(show[0].type, 'error')
+
+    def test_message(self):
+        self._discard(word=u'one')
+        show = IStatusMessage(self.request).show()
+        self.assertEqual(len(show), 1)
+        self.assertIn(u'2', show[0].message)
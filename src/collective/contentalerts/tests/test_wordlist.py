@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.interfaces import IAlert
+from collective.contentalerts.patterns import InvalidStopWord
+from collective.contentalerts.testing import COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING  # noqa
+from collective.contentalerts.wordlist import WordList
+from collective.contentalerts.wordlist import add_word_list
+from collective.contentalerts.wordlist import get_word_list
+from collective.contentalerts.wordlist import get_word_lists
+from collective.contentalerts.wordlist import remove_word_list
+from plone import api
+from plone.app.testing import TEST_USER_ID
+from plone.app.testing import setRoles
+from zExceptions import Forbidden
+from zope.component import getUtility
+from zope.schema.interfaces import IVocabularyFactory
+
+import unittest
+
+
+class WordListTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.word_list = WordList()
+
+    def test_empty(self):
+        self.assertEqual(len(self.word_list), 0)
+        self.assertEqual(list(self.word_list), [])
+        self.assertEqual(self.word_list.version, 0)
+
+    def test_add(self):
+        self.assertTrue(self.word_list.add(u'alert'))
+        self.assertIn(u'alert', self.word_list)
+        self.assertEqual(len(self.word_list), 1)
+        self.assertEqual(self.word_list.version, 1)
+
+    def test_add_twice(self):
+        self.word_list.add(u'alert')
+        self.assertFalse(self.word_list.add(u' alert '))
+        self.assertEqual(len(self.word_list), 1)
+        self.assertEqual(self.word_list.version, 1)
+
+    def test_add_str(self):
+        self.word_list.add('älert')
+        self.assertIn(u'älert', self.word_list)
+
+    def test_title(self):
+        self.assertIsNone(self.word_list.title)
+        self.assertEqual(WordList(title=u'Spam').title, u'Spam')
+
+    def test_add_invalid_pattern(self):
+        with self.assertRaises(InvalidStopWord):
+            self.word_list.add(u're:(a+)+')
+        self.assertEqual(len(self.word_list), 0)
+
+    def test_remove(self):
+        self.word_list.add(u'alert')
+        self.assertTrue(self.word_list.remove(u'alert'))
+        self.assertNotIn(u'alert', self.word_list)
+        self.assertEqual(len(self.word_list), 0)
+        self.assertEqual(self.word_list.version, 2)
+
+    def test_remove_missing(self):
+        self.assertFalse(self.word_list.remove(u'alert'))
+        self.assertEqual(self.word_list.version, 0)
+
+    def test_bulk_import(self):
+        added = self.word_list.bulk_import(
+            [u'one', u'', u'two', u'one', u'three']
+        )
+        self.assertEqual(added, 3)
+        self.assertEqual(list(self.word_list), [u'one', u'three', u'two'])
+        self.assertEqual(self.word_list.version, 1)
+
+    def test_bulk_import_all_or_nothing(self):
+        with self.assertRaises(InvalidStopWord):
+            self.word_list.bulk_import([u'one', u're:(a|b)*'])
+        self.assertEqual(len(self.word_list), 0)
+        self.assertEqual(self.word_list.version, 0)
+
+    def test_bulk_remove(self):
+        self.word_list.bulk_import([u'one', u'two', u'three'])
+        self.assertEqual(self.word_list.bulk_remove([u'one', u'four']), 1)
+        self.assertEqual(list(self.word_list), [u'three', u'two'])
+
+    def test_search(self):
+        self.word_list.bulk_import([u'free', u'freedom', u'money', u'fre'])
+        self.assertEqual(list(self.word_list.search()), sorted(
+            [u'free', u'freedom', u'money', u'fre']
+        ))
+        self.assertEqual(
+            list(self.word_list.search(u'free')),
+            [u'free', u'freedom']
+        )
+        self.assertEqual(list(self.word_list.search(u'x')), [])
+
+    def test_search_sliced(self):
+        self.word_list.bulk_import([u'w{0:03d}'.format(i) for i in range(300)])
+        words = self.word_list.search(u'w1')
+        self.assertEqual(len(words), 100)
+        self.assertEqual(list(words[10:12]), [u'w110', u'w111'])
+
+
+class SiteWordListTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.utility = getUtility(IAlert)
+
+    def _post(self, **form):
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form['_authenticator'] = api.content.get_view(
+            name='authenticator',
+            context=self.portal,
+            request=self.request
+        ).token()
+        self.request.form.update(form)
+
+    def test_get_word_list(self):
+        self.assertIsNone(get_word_list(self.portal, create=False))
+        word_list = get_word_list(self.portal)
+        self.assertIs(get_word_list(), word_list)
+
+    def test_default_stop_words(self):
+        """Check that the word list is used together with the registry."""
+        api.portal.set_registry_record(
+            'collective.contentalerts.interfaces.IStopWords.stop_words',
+            u'random'
+        )
+        get_word_list().add(u'specific')
+
+        self.assertTrue(self.utility.has_stop_words(u'some random text'))
+        self.assertTrue(self.utility.has_stop_words(u'some specific text'))
+
+    def test_only_word_list(self):
+        self.assertIsNone(self.utility.compile_stop_words())
+        get_word_list().add(u'Spécific')
+        self.assertTrue(self.utility.has_stop_words(u'some specific text'))
+
+    def test_compiled_once(self):
+        get_word_list().add(u'specific')
+        self.assertIs(
+            self.utility.compile_stop_words(),
+            self.utility.compile_stop_words()
+        )
+
+    def test_change_rebuilds_matcher(self):
+        word_list = get_word_list()
+        word_list.add(u'specific')
+        matcher = self.utility.compile_stop_words()
+
+        word_list.add(u'random')
+        new_matcher = self.utility.compile_stop_words()
+        self.assertIsNot(matcher, new_matcher)
+        self.assertNotEqual(matcher.version, new_matcher.version)
+        self.assertTrue(self.utility.has_stop_words(u'some random text'))
+
+        word_list.remove(u'random')
+        self.assertFalse(self.utility.has_stop_words(u'some random text'))
+
+    def test_change_extends_matcher(self):
+        word_list = get_word_list()
+        word_list.add(u'specific')
+        matcher = self.utility.compile_stop_words()
+
+        word_list.add(u'random')
+        new_matcher = self.utility.compile_stop_words()
+        self.assertIs(new_matcher.base, matcher)
+        self.assertTrue(self.utility.has_stop_words(u'some random text'))
+
+    def test_view(self):
+        get_word_list().bulk_import([u'one', u'two'])
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        self.assertIn(u'two', view())
+
+    def test_view_search(self):
+        get_word_list().bulk_import([u'one', u'two', u'three'])
+        self.request.form['search'] = u't'
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(list(view.batch), [u'three', u'two'])
+
+    def test_view_paginated(self):
+        get_word_list().bulk_import([u'w{0:03d}'.format(i) for i in range(30)])
+        self.request.form.update({'b_start': '10', 'b_size': '5'})
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(
+            list(view.batch),
+            [u'w010', u'w011', u'w012', u'w013', u'w014']
+        )
+
+    def test_view_import(self):
+        self._post(**{
+            'form.buttons.import': 'Add',
+            'words': 'one\ntwo\n',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(list(get_word_list()), [u'one', u'two'])
+
+    def test_view_import_invalid(self):
+        self._post(**{
+            'form.buttons.import': 'Add',
+            'words': 'one\nre:(a+)+',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(len(get_word_list()), 0)
+
+    def test_view_import_get_forbidden(self):
+        self.request.form.update({
+            'form.buttons.import': 'Add',
+            'words': 'one',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        self.assertRaises(Forbidden, view)
+        self.assertEqual(len(get_word_list()), 0)
+
+    def test_view_remove_no_authenticator_forbidden(self):
+        get_word_list().bulk_import([u'one'])
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form.update({
+            'form.buttons.remove': 'Remove',
+            'remove': ['one'],
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        self.assertRaises(Forbidden, view)
+        self.assertEqual(list(get_word_list()), [u'one'])
+
+    def test_view_remove(self):
+        get_word_list().bulk_import([u'one', u'two'])
+        self._post(**{
+            'form.buttons.remove': 'Remove',
+            'remove': ['one'],
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(list(get_word_list()), [u'two'])
+
+
+class NamedWordListsTestCase(unittest.TestCase):
+    layer = COLLECTIVE_CONTENTALERTS_INTEGRATION_TESTING
+
+    def setUp(self):
+        self.portal = self.layer['portal']
+        self.request = self.layer['request']
+        setRoles(self.portal, TEST_USER_ID, ['Manager'])
+        self.utility = getUtility(IAlert)
+
+    def _post(self, **form):
+        self.request.environ['REQUEST_METHOD'] = 'POST'
+        self.request.form['_authenticator'] = api.content.get_view(
+            name='authenticator',
+            context=self.portal,
+            request=self.request
+        ).token()
+        self.request.form.update(form)
+
+    def test_add_word_list(self):
+        word_list = add_word_list('spam', title=u'Spam')
+        self.assertEqual(word_list.title, u'Spam')
+        self.assertIs(get_word_list(name='spam'), word_list)
+        self.assertIsNot(get_word_list(), word_list)
+        self.assertEqual(list(get_word_lists()), ['spam'])
+
+    def test_add_word_list_title_defaults_to_name(self):
+        self.assertEqual(add_word_list('spam').title, 'spam')
+
+    def test_add_word_list_invalid_name(self):
+        with self.assertRaises(ValueError):
+            add_word_list('no spaces')
+        with self.assertRaises(ValueError):
+            add_word_list('')
+
+    def test_add_word_list_twice(self):
+        add_word_list('spam')
+        with self.assertRaises(ValueError):
+            add_word_list('spam')
+
+    def test_remove_word_list(self):
+        add_word_list('spam')
+        self.assertTrue(remove_word_list('spam'))
+        self.assertIsNone(get_word_list(name='spam', create=False))
+        self.assertFalse(remove_word_list('spam'))
+
+    def test_not_part_of_default_stop_words(self):
+        add_word_list('spam').add(u'random')
+        self.assertIsNone(self.utility.compile_stop_words())
+        self.assertFalse(self.utility.has_stop_words(u'some random text'))
+
+    def test_compile_word_list(self):
+        add_word_list('spam').add(u'random')
+        matcher = self.utility.compile_word_list('spam')
+        self.assertEqual(matcher.words, (u'random', ))
+        self.assertTrue(
+            self.utility.has_stop_words(u'some random text', matcher)
+        )
+
+    def test_compile_word_list_shared(self):
+        add_word_list('spam').add(u'random')
+        self.assertIs(
+            self.utility.compile_word_list('spam'),
+            self.utility.compile_word_list('spam')
+        )
+
+    def test_compile_word_list_rebuilt_on_change(self):
+        word_list = add_word_list('spam')
+        word_list.add(u'random')
+        matcher = self.utility.compile_word_list('spam')
+        word_list.add(u'specific')
+        self.assertIsNot(self.utility.compile_word_list('spam'), matcher)
+
+    def test_compile_word_list_extended_on_change(self):
+        word_list = add_word_list('spam')
+        word_list.add(u'random')
+        matcher = self.utility.compile_word_list('spam')
+        word_list.add(u'specific')
+        word_list.remove(u'random')
+        new_matcher = self.utility.compile_word_list('spam')
+        self.assertIs(new_matcher.base, matcher)
+        self.assertTrue(
+            self.utility.has_stop_words(u'some specific text', new_matcher)
+        )
+        self.assertFalse(
+            self.utility.has_stop_words(u'some random text', new_matcher)
+        )
+
+    def test_compile_missing_or_empty_word_list(self):
+        self.assertIsNone(self.utility.compile_word_list('spam'))
+        add_word_list('spam')
+        self.assertIsNone(self.utility.compile_word_list('spam'))
+
+    def test_vocabulary(self):
+        add_word_list('spam', title=u'Spam')
+        add_word_list('legal')
+        factory = getUtility(
+            IVocabularyFactory,
+            name='collective.contentalerts.WordLists'
+        )
+        vocabulary = factory(self.portal)
+        self.assertEqual(
+            [(term.value, term.title) for term in vocabulary],
+            [('legal', 'legal'), ('spam', u'Spam')]
+        )
+
+    def test_view_add_list(self):
+        self._post(**{
+            'form.buttons.add_list': 'Add',
+            'name': 'spam',
+            'title': 'Spam',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(get_word_list(name='spam').title, u'Spam')
+        self.assertEqual(view.name, 'spam')
+
+    def test_view_import_on_list(self):
+        add_word_list('spam')
+        self._post(**{
+            'form.buttons.import': 'Add',
+            'list': 'spam',
+            'words': 'one\ntwo',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertEqual(list(get_word_list(name='spam')), [u'one', u'two'])
+        self.assertEqual(len(get_word_list()), 0)
+
+    def test_view_remove_list_get_forbidden(self):
+        add_word_list('spam')
+        self.request.form.update({
+            'form.buttons.remove_list': 'Remove',
+            'list': 'spam',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        self.assertRaises(Forbidden, view)
+        self.assertIsNotNone(get_word_list(name='spam', create=False))
+
+    def test_view_remove_list(self):
+        add_word_list('spam')
+        self._post(**{
+            'form.buttons.remove_list': 'Remove',
+            'list': 'spam',
+        })
+        view = api.content.get_view(
+            name='stop-words-list',
+            context=self.portal,
+            request=self.request
+        )
+        view()
+        self.assertIsNone(get_word_list(name='spam', create=False))
+        self.assertIsNone(view.name)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.contentrules import FLAG_INDEXES
+from collective.contentalerts.contentrules import get_flagged_date
+from collective.contentalerts.contentrules import set_flagged_date
+from collective.contentalerts.contentrules import set_found_stop_words
+from collective.contentalerts.interfaces import IAlert
+from collective.contentalerts.interfaces import IHasStopWords
+from collective.contentalerts.utilities import get_text
+from plone import api
+from zope.component import getUtility
+
+import logging
+
+
+logger = logging.getLogger('collective.contentalerts')
+
+PROFILE_ID = 'profile-collective.contentalerts:default'
+
+
+def add_catalog_indexes(context):
+    """Add the indexes and metadata columns about flagged objects.
+
+    has_stop_words is filled for all objects, while the stop words of the
+    objects that are already flagged are searched again with the stop words
+    from the registry. As when they were flagged is not known, their
+    modification date is used instead.
+    """
+    context.runImportStepFromProfile(PROFILE_ID, 'catalog')
+    catalog = api.portal.get_tool('portal_catalog')
+    catalog.manage_reindexIndex(ids=['has_stop_words'])
+
+    alert_utility = getUtility(IAlert)
+    brains = catalog.unrestrictedSearchResults(
+        object_provides=IHasStopWords.__identifier__
+    )
+    for brain in brains:
+        obj = brain._unrestrictedGetObject()
+        scan = alert_utility.scan(get_text(obj))
+        if scan:
+            set_found_stop_words(obj, scan.words)
+        if get_flagged_date(obj) is None:
+            set_flagged_date(obj, brain.modified)
+        obj.reindexObject(idxs=FLAG_INDEXES)
+
+    logger.info(
+        'Catalog indexes added, {0} flagged objects'.format(len(brains))
+    )
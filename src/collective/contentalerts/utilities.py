@@ -1,81 +1,342 @@
 # -*- coding: utf-8 -*-
 from collective.contentalerts.interfaces import IStopWords
+from collective.contentalerts.interfaces import ITextExtractor
+from collective.contentalerts.matcher import ExtendedMatcher
+from collective.contentalerts.matcher import StopWordsMatcher
+from collective.contentalerts.matcher import tokenize
+from collective.contentalerts.patterns import REGEX_PREFIX
+from collective.contentalerts.patterns import WILDCARD
+from collective.contentalerts.patterns import is_pattern
+from collective.contentalerts.patterns import wildcard_regex
+from collective.contentalerts.stats import MATCH_SECONDS
+from collective.contentalerts.stats import NORMALIZED_CHARACTERS
+from collective.contentalerts.stats import NORMALIZE_SECONDS
+from collective.contentalerts.stats import timer
+from collective.contentalerts.wordlist import get_word_list
+from itertools import chain
+from itertools import izip
 from plone.registry.interfaces import IRegistry
 from zope.component import getUtility
+from zope.component import queryUtility
 
 import HTMLParser
+import hashlib
 import re
+import threading
 import unicodedata
 
 
 NBSP_RE = re.compile(r'\s+|&#160;|&nbsp;', re.UNICODE)
 
+# between the texts of each field, not a word character nor whitespace,
+# so that neither stop words nor wildcards match across fields
+FIELD_SEPARATOR = u'\n\n|\n\n'
+
+STOP_WORDS_RECORD = '{0}.stop_words'.format(IStopWords.__identifier__)
+WHOLE_WORDS_RECORD = '{0}.whole_words'.format(IStopWords.__identifier__)
+SLOW_SCAN_RECORD = '{0}.slow_scan_threshold'.format(
+    IStopWords.__identifier__
+)
+
+# compiled default stop words and named word lists, shared by all threads
+# and keyed by the registry record value, the word list uid (and whole words
+# mode), so that all sites (and ZEO clients that did not see the change)
+# always get the matcher for their current list. Values are the word list
+# version the matcher was built with and the matcher.
+_registry_cache = {}
+REGISTRY_CACHE_SIZE = 64
+# only one thread compiles a matcher, the others wait and reuse it
+_compile_lock = threading.Lock()
+
+# a matcher is extended, instead of being compiled again, as long as the
+# stop words added and removed since it was compiled are no more than these
+# many, or than this fraction of the matcher
+MIN_EXTENDED_DELTA = 100
+MAX_EXTENDED_RATIO = 10
+
+ENTITY_RE = re.compile(r'&(#?[xX]?(?:[0-9a-fA-F]+|\w{1,8}));')
+
+# entities are user input (e.g. &#065; and &#0065; are different keys),
+# the table is emptied once it gets this big so that it can not grow forever
+ENTITY_TABLE_SIZE = 1024
+
+# codepoints are user input too: the ones up to NORMALIZE_PRECOMPUTED are
+# computed upfront, the other ones are forgotten once there are this many
+NORMALIZE_PRECOMPUTED = 0x2000
+NORMALIZE_TABLE_SIZE = NORMALIZE_PRECOMPUTED + 8192
+
+
+class EntityTable(dict):
+    """Maps HTML entities to the text they stand for.
+
+    Entities are resolved by HTMLParser the first time they are found and
+    kept afterwards, up to ENTITY_TABLE_SIZE of them.
+    """
+
+    _unescape = HTMLParser.HTMLParser().unescape
+
+    def __missing__(self, entity):
+        value = self._unescape(entity)
+        if len(self) >= ENTITY_TABLE_SIZE:
+            self.clear()
+        self[entity] = value
+        return value
+
+
+ENTITY_TABLE = EntityTable()
+
+
+def unescape(text):
+    """Replace HTML entities by the text they stand for.
+
+    :param text: text with HTML entities.
+    :type text: unicode
+    :returns: the same text with entities replaced.
+    :rtype: unicode
+    """
+    if u'&' not in text:
+        return text
+    return ENTITY_RE.sub(lambda match: ENTITY_TABLE[match.group()], text)
+
+
+def collapse_whitespace(text):
+    """Replace whitespace runs and non breaking spaces by a single space.
+
+    Same as ``NBSP_RE.sub(u' ', text)``, but without going through the
+    regular expression engine for every single space.
+
+    :param text: text to be collapsed.
+    :type text: unicode
+    :returns: the same text with whitespace collapsed.
+    :rtype: unicode
+    """
+    if not text:
+        return text
+
+    words = text.split()
+    collapsed = u' '.join(words)
+    if not words:
+        collapsed = u' '
+    else:
+        if text[0].isspace():
+            collapsed = u' ' + collapsed
+        if text[-1].isspace():
+            collapsed += u' '
+
+    if u'&' in collapsed:
+        collapsed = collapsed.replace(u'&nbsp;', u' ')
+        collapsed = collapsed.replace(u'&#160;', u' ')
+    return collapsed
+
+
+class NormalizeTable(dict):
+    """Codepoint translation table to be used with unicode.translate.
+
+    Each codepoint is lower cased and decomposed (NFKD) with the combining
+    characters (i.e. accents) removed. As the table would be huge if computed
+    upfront for all unicode characters, only the first NORMALIZE_PRECOMPUTED
+    codepoints (latin, greek, cyrillic...) are, the other ones are computed
+    the first time they are found and kept afterwards, up to
+    NORMALIZE_TABLE_SIZE codepoints in total.
+    """
+
+    def __init__(self):
+        super(NormalizeTable, self).__init__(
+            (codepoint, self._normalize(codepoint))
+            for codepoint in xrange(NORMALIZE_PRECOMPUTED)
+        )
+
+    @staticmethod
+    def _normalize(codepoint):
+        char = unichr(codepoint).lower()
+        return u''.join(
+            [c
+             for c in unicodedata.normalize('NFKD', char)
+             if not unicodedata.combining(c)]
+        )
+
+    def __missing__(self, codepoint):
+        value = self._normalize(codepoint)
+        if len(self) >= NORMALIZE_TABLE_SIZE:
+            # forget the ones found on texts, keep the precomputed ones
+            for key in [key for key in self if key >= NORMALIZE_PRECOMPUTED]:
+                self.pop(key, None)
+        self[codepoint] = value
+        return value
+
+
+NORMALIZE_TABLE = NormalizeTable()
+
+
+class Scan(object):
+    """Stop words occurrences found on a text."""
+
+    __slots__ = ('text', 'normalized_text', 'matcher', 'matches', )
+
+    def __init__(self, text, normalized_text, matcher, matches):
+        """
+        :param text: the text as it was given to be scanned.
+        :type text: str or unicode
+        :param normalized_text: the text as it was actually scanned.
+        :type normalized_text: unicode
+        :param matcher: the stop words searched on the text.
+        :type matcher: StopWordsMatcher
+        :param matches: where on the normalized text an occurrence starts,
+          where it ends and the position of the stop word on the matcher.
+        :type matches: list of tuples
+        """
+        self.text = text
+        self.normalized_text = normalized_text
+        self.matcher = matcher
+        self.matches = matches
+
+    @property
+    def version(self):
+        """Version of the stop words list the text was scanned with."""
+        return self.matcher.version
+
+    @property
+    def words(self):
+        """The stop words found, sorted and without duplicates."""
+        words = self.matcher.words
+        return tuple(sorted(set(
+            words[position]
+            for start, end, position in self.matches
+        )))
+
+    def __nonzero__(self):
+        return bool(self.matches)
+
+
+class Match(object):
+    """An occurrence of a stop word on a text."""
+
+    __slots__ = ('start', 'end', 'word', 'original', )
+
+    def __init__(self, start, end, word, original):
+        """
+        :param start: where the occurrence starts on the normalized text.
+        :type start: int
+        :param end: where the occurrence ends on the normalized text.
+        :type end: int
+        :param word: the stop word found, normalized.
+        :type word: unicode
+        :param original: the stop word as written on the stop words list.
+        :type original: unicode
+        """
+        self.start = start
+        self.end = end
+        self.word = word
+        self.original = original
+
+    def __repr__(self):
+        return '<Match {0!r} {1}:{2}>'.format(self.word, self.start, self.end)
+
 
 class Alert(object):
     """Utility to know if a given text contains stop words."""
 
-    def get_snippets(self, text, stop_words=None, chars=150):
+    def get_snippets(self, text, stop_words=None, chars=150,
+                     max_snippets=None, whole_words=None):
         """Returns the stop words found in the text.
 
         See IAlert interface docstring for its parameters.
         """
-        if text is None:
-            return u''
+        return self.format_snippets(
+            self.scan(text, stop_words=stop_words, whole_words=whole_words),
+            chars=chars,
+            max_snippets=max_snippets
+        )
 
-        normalized_stop_words = self.get_normalized_stop_words(stop_words)
-        if not normalized_stop_words:
-            return u''
+    def scan(self, text, stop_words=None, whole_words=None):
+        """Finds all the stop words occurrences on the text.
+
+        See IAlert interface docstring for its parameters.
+        """
+        if not text:
+            return None
+
+        matcher = self.compile_stop_words(stop_words, whole_words=whole_words)
+        if not matcher:
+            return None
 
-        # get all the stop words occurrences on the text
-        snippets_data = {}
         normalized_text = self.html_normalize(text)
-        for word in normalized_stop_words:
-            index = normalized_text.find(word)
-            while index != -1:
-                snippet = self._snippet(
-                    normalized_text,
-                    index,
-                    word,
-                    chars
-                )
-                snippets_data[index] = (snippet, word)
-
-                index = normalized_text.find(word, index + 1)
-
-        if not snippets_data:
+        with timer(MATCH_SECONDS):
+            if (matcher.tokenized and
+                    matcher.check_words(tokenize(normalized_text)) is False):
+                matches = []
+            else:
+                matches = list(matcher.finditer(normalized_text))
+        return Scan(text, normalized_text, matcher, matches)
+
+    def format_snippets(self, scan, chars=150, max_snippets=None):
+        """Returns the stop words found on a scan surrounded by some text.
+
+        See IAlert interface docstring for its parameters.
+        """
+        if not scan:
             return u''
 
-        # sort the snippets so that the original text flow is respected
-        snippet = u''
+        # if more than one stop word starts at the same place, the last one
+        # on the list wins
+        hits = {}
+        for index, end, position in scan.matches:
+            if position > hits.get(index, (-1, ))[0]:
+                hits[index] = (position, end)
+
+        # walk the occurrences in the order they appear on the text, merging
+        # the ones whose surrounding text overlaps in a single snippet
+        words = scan.matcher.words
         stop_words_found = []
-        for index in sorted(snippets_data.keys()):
-            snippet += snippets_data[index][0]
-            stop_words_found.append(snippets_data[index][1])
+        spans = []
+        for index in sorted(hits):
+            position, end = hits[index]
+            stop_words_found.append(words[position])
+            if spans and index - chars < spans[-1][1] + chars:
+                if end > spans[-1][1]:
+                    spans[-1][1] = end
+            elif max_snippets is None or len(spans) < max_snippets:
+                spans.append([index, end])
 
-        result = u'{0}{1}'.format(
-            ', '.join(self._unique(stop_words_found)),
-            snippet
+        text = scan.normalized_text
+        parts = [u', '.join(self._unique(stop_words_found))]
+        parts.extend(
+            self._snippet(text, start, text[start:end], chars)
+            for start, end in spans
         )
-        return result
+        return u''.join(parts)
 
-    def has_stop_words(self, text, stop_words=None):
+    def has_stop_words(self, text, stop_words=None, whole_words=None):
         """Checks if the given text has words from the provided stop words.
 
         See IAlert interface docstring for its parameters.
         """
-        if not text or text is None:
+        if not text:
             return False
 
-        normalized_stop_words = self.get_normalized_stop_words(stop_words)
-        if not normalized_stop_words:
+        matcher = self.compile_stop_words(stop_words, whole_words=whole_words)
+        if not matcher:
             return False
 
-        normalized_text = self.html_normalize(text)
-        for word in normalized_stop_words:
-            if normalized_text.find(word) != -1:
-                return True
+        return matcher.search(self.html_normalize(text))
 
-        return False
+    def find_matches(self, text, stop_words=None, whole_words=None):
+        """Yields each occurrence of the stop words on the text.
+
+        See IAlert interface docstring for its parameters.
+        """
+        if not text:
+            return
+
+        matcher = self.compile_stop_words(stop_words, whole_words=whole_words)
+        if not matcher:
+            return
+
+        words = matcher.words
+        originals = matcher.originals
+        normalized_text = self.html_normalize(text)
+        for start, end, position in matcher.finditer(normalized_text):
+            yield Match(start, end, words[position], originals[position])
 
     @staticmethod
     def html_normalize(text):
@@ -86,19 +347,19 @@ class Alert(object):
         :returns: text normalized.
         :rtype: unicode
         """
-        if isinstance(text, str):
-            text = text.decode('latin-1')
-        text = NBSP_RE.sub(' ', text)
-        parser = HTMLParser.HTMLParser()
-        text = parser.unescape(text)
-        text = text.lower()
-        text = u''.join(
-            [c
-             for c in unicodedata.normalize('NFKD', text)
-             if not unicodedata.combining(c)]
-        )
+        with timer(NORMALIZE_SECONDS):
+            if isinstance(text, str):
+                text = text.decode('latin-1')
+            NORMALIZED_CHARACTERS.increment(len(text))
+            text = unescape(collapse_whitespace(text))
 
-        return text
+            try:
+                text.encode('ascii')
+            except UnicodeEncodeError:
+                return text.translate(NORMALIZE_TABLE)
+
+            # nothing to decompose on plain ASCII
+            return text.lower()
 
     @staticmethod
     def _snippet(text, index, word, chars):
@@ -137,22 +398,355 @@ class Alert(object):
     def _get_registry_stop_words(self):
         """Returns the stop words found on the registry, if any."""
         registry = getUtility(IRegistry)
-        try:
-            records = registry.forInterface(IStopWords)
-            return records.stop_words or None
-        except KeyError:
-            return None
+        return registry.get(STOP_WORDS_RECORD) or None
 
     def get_normalized_stop_words(self, stop_words=None):
-        if stop_words is None:
-            stop_words = self._get_registry_stop_words()
-
-        if stop_words is None or stop_words.strip() == u'':
+        matcher = self.compile_stop_words(stop_words)
+        if matcher is None:
             return []
 
-        normalized_stop_words = [
-            self.html_normalize(a)
-            for a in stop_words.splitlines()
-            if a
-        ]
-        return normalized_stop_words
+        return list(matcher.words)
+
+    def compile_stop_words(self, stop_words=None, whole_words=None):
+        """Get a matcher for the given stop words.
+
+        The default stop words (the registry ones together with the site
+        word list) are only normalized and compiled once, the matcher is
+        then reused until the registry record or the word list change.
+        Once the word list changes, only the words added since are
+        normalized again.
+
+        :param stop_words: one stop word per line, if not provided the
+          default ones are used. An already compiled matcher is returned
+          as is.
+        :type stop_words: unicode or StopWordsMatcher
+        :param whole_words: whether stop words only match whole words, if
+          not provided the registry setting is used.
+        :type whole_words: bool
+        :returns: the matcher or None if there are no stop words.
+        :rtype: StopWordsMatcher
+        """
+        if isinstance(stop_words, StopWordsMatcher):
+            return stop_words
+
+        whole_words = resolve_whole_words(whole_words)
+
+        if stop_words is not None:
+            return self._compile(stop_words, whole_words)
+
+        stop_words = self._get_registry_stop_words()
+        word_list = get_word_list(create=False)
+        if word_list is not None and not len(word_list):
+            word_list = None
+        if stop_words is None and word_list is None:
+            return None
+
+        return self._get_cached(stop_words, word_list, whole_words)
+
+    def compile_word_list(self, name, whole_words=None):
+        """Get a matcher for a named stop words list of the site.
+
+        See IAlert interface docstring for its parameters.
+        """
+        whole_words = resolve_whole_words(whole_words)
+        word_list = get_word_list(create=False, name=name)
+        if word_list is None or not len(word_list):
+            return None
+        return self._get_cached(None, word_list, whole_words)
+
+    def _get_cached(self, stop_words, word_list, whole_words):
+        """Get the matcher of the registry stop words and/or a word list.
+
+        It is compiled the first time it is asked for, and shared afterwards
+        by all threads until the registry record or the word list change.
+        Only one thread compiles it, the others wait and reuse it. When only
+        a few stop words changed, the previous matcher is extended rather
+        than compiled again (see ExtendedMatcher).
+        """
+        key = (stop_words, getattr(word_list, 'uid', None), whole_words)
+        list_version = getattr(word_list, 'version', None)
+        cached_version, matcher = _registry_cache.get(key, (None, None))
+        if matcher is not None and cached_version == list_version:
+            return matcher
+
+        with _compile_lock:
+            cached_version, matcher = _registry_cache.get(key, (None, None))
+            if matcher is not None and cached_version == list_version:
+                return matcher
+            if matcher is None:
+                matcher = self._get_previous(key)
+            matcher = self._compile(
+                stop_words or u'',
+                whole_words,
+                word_list=word_list,
+                previous=matcher,
+            )
+            if len(_registry_cache) >= REGISTRY_CACHE_SIZE:
+                _registry_cache.clear()
+            _registry_cache[key] = (list_version, matcher)
+        return matcher
+
+    @staticmethod
+    def _get_previous(key):
+        """Get a cached matcher of the same word list, if any.
+
+        e.g. the one of the registry stop words before they were changed.
+        """
+        for other_key, (version, matcher) in _registry_cache.items():
+            if matcher is not None and other_key[1:] == key[1:]:
+                return matcher
+        return None
+
+    def _compile(self, stop_words, whole_words=False, word_list=None,
+                 previous=None):
+        """Normalize the stop words and build a matcher out of them.
+
+        :param stop_words: one stop word per line.
+        :type stop_words: unicode
+        :param whole_words: whether stop words only match whole words.
+        :type whole_words: bool
+        :param word_list: more stop words to add to the matcher.
+        :type word_list: WordList
+        :param previous: a matcher built out of mostly the same stop words,
+          it is extended if only a few stop words changed, otherwise its
+          normalized stop words are reused.
+        :type previous: StopWordsMatcher
+        """
+        lines = []
+        if stop_words.strip():
+            lines = stop_words.splitlines()
+        if word_list is not None:
+            lines = chain(lines, word_list)
+        lines = [line for line in lines if line]
+        if not lines:
+            return None
+
+        version = stop_words_version(stop_words, whole_words, word_list)
+        normalized = {}
+        if previous is not None:
+            normalized = dict(izip(previous.originals, previous.words))
+            if previous.whole_words == whole_words:
+                matcher = self._extend(previous, lines, version, normalized)
+                if matcher is not None:
+                    return matcher
+
+        return self._build(lines, whole_words, version, normalized)
+
+    def _extend(self, previous, lines, version, normalized):
+        """Extend the base of a matcher with the stop words that changed.
+
+        :returns: the matcher or None if too many stop words changed.
+        :rtype: ExtendedMatcher
+        """
+        base = getattr(previous, 'base', previous)
+        originals = base.live_originals()
+        current = set(lines)
+        removed = originals - current
+        added = []
+        for line in lines:
+            if line not in originals:
+                added.append(line)
+                # only once if duplicated
+                originals.add(line)
+        if len(added) + len(removed) > max(
+                MIN_EXTENDED_DELTA, len(base) // MAX_EXTENDED_RATIO):
+            return None
+
+        added_matcher = None
+        if added:
+            added_matcher = self._build(
+                added,
+                base.whole_words,
+                version,
+                normalized,
+            )
+        return ExtendedMatcher(
+            base,
+            added=added_matcher,
+            removed=removed,
+            version=version,
+        )
+
+    def _build(self, lines, whole_words, version, normalized):
+        """Build a matcher out of stop words.
+
+        :param lines: the stop words, none of them empty.
+        :type lines: list of unicode
+        :param normalized: already normalized stop words, keyed by the stop
+          words as they were written.
+        :type normalized: dict
+        """
+        original_stop_words = []
+        normalized_stop_words = []
+        original_patterns = []
+        patterns = []
+        for line in lines:
+            if is_pattern(line):
+                original_patterns.append(line)
+                patterns.append(self._normalize_pattern(line))
+            else:
+                original_stop_words.append(line)
+                word = normalized.get(line)
+                if word is None:
+                    word = self.html_normalize(line)
+                normalized_stop_words.append(word)
+
+        return StopWordsMatcher(
+            normalized_stop_words,
+            version=version,
+            originals=original_stop_words + original_patterns,
+            whole_words=whole_words,
+            patterns=patterns,
+        )
+
+    def _normalize_pattern(self, line):
+        """Get the normalized stop word and the regex source of a pattern.
+
+        Regular expressions are kept as is, while the text around wildcards
+        is normalized as any other stop word.
+        """
+        if line.startswith(REGEX_PREFIX):
+            return line, line[len(REGEX_PREFIX):]
+
+        parts = [self.html_normalize(part) for part in line.split(WILDCARD)]
+        return WILDCARD.join(parts), wildcard_regex(parts)
+
+
+def get_text(obj):
+    """Get the text where to search for stop words on a content object.
+
+    The texts of all the fields given by the object's ITextExtractor adapter
+    are joined, each field on its own paragraph, so that stop words do not
+    match across two fields. Objects without an adapter only have their
+    ``text`` attribute scanned.
+
+    :param obj: a comment, an Archetypes or a Dexterity object.
+    :returns: the text or None if the object has none.
+    :rtype: unicode
+    """
+    extractor = ITextExtractor(obj, None)
+    if extractor is None:
+        texts = [getattr(obj, 'text', None)]
+    else:
+        texts = extractor()
+
+    texts = [
+        text.decode('utf-8', 'replace') if isinstance(text, str) else text
+        for text in texts
+        if text
+    ]
+    if not texts:
+        return None
+    return FIELD_SEPARATOR.join(texts)
+
+
+def get_versioned(annotations, key, version):
+    """Get what was kept on an annotation for a stop words list version.
+
+    :param annotations: the annotations of an object.
+    :param key: the annotation key, see set_versioned.
+    :type key: str
+    :param version: version of the stop words list.
+    :type version: str
+    :returns: the value or None if there is none for that version.
+    """
+    for entry_version, value in _versioned_entries(annotations.get(key)):
+        if entry_version == version:
+            return value
+    return None
+
+
+def set_versioned(annotations, key, version, value, size):
+    """Keep a value on an annotation for a stop words list version.
+
+    Rules with different stop words lists each keep their own value, up to
+    ``size`` of them, the least recently set ones are dropped first.
+
+    :param annotations: the annotations of an object.
+    :param key: the annotation key.
+    :type key: str
+    :param version: version of the stop words list.
+    :type version: str
+    :param value: what to keep, it has to be immutable.
+    :param size: how many versions are kept at most.
+    :type size: int
+    """
+    old = annotations.get(key)
+    entries = [(version, value)]
+    entries.extend(
+        entry
+        for entry in _versioned_entries(old)
+        if entry[0] != version
+    )
+    entries = tuple(entries[:size])
+    if old != entries:
+        annotations[key] = entries
+
+
+def _versioned_entries(entries):
+    # annotations kept a single value before, not worth converting
+    if not entries or not isinstance(entries[0], tuple):
+        return ()
+    return entries
+
+
+def text_digest(text):
+    """Get a digest of the text, to know if it changed without keeping it.
+
+    :param text: any text.
+    :type text: str or unicode
+    :returns: the hexadecimal digest.
+    :rtype: str
+    """
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.md5(text).hexdigest()
+
+
+def stop_words_version(stop_words, whole_words=False, word_list=None):
+    """Get a stable identifier of the given stop words list.
+
+    :param stop_words: one stop word per line.
+    :type stop_words: str or unicode
+    :param whole_words: whether the stop words only match whole words.
+    :type whole_words: bool
+    :param word_list: more stop words, identified by its uid and version.
+    :type word_list: WordList
+    :returns: a digest of the list, and the mode.
+    :rtype: str
+    """
+    version = text_digest(stop_words)
+    if word_list is not None:
+        version = text_digest('{0}-{1}-{2}'.format(
+            version,
+            word_list.uid,
+            word_list.version,
+        ))
+    if whole_words:
+        version = '{0}-whole-words'.format(version)
+    return version
+
+
+def resolve_whole_words(whole_words=None):
+    """Get whether stop words should only match whole words.
+
+    :param whole_words: the mode asked for, if not given the registry setting
+      is used.
+    :type whole_words: bool
+    :returns: the mode to use.
+    :rtype: bool
+    """
+    if whole_words is not None:
+        return bool(whole_words)
+    registry = queryUtility(IRegistry)
+    if registry is None:
+        return False
+    return bool(registry.get(WHOLE_WORDS_RECORD, False))
+
+
+def invalidate_stop_words_cache(event):
+    """Forget the compiled stop words once the registry record changes."""
+    if getattr(event.record, '__name__', None) == STOP_WORDS_RECORD:
+        for key in list(_registry_cache):
+            if key[0] == event.oldValue:
+                _registry_cache.pop(key, None)
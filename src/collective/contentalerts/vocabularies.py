@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from collective.contentalerts.wordlist import get_word_lists
+from zope.interface import implementer
+from zope.schema.interfaces import IVocabularyFactory
+from zope.schema.vocabulary import SimpleTerm
+from zope.schema.vocabulary import SimpleVocabulary
+
+
+@implementer(IVocabularyFactory)
+class WordListsVocabulary(object):
+    """Named stop words lists of the site."""
+
+    def __call__(self, context):
+        word_lists = get_word_lists(create=False) or {}
+        return SimpleVocabulary([
+            SimpleTerm(name, name, word_list.title or name)
+            for name, word_list in word_lists.items()
+        ])
+
+
+WordListsVocabularyFactory = WordListsVocabulary()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""Persistent stop words list, for lists too big for a registry record.
+
+Words are kept on an ``OOTreeSet``, so adding or removing one only writes
+the bucket it lives on instead of the whole list, and the list can be
+paged and searched without loading it all.
+
+Besides the default list of the site, named lists (e.g. profanity, spam or
+one per language) can be added, to be chosen on text alert conditions.
+"""
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
+from collective.contentalerts.patterns import check_stop_words
+from persistent import Persistent
+from zope.annotation.interfaces import IAnnotations
+from zope.component.hooks import getSite
+
+import re
+import uuid
+
+
+WORD_LIST_KEY = 'collective.contentalerts.word_list'
+WORD_LISTS_KEY = 'collective.contentalerts.word_lists'
+
+NAME_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+
+
+class WordList(Persistent):
+    """Stop words, sorted and without duplicates.
+
+    Each change bumps ``version``, so that compiled matchers know when they
+    need to be rebuilt. ``uid`` tells lists apart, as a list created anew
+    starts again on version 0.
+    """
+
+    title = None
+
+    def __init__(self, title=None):
+        self.uid = uuid.uuid4().hex
+        self.title = title
+        self._words = OOTreeSet()
+        # conflict free counters, so that concurrent edits do not conflict
+        # on them
+        self._length = Length()
+        self._version = Length()
+
+    def __len__(self):
+        return self._length()
+
+    def __iter__(self):
+        return iter(self._words)
+
+    def __contains__(self, word):
+        return self._clean(word) in self._words
+
+    @property
+    def version(self):
+        return self._version()
+
+    def add(self, word):
+        """Add a stop word to the list.
+
+        :param word: a stop word, wildcard or regular expression.
+        :type word: unicode
+        :raises InvalidStopWord: if it is a pattern that is not safe to use.
+        :returns: whether the word was added, i.e. it was not there already.
+        :rtype: bool
+        """
+        return self.bulk_import([word]) == 1
+
+    def remove(self, word):
+        """Remove a stop word from the list.
+
+        :param word: the stop word to remove.
+        :type word: unicode
+        :returns: whether the word was removed, i.e. it was on the list.
+        :rtype: bool
+        """
+        return self.bulk_remove([word]) == 1
+
+    def bulk_import(self, words):
+        """Add many stop words at once.
+
+        Either all words are added or none: if any of them is not valid,
+        nothing is added.
+
+        :param words: stop words, e.g. the lines of a text file. Empty ones
+          are ignored.
+        :type words: iterable of unicode
+        :raises InvalidStopWord: if any is a pattern that is not safe to use.
+        :returns: how many words were added.
+        :rtype: int
+        """
+        words = [word for word in map(self._clean, words) if word]
+        check_stop_words(u'\n'.join(words))
+        added = sum(self._words.insert(word) for word in words)
+        self._changed(added)
+        return added
+
+    def bulk_remove(self, words):
+        """Remove many stop words at once.
+
+        :param words: the stop words to remove.
+        :type words: iterable of unicode
+        :returns: how many words were removed.
+        :rtype: int
+        """
+        removed = 0
+        for word in map(self._clean, words):
+            if word in self._words:
+                self._words.remove(word)
+                removed += 1
+        self._changed(-removed)
+        return removed
+
+    def search(self, prefix=None):
+        """Get the stop words, in alphabetical order.
+
+        :param prefix: only get the ones starting with it.
+        :type prefix: unicode
+        :returns: a lazy sequence of the stop words, it can be sliced and
+          counted without loading all of them.
+        """
+        prefix = self._clean(prefix)
+        if not prefix:
+            return self._words.keys()
+        return self._words.keys(min=prefix, max=prefix + u'\uffff')
+
+    def _changed(self, delta):
+        if delta:
+            self._length.change(delta)
+            self._version.change(1)
+
+    @staticmethod
+    def _clean(word):
+        if not word:
+            return word
+        if isinstance(word, str):
+            word = word.decode('utf-8')
+        return word.strip()
+
+
+def get_word_list(portal=None, create=True, name=None):
+    """Get a stop words list of the site.
+
+    :param portal: the Plone site, the current one if not given.
+    :param create: whether to create the list if it does not exist yet.
+    :type create: bool
+    :param name: the name of the list, the default list if not given.
+    :type name: str
+    :returns: the list or None if it does not exist and create is False (or
+      there is no site).
+    :rtype: WordList
+    """
+    if name:
+        word_lists = get_word_lists(portal, create=create)
+        if word_lists is None:
+            return None
+        word_list = word_lists.get(name)
+        if word_list is None and create:
+            word_list = word_lists[name] = WordList(title=name)
+        return word_list
+
+    annotations = _get_annotations(portal)
+    if annotations is None:
+        return None
+    word_list = annotations.get(WORD_LIST_KEY)
+    if word_list is None and create:
+        word_list = annotations[WORD_LIST_KEY] = WordList()
+    return word_list
+
+
+def get_word_lists(portal=None, create=True):
+    """Get the named stop words lists of the site.
+
+    :param portal: the Plone site, the current one if not given.
+    :param create: whether to create the mapping if it does not exist yet.
+    :type create: bool
+    :returns: a mapping of names to WordList, or None if it does not exist
+      and create is False (or there is no site).
+    :rtype: OOBTree
+    """
+    annotations = _get_annotations(portal)
+    if annotations is None:
+        return None
+    word_lists = annotations.get(WORD_LISTS_KEY)
+    if word_lists is None and create:
+        word_lists = annotations[WORD_LISTS_KEY] = OOBTree()
+    return word_lists
+
+
+def add_word_list(name, title=None, portal=None):
+    """Add a named stop words list to the site.
+
+    :param name: the name of the list, only letters, digits, - and _.
+    :type name: str
+    :param title: a human readable title, the name if not given.
+    :type title: unicode
+    :param portal: the Plone site, the current one if not given.
+    :raises ValueError: if the name is not valid or already used.
+    :returns: the new list.
+    :rtype: WordList
+    """
+    if not name or not NAME_RE.match(name):
+        raise ValueError('Not a valid word list name: {0!r}'.format(name))
+    word_lists = get_word_lists(portal)
+    if name in word_lists:
+        raise ValueError('There is already a word list {0}'.format(name))
+    word_list = word_lists[name] = WordList(title=title or name)
+    return word_list
+
+
+def remove_word_list(name, portal=None):
+    """Remove a named stop words list from the site.
+
+    Text alert conditions that use it no longer find any stop word.
+
+    :param name: the name of the list.
+    :type name: str
+    :param portal: the Plone site, the current one if not given.
+    :returns: whether the list existed.
+    :rtype: bool
+    """
+    word_lists = get_word_lists(portal, create=False)
+    if word_lists is None or name not in word_lists:
+        return False
+    del word_lists[name]
+    return True
+
+
+def _get_annotations(portal=None):
+    if portal is None:
+        portal = getSite()
+    return IAnnotations(portal, None)